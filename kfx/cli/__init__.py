@@ -0,0 +1,402 @@
+"""Command line interface for kfx.
+
+::
+
+    # write metrics to /mlpipeline-metrics.json from a shell step
+    kfx metric recall 0.9 --percent
+    kfx metric loss 0.23 --append
+
+    # write ui metadata to /mlpipeline-ui-metadata.json from a shell step
+    echo "# Report" | kfx ui markdown - --inline
+    kfx ui table s3://bucket/table.csv --header col1 col2 --append
+
+    # validate kubeflow pipeline ui metadata files from archived runs
+    kfx validate ./archived-runs --workers 8 --only-invalid
+
+    # compile pipelines in parallel with kfx transforms
+    kfx compile my_pipelines.train:pipeline my_pipelines.eval:pipeline \\
+        --transform resources.yaml --output-dir ./dist --workers 8 \\
+        --cache-dir ~/.cache/kfx/pipelines
+
+    # write docker build contexts for the packages_to_install of compiled pipelines
+    kfx prebuild ./dist/*.yaml --repository registry.example.com/kfp-prebuilt
+
+    # index the artifact keys of the compiled pipelines into a sqlite database
+    kfx index ./dist/*.yaml --scheme minio --bucket mlpipeline -o artifacts.db
+
+    # download the inputs of a step concurrently, e.g. in an init container
+    kfx prefetch -d /prefetch -j 16 train.csv=gs://bucket/train.csv https://x/vocab.txt
+
+The entry point only imports the modules needed by the selected sub-command, so
+that the cli stays cheap to start inside pipeline steps.
+"""
+import argparse
+from typing import List
+
+
+def _run_validate(args: argparse.Namespace) -> int:
+    from kfx.cli._validate import (  # pylint: disable=import-outside-toplevel
+        run_validate,
+    )
+
+    return run_validate(args)
+
+
+def _run_compile(args: argparse.Namespace) -> int:
+    from kfx.cli._compile import run_compile  # pylint: disable=import-outside-toplevel
+
+    return run_compile(args)
+
+
+def _run_prebuild(args: argparse.Namespace) -> int:
+    from kfx.cli._prebuild import (  # pylint: disable=import-outside-toplevel
+        run_prebuild,
+    )
+
+    return run_prebuild(args)
+
+
+def _run_index(args: argparse.Namespace) -> int:
+    from kfx.cli._index import run_index  # pylint: disable=import-outside-toplevel
+
+    return run_index(args)
+
+
+def _run_prefetch(args: argparse.Namespace) -> int:
+    from kfx.cli._prefetch import (  # pylint: disable=import-outside-toplevel
+        run_prefetch,
+    )
+
+    return run_prefetch(args)
+
+
+def _run_metric(args: argparse.Namespace) -> int:
+    from kfx.cli._emit import run_metric  # pylint: disable=import-outside-toplevel
+
+    return run_metric(args)
+
+
+def _run_ui(args: argparse.Namespace) -> int:
+    from kfx.cli._emit import run_ui  # pylint: disable=import-outside-toplevel
+
+    return run_ui(args)
+
+
+def _add_output_arguments(parser: argparse.ArgumentParser, default: str):
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=default,
+        help="output path, or '-' for stdout. Defaults to '%s'." % default,
+    )
+    parser.add_argument(
+        "-a",
+        "--append",
+        action="store_true",
+        help="add to the existing document at the output path.",
+    )
+
+
+def _add_metric_parser(subparsers):
+    parser = subparsers.add_parser(
+        "metric",
+        help="write a metric to mlpipeline-metrics.json.",
+        description="Writes a kubeflow pipeline metric, same as `kfx.vis.kfp_metric`.",
+    )
+    parser.add_argument(
+        "name", help="name of the metric, e.g. '^[a-z]([-a-z0-9]{0,62}[a-z0-9])?$'."
+    )
+    parser.add_argument("value", help="numerical value of the metric.")
+    parser.add_argument(
+        "--percent", action="store_true", help="render the value as percentage."
+    )
+    parser.add_argument(
+        "--format",
+        dest="metric_format",
+        choices=["PERCENTAGE", "RAW"],
+        default=None,
+        help="format of the metric. Overrides --percent if provided.",
+    )
+    _add_output_arguments(parser, "/mlpipeline-metrics.json")
+    parser.set_defaults(func=_run_metric)
+
+
+def _add_ui_parser(subparsers):
+    parser = subparsers.add_parser(
+        "ui",
+        help="write a vis to mlpipeline-ui-metadata.json.",
+        description="Writes a kubeflow pipeline ui metadata output, same as the "
+        "`kfx.vis` helpers.",
+    )
+    vis_parsers = parser.add_subparsers(dest="vis_type")
+    vis_parsers.required = True
+
+    for command, vis_type, help_text in [
+        ("markdown", "markdown", "markdown from a remote or inline source."),
+        ("table", "table", "table from a csv artifact."),
+        ("confusion-matrix", "confusion_matrix", "confusion matrix from a csv."),
+        ("roc", "roc", "roc curve from a csv artifact."),
+        ("tensorboard", "tensorboard", "tensorboard viewer for logs."),
+        ("web-app", "web-app", "web app from a remote or inline html."),
+    ]:
+        vis_parser = vis_parsers.add_parser(command, help=help_text)
+        vis_parser.add_argument(
+            "source", help="full path to the data, or '-' to read from stdin."
+        )
+        vis_parser.add_argument(
+            "--storage", default=None, help="storage medium of the source."
+        )
+        if vis_type in {"markdown", "web-app"}:
+            vis_parser.add_argument(
+                "--inline",
+                action="store_true",
+                help="source is the actual content. Same as --storage inline.",
+            )
+        if vis_type in {"table", "confusion_matrix", "roc"}:
+            vis_parser.add_argument(
+                "--format",
+                dest="artifact_format",
+                default="csv",
+                help="data format for the artifact. Defaults to 'csv'.",
+            )
+        if vis_type == "table":
+            vis_parser.add_argument(
+                "--header", nargs="+", required=True, help="headers for the table."
+            )
+        if vis_type == "confusion_matrix":
+            vis_parser.add_argument(
+                "--labels",
+                nargs="+",
+                required=True,
+                help="names of the classes plotted on the x and y axes.",
+            )
+        _add_output_arguments(vis_parser, "/mlpipeline-ui-metadata.json")
+        vis_parser.set_defaults(func=_run_ui, vis_type=vis_type)
+
+
+def _add_validate_parser(subparsers):
+    parser = subparsers.add_parser(
+        "validate",
+        help="validate mlpipeline-ui-metadata.json files against the json schema.",
+        description="Validates mlpipeline-ui-metadata.json files against the "
+        "kubeflow pipeline ui metadata json schema, and prints a json summary.",
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="files or directories (searched recursively)."
+    )
+    parser.add_argument(
+        "--pattern",
+        default="*.json",
+        help="glob pattern for files inside directories. Defaults to '*.json'.",
+    )
+    parser.add_argument(
+        "--schema",
+        default=None,
+        help="path to a json schema. Defaults to the schema of kfx.vis.models.KfpUiMetadata.",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes. Defaults to the number of cpus.",
+    )
+    parser.add_argument(
+        "--only-invalid",
+        action="store_true",
+        help="only report files that failed validation.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "jsonl"],
+        default="json",
+        help="'json' prints a single summary object, 'jsonl' prints one result "
+        "per line. Defaults to 'json'.",
+    )
+    parser.add_argument(
+        "-o", "--output", default="-", help="output path. Defaults to stdout."
+    )
+    parser.set_defaults(func=_run_validate)
+
+
+def _add_compile_parser(subparsers):
+    parser = subparsers.add_parser(
+        "compile",
+        help="compile kubeflow pipelines in parallel with kfx transforms.",
+        description="Compiles kubeflow pipeline functions across a process pool, "
+        "applying the kfx transforms on all ops, and prints the timing of each "
+        "pipeline.",
+    )
+    parser.add_argument(
+        "pipelines", nargs="+", help="pipeline functions as 'module:function'."
+    )
+    parser.add_argument(
+        "-t",
+        "--transform",
+        action="append",
+        help="yaml or json of a ContainerOpTransform (see "
+        "ContainerOpTransform.to_yaml), or a transform as 'module:attribute'. "
+        "Can be repeated.",
+    )
+    parser.add_argument(
+        "-d",
+        "--output-dir",
+        default=".",
+        help="directory for the workflow yamls. Defaults to '.'.",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes. Defaults to the number of cpus.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "jsonl"],
+        default="json",
+        help="'json' prints a single summary object, 'jsonl' prints one result "
+        "per line as soon as each pipeline is compiled. Defaults to 'json'.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="directory of the compile cache. Pipelines are always compiled if "
+        "not provided.",
+    )
+    parser.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        default=256 << 20,
+        help="maximum size of the compile cache. Defaults to 256 MiB.",
+    )
+    parser.add_argument(
+        "-o", "--output", default="-", help="output path. Defaults to stdout."
+    )
+    parser.set_defaults(func=_run_compile)
+
+
+def _add_prebuild_parser(subparsers):
+    parser = subparsers.add_parser(
+        "prebuild",
+        help="write docker build contexts for the packages_to_install of pipelines.",
+        description="Collects the base images and packages_to_install of the ops in "
+        "compiled pipelines, and writes a docker build context for each unique "
+        "combination, and an images.json manifest for "
+        "ContainerOpTransform.use_prebuilt_images.",
+    )
+    parser.add_argument("workflows", nargs="+", help="compiled workflow yamls.")
+    parser.add_argument(
+        "-r",
+        "--repository",
+        required=True,
+        help="image repository of the prebuilt images.",
+    )
+    parser.add_argument(
+        "-d",
+        "--output-dir",
+        default="prebuilt-images",
+        help="directory of the build contexts. Defaults to 'prebuilt-images'.",
+    )
+    parser.set_defaults(func=_run_prebuild)
+
+
+def _add_index_parser(subparsers):
+    parser = subparsers.add_parser(
+        "index",
+        help="index the artifact keys of every op output in compiled pipelines.",
+        description="Computes the templated artifact key, uri and ui url of every "
+        "op output in compiled pipelines, and writes them as json, or into a "
+        "sqlite database if the output ends with .db, .sqlite or .sqlite3.",
+    )
+    parser.add_argument("workflows", nargs="+", help="compiled workflow yamls.")
+    parser.add_argument(
+        "--scheme", required=True, help="storage scheme, e.g. s3, minio, gcs."
+    )
+    parser.add_argument("--bucket", required=True, help="name of the bucket.")
+    parser.add_argument(
+        "--key-prefix",
+        default="",
+        help="key prefix of the argo artifact repository. Defaults to ''.",
+    )
+    parser.add_argument(
+        "--key-format",
+        default="",
+        help="key format of the argo artifact repository. Overrides --key-prefix.",
+    )
+    parser.add_argument(
+        "--ui-prefix",
+        default="/pipeline",
+        help="path prefix of the kubeflow pipelines ui. Defaults to '/pipeline'.",
+    )
+    parser.add_argument(
+        "-o", "--output", default="-", help="output path. Defaults to stdout."
+    )
+    parser.set_defaults(func=_run_index)
+
+
+def _add_prefetch_parser(subparsers):
+    parser = subparsers.add_parser(
+        "prefetch",
+        help="download input artifacts concurrently into a local directory.",
+        description="Downloads input artifacts concurrently with a bounded pool of "
+        "workers and pooled connections, logs the progress and throughput, and "
+        "prints a json summary.",
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="uris to download, as 'name=uri' or 'uri' (saved as its basename).",
+    )
+    parser.add_argument(
+        "-d",
+        "--output-dir",
+        default=".",
+        help="directory of the downloaded files. Defaults to '.'.",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=8,
+        help="maximum number of concurrent downloads. Defaults to 8.",
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="download the inputs that are already in the output directory.",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="only log failed downloads."
+    )
+    parser.set_defaults(func=_run_prefetch)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Returns the argument parser for the kfx cli."""
+    parser = argparse.ArgumentParser(
+        prog="kfx", description="Extensions for kubeflow pipeline sdk."
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+    _add_metric_parser(subparsers)
+    _add_ui_parser(subparsers)
+    _add_validate_parser(subparsers)
+    _add_compile_parser(subparsers)
+    _add_prebuild_parser(subparsers)
+    _add_prefetch_parser(subparsers)
+    _add_index_parser(subparsers)
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    """Entry point for the kfx cli.
+
+    Args:
+        argv (List[str], optional): cli arguments. Defaults to `sys.argv[1:]`.
+
+    Returns:
+        int: exit code.
+    """
+    args = get_parser().parse_args(argv)
+    return args.func(args)
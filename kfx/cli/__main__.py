@@ -0,0 +1,6 @@
+"""Runs the kfx cli with `python -m kfx.cli`."""
+import sys
+
+from kfx.cli import main
+
+sys.exit(main())
@@ -0,0 +1,79 @@
+"""Compiles many kubeflow pipelines in parallel with kfx transforms."""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+
+def load_transform(path: str) -> Any:
+    """Returns a transform from a yaml/json spec file, or a "module:attribute" path.
+
+    Args:
+        path (str): path to the yaml or json of `ContainerOpTransform.to_dict`, or
+            import path to a transform.
+
+    Returns:
+        Any: the spec dict, or the import path.
+    """
+    if not os.path.isfile(path):
+        return path
+    with open(path, "r") as filein:
+        if path.endswith(".json"):
+            return json.load(filein)
+        import yaml  # pylint: disable=import-outside-toplevel
+
+        return yaml.safe_load(filein) or {}
+
+
+def run_compile(args: argparse.Namespace) -> int:
+    """Runs the `kfx compile` sub-command.
+
+    Returns:
+        int: 0 if all pipelines are compiled, otherwise 1.
+    """
+    from kfx.dsl import (  # pylint: disable=import-outside-toplevel
+        CompileCache,
+        CompileJob,
+        compile_pipelines,
+    )
+
+    transforms = [load_transform(path) for path in args.transform or []]
+    jobs = [CompileJob(pipeline, transforms) for pipeline in args.pipelines]
+    cache = (
+        CompileCache(args.cache_dir, max_bytes=args.cache_max_bytes)
+        if args.cache_dir
+        else None
+    )
+    results = compile_pipelines(
+        jobs, args.output_dir, workers=args.workers, cache=cache
+    )
+
+    started = time.perf_counter()
+    fileout = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        completed: List[Dict[str, Any]] = []
+        for result in results:
+            completed.append(result)
+            if args.format == "jsonl":
+                fileout.write(json.dumps(result) + "\n")
+                fileout.flush()
+        failed = sum(result["error"] is not None for result in completed)
+        if args.format == "json":
+            summary = {
+                "pipelines": len(completed),
+                "failed": failed,
+                "cached": sum(result["cached"] for result in completed),
+                # wall time, and the sum of the compile time of each pipeline
+                "elapsed": round(time.perf_counter() - started, 6),
+                "seconds": round(sum(result["seconds"] for result in completed), 6),
+                "results": sorted(completed, key=lambda result: result["index"]),
+            }
+            json.dump(summary, fileout, indent=2)
+            fileout.write("\n")
+    finally:
+        if fileout is not sys.stdout:
+            fileout.close()
+
+    return 1 if failed else 0
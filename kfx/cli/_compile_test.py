@@ -0,0 +1,53 @@
+"""Tests for kfx.cli._compile."""
+import json
+
+from kfx.cli import main
+from kfx.dsl._transformers import ContainerOpTransform
+
+
+def test_cli_compile(tmp_path):
+    spec = tmp_path / "transform.yaml"
+    spec.write_text(ContainerOpTransform().set_resources(cpu="1").to_yaml())
+    output = tmp_path / "summary.json"
+
+    exit_code = main(
+        [
+            "compile",
+            "kfx.dsl._compiler_test:echo_pipeline",
+            "-t",
+            str(spec),
+            "-t",
+            "kfx.dsl._compiler_test:set_label",
+            "-d",
+            str(tmp_path / "dist"),
+            "-j",
+            "1",
+            "-o",
+            str(output),
+        ]
+    )
+    summary = json.loads(output.read_text())
+    assert exit_code == 0
+    assert summary["pipelines"] == 1
+    assert summary["failed"] == 0
+    assert summary["results"][0]["name"] == "echo_pipeline"
+    assert "cpu: '1'" in (tmp_path / "dist" / "echo_pipeline.yaml").read_text()
+
+    output = tmp_path / "results.jsonl"
+    exit_code = main(
+        [
+            "compile",
+            "kfx.dsl._compiler_test:echo_pipeline",
+            "kfx.dsl._compiler_test:broken_pipeline",
+            "-d",
+            str(tmp_path / "dist"),
+            "-j",
+            "2",
+            "--format",
+            "jsonl",
+            "-o",
+            str(output),
+        ]
+    )
+    assert exit_code == 1
+    assert len(output.read_text().splitlines()) == 2
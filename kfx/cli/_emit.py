@@ -0,0 +1,226 @@
+"""Builds kubeflow pipeline metrics and ui metadata documents without pydantic.
+
+The documents are identical to the ones created with `kfx.vis.kfp_metrics`,
+`kfx.vis.kfp_ui_metadata` and the `kfx.vis` helpers. This module must only use
+the standard library, so that the cli starts quickly inside non-python steps.
+"""
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional, Union
+
+KFP_METRICS_PATH = "/mlpipeline-metrics.json"
+KFP_UI_METADATA_PATH = "/mlpipeline-ui-metadata.json"
+
+# mirrors the defaults of the models in `kfx.vis.models`
+_DEFAULT_SCHEMAS = {
+    "confusion_matrix": [
+        {"name": "target", "type": "CATEGORY"},
+        {"name": "predicted", "type": "CATEGORY"},
+        {"name": "count", "type": "NUMBER"},
+    ],
+    "roc": [
+        {"name": "fpr", "type": "NUMBER"},
+        {"name": "tpr", "type": "NUMBER"},
+        {"name": "thresholds", "type": "NUMBER"},
+    ],
+}
+_FORMATTED_TYPES = {"confusion_matrix", "roc", "table"}
+# same as the name regex of `kfx.vis.models.KfpMetric`
+_METRIC_NAME = re.compile(r"^[a-z]([-a-z0-9]{0,62}[a-z0-9])?$")
+
+
+def _parse_number(value: str) -> Union[int, float]:
+    try:
+        return int(value)
+    except ValueError:
+        number = float(value)
+    if not math.isfinite(number):
+        raise ValueError("metric value must be a finite number: %s" % value)
+    return number
+
+
+def kfp_metric(
+    name: str,
+    value: Union[float, int],
+    percent: bool = False,
+    metric_format: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Returns the same dict as `kfx.vis.asdict(kfx.vis.kfp_metric(...))`.
+
+    Args:
+        name (str): Name of the metric.
+        value (Union[float, int]): Numerical value of the metric.
+        percent (bool, optional): Set to True to render value as percentage.
+            Defaults to False.
+        metric_format (Optional[str], optional): "PERCENTAGE" or "RAW". Overrides
+            "percent" flag if provided. Defaults to None.
+
+    Raises:
+        ValueError: if the name is invalid, or the value is nan or infinite.
+
+    Returns:
+        Dict[str, Any]: kubeflow pipeline metric.
+    """
+    if not _METRIC_NAME.match(name):
+        raise ValueError("metric name must match %s: %s" % (_METRIC_NAME.pattern, name))
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError("metric value must be a finite number: %s" % value)
+    if not metric_format and percent:
+        metric_format = "PERCENTAGE"
+    metric: Dict[str, Any] = {"name": name, "numberValue": value}
+    if metric_format:
+        metric["format"] = metric_format
+    return metric
+
+
+def kfp_ui_output(  # pylint: disable=too-many-arguments
+    vis_type: str,
+    source: str,
+    storage: Optional[str] = None,
+    header: Optional[List[str]] = None,
+    labels: Optional[List[str]] = None,
+    artifact_format: str = "csv",
+) -> Dict[str, Any]:
+    """Returns the same dict as `kfx.vis.asdict` of the equivalent `kfx.vis` helper.
+
+    Args:
+        vis_type (str): One of confusion_matrix, markdown, roc, table,
+            tensorboard, or web-app.
+        source (str): Full path to the data, or the inlined data.
+        storage (Optional[str], optional): Set "inline" if source has the actual
+            data. Defaults to None.
+        header (Optional[List[str]], optional): Headers for a table. Defaults to None.
+        labels (Optional[List[str]], optional): Labels for a confusion matrix.
+            Defaults to None.
+        artifact_format (str, optional): Data format for the artifact.
+            Defaults to "csv".
+
+    Returns:
+        Dict[str, Any]: kubeflow pipeline ui metadata output.
+    """
+    # same key order as the fields of `kfx.vis.models.KfpVis`
+    output: Dict[str, Any] = {}
+    if vis_type in _FORMATTED_TYPES:
+        output["format"] = artifact_format
+    if header is not None:
+        output["header"] = header
+    if labels is not None:
+        output["labels"] = labels
+    if vis_type in _DEFAULT_SCHEMAS:
+        output["schema"] = _DEFAULT_SCHEMAS[vis_type]
+    output["source"] = source
+    if storage:
+        output["storage"] = storage
+    output["type"] = vis_type
+    return output
+
+
+def _read_document(path: str) -> Dict[str, Any]:
+    if path == "-" or not os.path.exists(path) or not os.path.getsize(path):
+        return {}
+    with open(path, "r") as filein:
+        return json.load(filein)
+
+
+def _write_document(document: Dict[str, Any], path: str):
+    if path == "-":
+        sys.stdout.write(json.dumps(document) + "\n")
+        return
+    # write to a temp file first, so that a failed write never corrupts the
+    # existing document
+    dirname = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(
+        "w", dir=dirname, prefix=".kfx-", delete=False
+    ) as fileout:
+        fileout.write(json.dumps(document))
+    os.replace(fileout.name, path)
+
+
+def append_metrics(
+    metrics: List[Dict[str, Any]], path: str = KFP_METRICS_PATH, append: bool = False
+) -> Dict[str, Any]:
+    """Writes the metrics to a `mlpipeline-metrics.json` document.
+
+    Args:
+        metrics (List[Dict[str, Any]]): metrics from `kfp_metric`.
+        path (str, optional): Destination path, or "-" for stdout.
+            Defaults to "/mlpipeline-metrics.json".
+        append (bool, optional): Whether to add to the metrics in an existing
+            document. Existing metrics with the same name are replaced.
+            Defaults to False.
+
+    Returns:
+        Dict[str, Any]: the document written.
+    """
+    existing = _read_document(path).get("metrics", []) if append else []
+    names = {metric["name"] for metric in metrics}
+    document = {
+        "metrics": [metric for metric in existing if metric["name"] not in names]
+        + metrics
+    }
+    _write_document(document, path)
+    return document
+
+
+def append_ui_outputs(
+    outputs: List[Dict[str, Any]],
+    path: str = KFP_UI_METADATA_PATH,
+    append: bool = False,
+) -> Dict[str, Any]:
+    """Writes the outputs to a `mlpipeline-ui-metadata.json` document.
+
+    Args:
+        outputs (List[Dict[str, Any]]): outputs from `kfp_ui_output`.
+        path (str, optional): Destination path, or "-" for stdout.
+            Defaults to "/mlpipeline-ui-metadata.json".
+        append (bool, optional): Whether to add to the outputs in an existing
+            document. Defaults to False.
+
+    Returns:
+        Dict[str, Any]: the document written.
+    """
+    existing = _read_document(path) if append else {}
+    document = {
+        "version": existing.get("version", 1),
+        "outputs": existing.get("outputs", []) + outputs,
+    }
+    _write_document(document, path)
+    return document
+
+
+def run_metric(args: argparse.Namespace) -> int:
+    """Runs the `kfx metric` sub-command.
+
+    Returns:
+        int: 0 if the metric is written, 2 if the name or value is invalid.
+    """
+    try:
+        metric = kfp_metric(
+            args.name, _parse_number(args.value), args.percent, args.metric_format
+        )
+    except ValueError as error:
+        sys.stderr.write("kfx metric: error: %s\n" % error)
+        return 2
+    append_metrics([metric], args.output, args.append)
+    return 0
+
+
+def run_ui(args: argparse.Namespace) -> int:
+    """Runs the `kfx ui` sub-command."""
+    source = sys.stdin.read() if args.source == "-" else args.source
+    storage = "inline" if getattr(args, "inline", False) else args.storage
+    output = kfp_ui_output(
+        args.vis_type,
+        source,
+        storage=storage,
+        header=getattr(args, "header", None),
+        labels=getattr(args, "labels", None),
+        artifact_format=getattr(args, "artifact_format", "csv"),
+    )
+    append_ui_outputs([output], args.output, args.append)
+    return 0
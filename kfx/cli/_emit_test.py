@@ -0,0 +1,131 @@
+"""Tests for kfx.cli._emit."""
+import io
+import json
+import subprocess
+import sys
+
+import pytest
+
+import kfx.vis
+from kfx.cli import main
+from kfx.cli._emit import kfp_metric, kfp_ui_output
+
+
+def test_kfp_metric_same_as_vis_helper():
+    for args, kwargs in [
+        (("foo-bar1", 1.0, True), {}),
+        (("foo-bar2", 1000), {"metric_format": "RAW"}),
+        (("foo-bar3", 1000.0), {}),
+    ]:
+        assert kfp_metric(*args, **kwargs) == kfx.vis.asdict(
+            kfx.vis.kfp_metric(*args, **kwargs)
+        )
+
+
+@pytest.mark.parametrize(
+    "output,expected",
+    [
+        (
+            kfp_ui_output("confusion_matrix", "gs://cm.csv", labels=["a", "b"]),
+            kfx.vis.confusion_matrix("gs://cm.csv", labels=["a", "b"]),
+        ),
+        (
+            kfp_ui_output("markdown", "# hello", storage="inline"),
+            kfx.vis.markdown("# hello", storage="inline"),
+        ),
+        (kfp_ui_output("roc", "gs://roc.csv"), kfx.vis.roc("gs://roc.csv")),
+        (
+            kfp_ui_output("table", "gs://t.csv", storage="gcs", header=["a", "b"]),
+            kfx.vis.table("gs://t.csv", header=["a", "b"], storage="gcs"),
+        ),
+        (
+            kfp_ui_output("tensorboard", "gs://logs/*"),
+            kfx.vis.tensorboard("gs://logs/*"),
+        ),
+        (
+            kfp_ui_output("web-app", "<html></html>", storage="inline"),
+            kfx.vis.web_app("<html></html>", storage="inline"),
+        ),
+    ],
+)
+def test_kfp_ui_output_same_as_vis_helper(output, expected):
+    assert json.dumps(output) == kfx.vis.asjson(expected)
+
+
+@pytest.mark.parametrize(
+    "name,value", [("Recall", "0.9"), ("loss-", "1"), ("loss", "nan"), ("f1", "inf")]
+)
+def test_cli_metric_invalid(name, value, tmp_path, capsys):
+    output = tmp_path / "mlpipeline-metrics.json"
+
+    assert main(["metric", name, value, "-o", str(output)]) == 2
+    assert "kfx metric: error" in capsys.readouterr().err
+    assert not output.exists()
+    with pytest.raises(ValueError):
+        kfp_metric(name, float(value))
+
+
+def test_cli_metric_append(tmp_path):
+    output = str(tmp_path / "mlpipeline-metrics.json")
+
+    assert main(["metric", "recall", "0.9", "--percent", "-o", output]) == 0
+    assert main(["metric", "loss", "2", "-o", output, "--append"]) == 0
+    assert main(["metric", "recall", "0.8", "--format", "RAW", "-o", output, "-a"]) == 0
+
+    with open(output) as filein:
+        assert json.load(filein) == {
+            "metrics": [
+                {"name": "loss", "numberValue": 2},
+                {"name": "recall", "numberValue": 0.8, "format": "RAW"},
+            ]
+        }
+
+
+def test_cli_ui_append(tmp_path, monkeypatch):
+    output = str(tmp_path / "mlpipeline-ui-metadata.json")
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO("# report"))
+    assert main(["ui", "markdown", "-", "--inline", "-o", output]) == 0
+    assert (
+        main(
+            [
+                "ui",
+                "confusion-matrix",
+                "gs://cm.csv",
+                "--labels",
+                "a",
+                "b",
+                "-o",
+                output,
+                "-a",
+            ]
+        )
+        == 0
+    )
+
+    with open(output) as filein:
+        assert json.load(filein) == kfx.vis.asdict(
+            kfx.vis.kfp_ui_metadata(
+                [
+                    kfx.vis.markdown("# report", storage="inline"),
+                    kfx.vis.confusion_matrix("gs://cm.csv", labels=["a", "b"]),
+                ]
+            )
+        )
+
+
+def test_cli_does_not_import_heavy_modules():
+    script = (
+        "import sys;"
+        "from kfx.cli import main;"
+        "main(['metric', 'recall', '0.9', '-o', '-']);"
+        "main(['ui', 'markdown', '# hi', '--inline', '-o', '-']);"
+        "print(sorted({m.split('.')[0] for m in sys.modules} & {'pydantic', 'kfp', 'kubernetes'}))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    assert result.stdout.splitlines()[-1] == "[]"
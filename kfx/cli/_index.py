@@ -0,0 +1,34 @@
+"""Writes the artifact keys of every op output in compiled pipelines."""
+import argparse
+import json
+import sys
+
+
+def run_index(args: argparse.Namespace) -> int:
+    """Runs the `kfx index` sub-command.
+
+    Prints the index as json if the output is "-".
+
+    Returns:
+        int: exit code.
+    """
+    from kfx.dsl import (  # pylint: disable=import-outside-toplevel
+        ArtifactLocationHelper,
+        build_artifact_index,
+        write_artifact_index,
+    )
+
+    helper = ArtifactLocationHelper(
+        args.scheme, args.bucket, key_prefix=args.key_prefix, key_format=args.key_format
+    )
+    entries = [
+        entry
+        for workflow in args.workflows
+        for entry in build_artifact_index(workflow, helper, ui_prefix=args.ui_prefix)
+    ]
+    if args.output == "-":
+        json.dump(entries, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        write_artifact_index(entries, args.output)
+    return 0
@@ -0,0 +1,25 @@
+"""Tests for kfx.cli._index."""
+import json
+
+from kfx.cli import main
+from kfx.dsl._artifact_index import load_artifact_index
+from kfx.dsl._artifact_index_test import indexed_pipeline
+from kfx.dsl._compiler import compile_pipeline
+
+
+def test_cli_index(tmp_path, capsys):
+    path = str(tmp_path / "pipeline.yaml")
+    compile_pipeline(indexed_pipeline, path)
+
+    exit_code = main(["index", path, "--scheme", "minio", "--bucket", "mlpipeline"])
+    entries = json.loads(capsys.readouterr().out)
+    assert exit_code == 0
+    assert {entry["artifact"] for entry in entries} == {
+        "train-model-model",
+        "train-model-metrics",
+    }
+
+    database = str(tmp_path / "index.sqlite")
+    args = ["index", path, "--scheme", "s3", "--bucket", "b", "-o", database]
+    assert main(args) == 0
+    assert len(load_artifact_index(database)) == 2
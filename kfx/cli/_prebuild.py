@@ -0,0 +1,24 @@
+"""Writes docker build contexts for the packages_to_install of compiled pipelines."""
+import argparse
+import json
+import sys
+
+
+def run_prebuild(args: argparse.Namespace) -> int:
+    """Runs the `kfx prebuild` sub-command.
+
+    Prints the manifest of the prebuilt images.
+
+    Returns:
+        int: exit code.
+    """
+    from kfx.dsl import (  # pylint: disable=import-outside-toplevel
+        collect_images,
+        write_build_contexts,
+    )
+
+    images = collect_images(args.workflows, args.repository)
+    manifest = write_build_contexts(images, args.output_dir)
+    json.dump(manifest, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
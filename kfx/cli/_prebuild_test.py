@@ -0,0 +1,19 @@
+"""Tests for kfx.cli._prebuild."""
+import json
+
+from kfx.cli import main
+from kfx.dsl._compiler import compile_pipeline
+from kfx.dsl._prebuilt_images_test import prebuilt_pipeline
+
+
+def test_cli_prebuild(tmp_path, capsys):
+    path = str(tmp_path / "pipeline.yaml")
+    compile_pipeline(prebuilt_pipeline, path)
+
+    exit_code = main(
+        ["prebuild", path, "-r", "registry/prebuilt", "-d", str(tmp_path / "build")]
+    )
+    manifest = json.loads(capsys.readouterr().out)
+    assert exit_code == 0
+    assert [item["packages"] for item in manifest["images"]] == [["kfx", "numpy==1.19"]]
+    assert (tmp_path / "build" / manifest["images"][0]["context"]).is_dir()
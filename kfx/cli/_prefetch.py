@@ -0,0 +1,38 @@
+"""Downloads the input artifacts of a task concurrently into a local directory."""
+import argparse
+import json
+import logging
+import sys
+
+
+def run_prefetch(args: argparse.Namespace) -> int:
+    """Runs the `kfx prefetch` sub-command.
+
+    Logs the progress to stderr, and prints a json summary of the downloads.
+
+    Returns:
+        int: 0 if all inputs are downloaded, otherwise 1.
+    """
+    from kfx.dsl import prefetch  # pylint: disable=import-outside-toplevel
+
+    logging.basicConfig(
+        level=logging.WARNING if args.quiet else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+        stream=sys.stderr,
+    )
+    results = prefetch(
+        args.inputs, args.output_dir, max_workers=args.workers, overwrite=args.overwrite
+    )
+    failed = [result for result in results if result["error"]]
+    json.dump(
+        {
+            "inputs": len(results),
+            "failed": len(failed),
+            "bytes": sum(result["bytes"] for result in results),
+            "results": results,
+        },
+        sys.stdout,
+        indent=2,
+    )
+    sys.stdout.write("\n")
+    return 1 if failed else 0
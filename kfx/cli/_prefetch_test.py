@@ -0,0 +1,22 @@
+"""Tests for kfx.cli._prefetch."""
+import json
+
+from kfx.cli import main
+
+
+def test_cli_prefetch(tmp_path, capsys):
+    source = tmp_path / "data.csv"
+    source.write_text("a,b\n")
+    output_dir = tmp_path / "prefetch"
+
+    exit_code = main(
+        ["prefetch", "-q", "-d", str(output_dir), "-j", "2", "in.csv=%s" % source]
+    )
+    summary = json.loads(capsys.readouterr().out)
+    assert exit_code == 0
+    assert summary["inputs"] == 1 and summary["failed"] == 0
+    assert (output_dir / "in.csv").read_text() == "a,b\n"
+
+    exit_code = main(["prefetch", "-q", "-d", str(output_dir), str(tmp_path / "x")])
+    assert exit_code == 1
+    assert json.loads(capsys.readouterr().out)["failed"] == 1
@@ -0,0 +1,243 @@
+"""Validates kubeflow pipeline ui metadata files against the json schema."""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatch
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+MAX_MESSAGE_LENGTH = 200
+
+# validator compiled once per process by `_init_worker`
+_VALIDATOR: Any = None
+
+
+def load_schema(path: Optional[str] = None) -> dict:
+    """Returns the json schema for kubeflow pipeline ui metadata.
+
+    Args:
+        path (Optional[str], optional): Path to a json schema (e.g.
+            `schema/kfp-ui-metadata.schema.json`). Defaults to the schema of
+            `kfx.vis.models.KfpUiMetadata`.
+
+    Returns:
+        dict: json schema.
+    """
+    if path:
+        with open(path, "r") as filein:
+            return json.load(filein)
+
+    import kfx.vis.models  # pylint: disable=import-outside-toplevel
+
+    schema = kfx.vis.models.KfpUiMetadata.schema()
+    # newer pydantic drops `const` for enum fields - pin the vis type of each
+    # output model, so that an output is only validated against its own type.
+    for name, definition in schema["definitions"].items():
+        model = getattr(kfx.vis.models, name, None)
+        if model is not None and issubclass(model, kfx.vis.models.KfpVis):
+            definition["properties"]["type"]["const"] = model.__fields__[
+                "type"
+            ].default.value
+    return schema
+
+
+def compile_validator(schema: dict) -> Any:
+    """Returns a jsonschema validator for the schema.
+
+    Args:
+        schema (dict): json schema.
+
+    Returns:
+        Any: a `jsonschema` validator object.
+    """
+    try:
+        import jsonschema  # pylint: disable=import-outside-toplevel
+    except ImportError as error:  # pragma: no cover
+        raise ImportError(
+            "`jsonschema` is required to validate ui metadata: pip install kfx[validate]"
+        ) from error
+
+    validator_cls = jsonschema.validators.validator_for(schema)
+    validator_cls.check_schema(schema)
+    return validator_cls(schema)
+
+
+def _init_worker(schema: dict):
+    global _VALIDATOR  # pylint: disable=global-statement
+    _VALIDATOR = compile_validator(schema)
+
+
+def _truncate(message: str) -> str:
+    if len(message) <= MAX_MESSAGE_LENGTH:
+        return message
+    return message[: MAX_MESSAGE_LENGTH - 3] + "..."
+
+
+def _flatten_errors(errors: Iterable[Any]) -> Iterator[Dict[str, str]]:
+    """Yields the errors most likely to explain why validation failed.
+
+    For `anyOf` errors (e.g. each item in `outputs`), only the errors of the
+    sub-schema the instance was most likely meant for are reported - i.e. the
+    sub-schema whose `const` (the vis type) matched, with the fewest errors.
+    """
+    for error in errors:
+        if error.context:
+            branches: Dict[Any, List[Any]] = {}
+            for suberror in error.context:
+                branches.setdefault(suberror.schema_path[0], []).append(suberror)
+            yield from _flatten_errors(
+                min(
+                    branches.values(),
+                    key=lambda branch: (
+                        any(suberror.validator == "const" for suberror in branch),
+                        len(branch),
+                    ),
+                )
+            )
+        else:
+            yield {
+                "path": "/".join(str(item) for item in error.absolute_path),
+                "message": _truncate(error.message),
+            }
+
+
+def validate_file(path: str) -> Dict[str, Any]:
+    """Validates a single file with the validator of the current process.
+
+    Args:
+        path (str): Path to the ui metadata file.
+
+    Returns:
+        Dict[str, Any]: path, size, validity and errors of the file.
+    """
+    result: Dict[str, Any] = {"path": path, "size": None, "valid": False}
+    try:
+        result["size"] = os.path.getsize(path)
+        with open(path, "rb") as filein:
+            instance = json.load(filein)
+    except (OSError, ValueError) as error:
+        result["errors"] = [{"path": "", "message": _truncate(str(error))}]
+        return result
+
+    errors = sorted(
+        _flatten_errors(_VALIDATOR.iter_errors(instance)),
+        key=lambda error: error["path"],
+    )
+    result["valid"] = not errors
+    result["errors"] = errors
+    return result
+
+
+def iter_files(paths: Iterable[str], pattern: str = "*.json") -> Iterator[str]:
+    """Yields the files, and the files in the directories matching the pattern.
+
+    Args:
+        paths (Iterable[str]): files or directories (searched recursively).
+        pattern (str, optional): glob pattern for files inside directories.
+            Defaults to "*.json".
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if fnmatch(name, pattern):
+                    yield os.path.join(root, name)
+
+
+def validate_files(
+    paths: Iterable[str],
+    schema: Optional[dict] = None,
+    workers: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Validates many files in parallel across a process pool.
+
+    The schema validator is compiled once per worker process.
+
+    Args:
+        paths (Iterable[str]): paths to the ui metadata files.
+        schema (Optional[dict], optional): json schema. Defaults to the schema of
+            `kfx.vis.models.KfpUiMetadata`.
+        workers (Optional[int], optional): number of worker processes. Validates
+            in the current process if 1. Defaults to the number of cpus.
+
+    Yields:
+        Dict[str, Any]: result for each file, in the same order as the paths.
+    """
+    schema = schema or load_schema()
+    paths = list(paths)
+
+    if workers == 1 or len(paths) <= 1:
+        _init_worker(schema)
+        yield from map(validate_file, paths)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(schema,)
+    ) as executor:
+        chunksize = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 4))
+        yield from executor.map(validate_file, paths, chunksize=chunksize)
+
+
+def summarize(
+    results: Iterable[Dict[str, Any]], only_invalid: bool = False
+) -> Dict[str, Any]:
+    """Returns a machine-readable summary of the validation results.
+
+    Args:
+        results (Iterable[Dict[str, Any]]): results from `validate_files`.
+        only_invalid (bool, optional): only include invalid files in the
+            results. Defaults to False.
+
+    Returns:
+        Dict[str, Any]: counts, total size and results of the files.
+    """
+    summary: Dict[str, Any] = {
+        "files": 0,
+        "valid": 0,
+        "invalid": 0,
+        "bytes": 0,
+        "results": [],
+    }
+    for result in results:
+        summary["files"] += 1
+        summary["bytes"] += result["size"] or 0
+        summary["valid" if result["valid"] else "invalid"] += 1
+        if not (only_invalid and result["valid"]):
+            summary["results"].append(result)
+    return summary
+
+
+def run_validate(args: argparse.Namespace) -> int:
+    """Runs the `kfx validate` sub-command.
+
+    Returns:
+        int: 0 if all files are valid, otherwise 1.
+    """
+    results = validate_files(
+        iter_files(args.paths, args.pattern),
+        schema=load_schema(args.schema),
+        workers=args.workers,
+    )
+
+    fileout = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        if args.format == "jsonl":
+            invalid = 0
+            for result in results:
+                invalid += not result["valid"]
+                if not (args.only_invalid and result["valid"]):
+                    fileout.write(json.dumps(result) + "\n")
+        else:
+            summary = summarize(results, args.only_invalid)
+            invalid = summary["invalid"]
+            json.dump(summary, fileout, indent=2)
+            fileout.write("\n")
+    finally:
+        if fileout is not sys.stdout:
+            fileout.close()
+
+    return 1 if invalid else 0
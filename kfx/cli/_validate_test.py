@@ -0,0 +1,92 @@
+"""Tests for kfx.cli._validate."""
+import json
+
+import pytest
+
+import kfx.vis
+from kfx.cli import main
+from kfx.cli._validate import iter_files, summarize, validate_files
+
+
+@pytest.fixture
+def metadata_dir(tmp_path):
+    valid = kfx.vis.kfp_ui_metadata(
+        [
+            kfx.vis.markdown("# hello", storage="inline"),
+            kfx.vis.table("gs://bucket/table.csv", header=["a", "b"]),
+        ]
+    )
+    (tmp_path / "run-1").mkdir()
+    (tmp_path / "run-1" / "mlpipeline-ui-metadata.json").write_text(
+        kfx.vis.asjson(valid)
+    )
+    (tmp_path / "run-2").mkdir()
+    (tmp_path / "run-2" / "mlpipeline-ui-metadata.json").write_text(
+        json.dumps({"outputs": [{"type": "table", "source": "gs://bucket/table.csv"}]})
+    )
+    (tmp_path / "run-2" / "broken.json").write_text("{")
+    (tmp_path / "run-2" / "notes.txt").write_text("not metadata")
+    return tmp_path
+
+
+def test_iter_files(metadata_dir):
+    assert [
+        path.replace(str(metadata_dir), "") for path in iter_files([str(metadata_dir)])
+    ] == [
+        "/run-1/mlpipeline-ui-metadata.json",
+        "/run-2/broken.json",
+        "/run-2/mlpipeline-ui-metadata.json",
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_validate_files(metadata_dir, workers):
+    results = list(validate_files(iter_files([str(metadata_dir)]), workers=workers))
+
+    assert [result["valid"] for result in results] == [True, False, False]
+    assert results[0]["errors"] == []
+    assert results[0]["size"] > 0
+    assert results[1]["errors"][0]["path"] == ""
+    assert results[2]["errors"] == [
+        {"path": "outputs/0", "message": "'header' is a required property"}
+    ]
+
+
+def test_summarize():
+    results = [
+        {"path": "a", "size": 10, "valid": True, "errors": []},
+        {"path": "b", "size": 5, "valid": False, "errors": [{}]},
+        {"path": "c", "size": None, "valid": False, "errors": [{}]},
+    ]
+    summary = summarize(results, only_invalid=True)
+    assert summary["files"] == 3
+    assert summary["valid"] == 1
+    assert summary["invalid"] == 2
+    assert summary["bytes"] == 15
+    assert [result["path"] for result in summary["results"]] == ["b", "c"]
+
+
+def test_cli_validate(metadata_dir, tmp_path):
+    output = tmp_path / "summary.json"
+    exit_code = main(
+        ["validate", str(metadata_dir / "run-1"), "-j", "1", "-o", str(output)]
+    )
+    assert exit_code == 0
+    assert json.loads(output.read_text())["valid"] == 1
+
+    output = tmp_path / "summary.jsonl"
+    exit_code = main(
+        [
+            "validate",
+            str(metadata_dir),
+            "-j",
+            "1",
+            "--format",
+            "jsonl",
+            "--only-invalid",
+            "-o",
+            str(output),
+        ]
+    )
+    assert exit_code == 1
+    assert len(output.read_text().splitlines()) == 2
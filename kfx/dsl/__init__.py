@@ -120,11 +120,35 @@ by a kfp task.
         op.apply(helper.set_envs())
 
 """
+from kfx.dsl._artifact_catalog import ArtifactCatalog
+from kfx.dsl._artifact_index import (
+    build_artifact_index,
+    load_artifact_index,
+    resolve_artifacts,
+    write_artifact_index,
+)
 from kfx.dsl._artifact_location import (
     ArtifactLocationHelper,
     KfpArtifact,
     WorkflowVars,
     set_pod_metadata_envs,
     set_workflow_env,
+    volume_path,
+)
+from kfx.dsl._compile_cache import CompileCache
+from kfx.dsl._compiler import (
+    CompileJob,
+    compile_pipeline,
+    compile_pipelines,
+    pipeline_key,
+)
+from kfx.dsl._image_lock import load_image_lock
+from kfx.dsl._pod_spec_patch import apply_pod_spec_patches, apply_pod_spec_patches_file
+from kfx.dsl._prebuilt_images import PrebuiltImage, collect_images, write_build_contexts
+from kfx.dsl._prefetch import prefetch, register_store
+from kfx.dsl._resource_profile import load_usage_profile
+from kfx.dsl._transformers import (
+    PREEMPTIBLE_TAINTS,
+    ContainerOpTransform,
+    register_step,
 )
-from kfx.dsl._transformers import ContainerOpTransform
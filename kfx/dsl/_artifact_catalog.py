@@ -0,0 +1,237 @@
+"""Append-only sqlite catalog of the artifacts produced by pipeline tasks.
+
+When the `WORKFLOW_ARTIFACT_CATALOG` env var is set (see
+`ArtifactLocationHelper.set_catalog`), `KfpArtifact.record` appends the artifact
+to the catalog with its key, storage, bucket, producing run and op, and the size
+and sha256 of its local file if any. Downstream analysis, cache lookups and
+cleanup jobs query the catalog instead of listing the object storage.
+
+NOTE
+Concurrent writers rely on the POSIX file locks of the filesystem. The catalog
+uses the rollback journal ("DELETE" journal mode), as the WAL mode needs shared
+memory and does not work on network filesystems. Many NFS servers (and NFSv3
+without `lockd`) do not implement the locks reliably - a warning is raised when
+the catalog is on such a filesystem. Prefer a volume with working locks (e.g.
+NFSv4, CephFS), or a single writer.
+
+::
+
+    with kfx.dsl.ArtifactCatalog("/mnt/kfx-artifacts/catalog.db") as catalog:
+        for artifact in catalog.find(run="train-pipeline-x7k2p", name="model"):
+            print(artifact["uri"], artifact["size"], artifact["sha256"])
+
+        # e.g. reuse the output of a previous run with the same content
+        cached = catalog.find(sha256=digest, limit=1)
+"""
+import hashlib
+import os
+import sqlite3
+import time
+import warnings
+from typing import Any, Dict, List, Optional, Tuple
+
+COLUMNS = (
+    "id",
+    "created",
+    "run",
+    "op",
+    "name",
+    "key",
+    "storage",
+    "bucket",
+    "uri",
+    "size",
+    "sha256",
+)
+_FILTERS = ("run", "op", "name", "key", "sha256")
+# distinct from the table of `kfx.dsl.write_artifact_index`, which can share the
+# database
+TABLE = "artifact_catalog"
+_JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "WAL")
+# filesystems where the sqlite file locks are often unreliable
+_NETWORK_FILESYSTEMS = ("nfs", "nfs4", "cifs", "smb3", "smbfs")
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    run TEXT,
+    op TEXT,
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    storage TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    uri TEXT NOT NULL,
+    size INTEGER,
+    sha256 TEXT
+);
+CREATE INDEX IF NOT EXISTS {table}_run ON {table} (run);
+CREATE INDEX IF NOT EXISTS {table}_op ON {table} (op);
+CREATE INDEX IF NOT EXISTS {table}_name ON {table} (name);
+CREATE INDEX IF NOT EXISTS {table}_key ON {table} (key);
+CREATE INDEX IF NOT EXISTS {table}_sha256 ON {table} (sha256);
+""".format(
+    table=TABLE
+)
+
+
+def _filesystem_type(path: str, mounts: str = "/proc/mounts") -> str:
+    """Returns the type of the filesystem of the path, or "" if unknown."""
+    path = os.path.realpath(os.path.dirname(os.path.abspath(path)))
+    best, fstype = "", ""
+    try:
+        with open(mounts, "r") as filein:
+            for line in filein:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1]
+                is_parent = path == mount_point or path.startswith(
+                    mount_point.rstrip("/") + "/"
+                )
+                if is_parent and len(mount_point) > len(best):
+                    best, fstype = mount_point, fields[2]
+    except OSError:
+        return ""
+    return fstype
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> Tuple[int, str]:
+    """Returns the size and the sha256 hex digest of a file.
+
+    Args:
+        path (str): path to the file.
+        chunk_size (int, optional): read size. Defaults to 1 MiB.
+
+    Returns:
+        Tuple[int, str]: size in bytes, and sha256.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as filein:
+        for chunk in iter(lambda: filein.read(chunk_size), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+class ArtifactCatalog:
+    """Append-only sqlite catalog of produced artifacts.
+
+    Records are only ever inserted, i.e. an artifact written many times has one
+    record per write, and the latest record is the one with the largest `id`. The
+    `run`, `op`, `name`, `key` and `sha256` columns are indexed.
+
+    NOTE
+    The database must be on a filesystem with working POSIX file locks when many
+    tasks write to it at the same time (see the module docs).
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0, journal_mode: str = "DELETE"):
+        """Creates a new instance of ArtifactCatalog object.
+
+        Args:
+            path (str): path to the sqlite database, which is created if needed.
+            timeout (float, optional): seconds to wait for concurrent writers (e.g.
+                other tasks on a shared volume). Defaults to 30.
+            journal_mode (str, optional): sqlite journal mode. "WAL" is faster for
+                concurrent readers, but only works on a local filesystem. Defaults
+                to "DELETE".
+        """
+        journal_mode = journal_mode.upper()
+        if journal_mode not in _JOURNAL_MODES:
+            raise ValueError("unsupported journal mode: %s" % journal_mode)
+        fstype = _filesystem_type(path)
+        if fstype in _NETWORK_FILESYSTEMS:
+            warnings.warn(
+                "artifact catalog %s is on a %s filesystem - sqlite needs working "
+                "file locks for concurrent writers, which many network filesystems "
+                "do not provide" % (path, fstype)
+            )
+            if journal_mode == "WAL":
+                raise ValueError("WAL journal mode requires a local filesystem")
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=timeout)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=%s" % journal_mode)
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> "ArtifactCatalog":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Closes the connection to the database."""
+        self._connection.close()
+
+    def record(
+        self,
+        name: str,
+        key: str,
+        storage: str,
+        bucket: str,
+        run: str = None,
+        op: str = None,
+        local_path: str = None,
+    ) -> int:
+        """Appends an artifact to the catalog.
+
+        Args:
+            name (str): name of the artifact.
+            key (str): key of the artifact in the bucket.
+            storage (str): storage scheme, e.g. s3, minio, gcs.
+            bucket (str): name of the bucket.
+            run (str, optional): name of the workflow that produced the artifact.
+                Defaults to None.
+            op (str, optional): name of the op that produced the artifact. Defaults
+                to None.
+            local_path (str, optional): local file of the artifact, for its size and
+                sha256. Defaults to None.
+
+        Returns:
+            int: id of the record.
+        """
+        size, sha256 = file_digest(local_path) if local_path else (None, None)
+        with self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO %s (%s) VALUES (%s)"
+                % (TABLE, ", ".join(COLUMNS[1:]), ", ".join("?" * (len(COLUMNS) - 1))),
+                (
+                    time.time(),
+                    run,
+                    op,
+                    name,
+                    key,
+                    storage,
+                    bucket,
+                    "%s://%s/%s" % (storage, bucket, key),
+                    size,
+                    sha256,
+                ),
+            )
+        return cursor.lastrowid
+
+    def find(self, limit: Optional[int] = None, **filters: str) -> List[Dict[str, Any]]:
+        """Returns the records matching all the filters, latest first.
+
+        Args:
+            limit (Optional[int], optional): maximum number of records. Defaults to
+                None (no limit).
+            **filters (str): `run`, `op`, `name`, `key` or `sha256` values.
+
+        Returns:
+            List[Dict[str, Any]]: matching records.
+        """
+        unknown = set(filters) - set(_FILTERS)
+        if unknown:
+            raise ValueError("cannot filter by %s" % ", ".join(sorted(unknown)))
+        query = "SELECT * FROM %s" % TABLE
+        if filters:
+            query += " WHERE " + " AND ".join("%s = ?" % name for name in filters)
+        query += " ORDER BY id DESC"
+        if limit is not None:
+            query += " LIMIT %d" % limit
+        rows = self._connection.execute(query, tuple(filters.values())).fetchall()
+        return [dict(row) for row in rows]
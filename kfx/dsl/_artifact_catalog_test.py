@@ -0,0 +1,110 @@
+"""Tests for kfx.dsl._artifact_catalog."""
+import hashlib
+
+import pytest
+
+from kfx.dsl._artifact_catalog import ArtifactCatalog, _filesystem_type, file_digest
+from kfx.dsl._artifact_index import COLUMNS as INDEX_COLUMNS
+from kfx.dsl._artifact_index import load_artifact_index, write_artifact_index
+
+
+def test_file_digest(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"abc" * 1000)
+
+    assert file_digest(str(path), chunk_size=7) == (
+        3000,
+        hashlib.sha256(b"abc" * 1000).hexdigest(),
+    )
+
+
+def test_artifact_catalog(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    data = tmp_path / "model.bin"
+    data.write_bytes(b"model")
+
+    with ArtifactCatalog(path) as catalog:
+        first = catalog.record("model", "run-1/pod-1/train-model.tgz", "minio", "b")
+        catalog.record(
+            "metrics", "run-1/pod-1/train-metrics.tgz", "minio", "b", "run-1", "train"
+        )
+    # append-only, across connections
+    with ArtifactCatalog(path) as catalog:
+        last = catalog.record(
+            "model",
+            "run-2/pod-2/train-model.tgz",
+            "minio",
+            "b",
+            run="run-2",
+            op="train",
+            local_path=str(data),
+        )
+
+        assert last > first
+        models = catalog.find(name="model")
+        assert [record["id"] for record in models] == [last, first]
+        assert models[0]["uri"] == "minio://b/run-2/pod-2/train-model.tgz"
+        assert models[0]["size"] == 5
+        assert models[0]["sha256"] == hashlib.sha256(b"model").hexdigest()
+        assert models[1]["size"] is None
+        assert [record["name"] for record in catalog.find(op="train")] == [
+            "model",
+            "metrics",
+        ]
+        assert len(catalog.find(run="run-2", name="model")) == 1
+        assert len(catalog.find(limit=2)) == 2
+        assert catalog.find(sha256=models[0]["sha256"])[0]["id"] == last
+        assert not catalog.find(run="run-3")
+        with pytest.raises(ValueError):
+            catalog.find(size=5)
+
+        plan = catalog._connection.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM artifact_catalog WHERE run = ?",
+            ("run-1",),
+        ).fetchall()
+        assert "artifact_catalog_run" in str([tuple(row) for row in plan])
+
+
+def test_artifact_catalog_shares_database_with_index(tmp_path):
+    path = str(tmp_path / "artifacts.db")
+    entry = {column: "value" for column in INDEX_COLUMNS}
+    write_artifact_index([entry], path)
+
+    with ArtifactCatalog(path) as catalog:
+        catalog.record("model", "run-1/pod-1/train-model.tgz", "minio", "b")
+        assert len(catalog.find()) == 1
+    assert load_artifact_index(path) == [entry]
+
+
+def test_journal_mode(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    with ArtifactCatalog(path) as catalog:
+        mode = catalog._connection.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "delete"
+    with ArtifactCatalog(path, journal_mode="wal") as catalog:
+        mode = catalog._connection.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+    with pytest.raises(ValueError):
+        ArtifactCatalog(path, journal_mode="MEMORY")
+
+
+def test_network_filesystem(tmp_path, monkeypatch):
+    mounts = tmp_path / "mounts"
+    mounts.write_text(
+        "overlay / overlay rw 0 0\n"
+        "nfs-server:/export /mnt/kfx-artifacts nfs4 rw 0 0\n"
+        "tmpfs /mnt/kfx-artifacts-tmp tmpfs rw 0 0\n"
+    )
+    assert _filesystem_type("/mnt/kfx-artifacts/catalog.db", str(mounts)) == "nfs4"
+    assert _filesystem_type("/mnt/kfx-artifacts-tmp/x.db", str(mounts)) == "tmpfs"
+    assert _filesystem_type("/tmp/catalog.db", str(mounts)) == "overlay"
+    assert _filesystem_type("/tmp/catalog.db", str(tmp_path / "none")) == ""
+
+    monkeypatch.setattr(
+        "kfx.dsl._artifact_catalog._filesystem_type", lambda path: "nfs4"
+    )
+    path = str(tmp_path / "catalog.db")
+    with pytest.warns(UserWarning, match="nfs4"):
+        ArtifactCatalog(path).close()
+    with pytest.warns(UserWarning), pytest.raises(ValueError):
+        ArtifactCatalog(path, journal_mode="WAL")
@@ -0,0 +1,215 @@
+"""Index of the artifact keys of every op output in compiled pipelines.
+
+Argo stores each output artifact of a task at a key derived from the artifact
+repository config, e.g. `artifacts/{{workflow.name}}/{{pod.name}}/<artifact>.tgz`.
+`build_artifact_index` computes these keys from a compiled workflow and the
+`ArtifactLocationHelper` of the cluster, so that dashboards and downstream jobs can
+find the outputs of a run without listing the bucket.
+
+The keys are templated with the Argo variables `{{workflow.name}}` and
+`{{pod.name}}`, which `resolve_artifacts` fills in from the status of a run.
+
+::
+
+    helper = kfx.dsl.ArtifactLocationHelper(
+        scheme="minio", bucket="mlpipeline", key_prefix="artifacts/"
+    )
+    index = kfx.dsl.build_artifact_index("dist/train.yaml", helper)
+    kfx.dsl.write_artifact_index(index, "artifacts.db")
+
+    # after a run, e.g. with the workflow manifest from the kfp api
+    run = kfp.Client().get_run(run_id)
+    workflow = json.loads(run.pipeline_runtime.workflow_manifest)
+    for artifact in kfx.dsl.resolve_artifacts(index, workflow):
+        print(artifact["op"], artifact["output"], artifact["uri"])
+"""
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Union
+from urllib.parse import urlencode
+
+import yaml
+
+from kfx.dsl._artifact_location import ArtifactLocationHelper
+
+PIPELINE_SPEC_ANNOTATION = "pipelines.kubeflow.org/pipeline_spec"
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+# distinct from the table of `kfx.dsl.ArtifactCatalog`, which can share the database
+TABLE = "artifact_index"
+COLUMNS = ("pipeline", "op", "output", "artifact", "path", "key", "uri", "ui_url")
+
+Workflow = Union[str, Dict[str, Any]]
+
+
+def _load_workflow(workflow: Workflow) -> Dict[str, Any]:
+    if isinstance(workflow, str):
+        with open(workflow, "r") as filein:
+            return yaml.safe_load(filein)
+    return workflow
+
+
+def _pipeline_name(workflow: Dict[str, Any]) -> str:
+    metadata = workflow.get("metadata", {})
+    spec = json.loads(
+        metadata.get("annotations", {}).get(PIPELINE_SPEC_ANNOTATION, "{}")
+    )
+    return (
+        spec.get("name")
+        or metadata.get("name")
+        or metadata.get("generateName", "").rstrip("-")
+    )
+
+
+def build_artifact_index(
+    workflow: Workflow, helper: ArtifactLocationHelper, ui_prefix: str = "/pipeline"
+) -> List[Dict[str, str]]:
+    """Returns the templated keys of the output artifacts of every op in a workflow.
+
+    Args:
+        workflow (Union[str, Dict[str, Any]]): path to a compiled workflow yaml, or
+            the workflow.
+        helper (ArtifactLocationHelper): artifact location of the cluster.
+        ui_prefix (str, optional): path prefix of the kubeflow pipelines UI, for the
+            urls of its artifact api. Defaults to "/pipeline".
+
+    Returns:
+        List[Dict[str, str]]: `{"pipeline", "op", "output", "artifact", "path",
+        "key", "uri", "ui_url"}` of each output artifact.
+    """
+    workflow = _load_workflow(workflow)
+    pipeline = _pipeline_name(workflow)
+    key_prefix = helper._get_key_prefix()  # pylint: disable=protected-access
+    entries = []
+    for template in workflow.get("spec", {}).get("templates", []):
+        if "container" not in template:
+            continue
+        op_name = template["name"]
+        for artifact in template.get("outputs", {}).get("artifacts", []):
+            name = artifact["name"]
+            output = (
+                name[len(op_name) + 1 :] if name.startswith(op_name + "-") else name
+            )
+            ext = "" if "none" in (artifact.get("archive") or {}) else ".tgz"
+            key = os.path.join(key_prefix, name + ext)
+            # keep the braces of the argo variables, so that they can be resolved
+            query = urlencode(
+                {"source": helper.scheme, "bucket": helper.bucket, "key": key},
+                safe="/{}",
+            )
+            entries.append(
+                {
+                    "pipeline": pipeline,
+                    "op": op_name,
+                    "output": output,
+                    "artifact": name,
+                    "path": artifact.get("path", ""),
+                    "key": key,
+                    "uri": "%s://%s/%s" % (helper.scheme, helper.bucket, key),
+                    "ui_url": "%s/artifacts/get?%s" % (ui_prefix.rstrip("/"), query),
+                }
+            )
+    return entries
+
+
+def write_artifact_index(entries: Iterable[Dict[str, str]], path: str):
+    """Writes the artifact index as a json list, or into a sqlite database.
+
+    The format is sqlite if the path ends with ".db", ".sqlite" or ".sqlite3". The
+    entries are upserted into the `artifact_index` table (by pipeline and artifact), so
+    that the indexes of many pipelines can be written into the same database.
+
+    Args:
+        entries (Iterable[Dict[str, str]]): entries from `build_artifact_index`.
+        path (str): path to the json or sqlite file.
+    """
+    if not path.endswith(SQLITE_EXTENSIONS):
+        with open(path, "w") as fileout:
+            json.dump(list(entries), fileout, indent=2)
+        return
+
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS %s (%s, PRIMARY KEY (pipeline, artifact))"
+                % (TABLE, ", ".join("%s TEXT NOT NULL" % column for column in COLUMNS))
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS %s_op ON %s (pipeline, op, output)"
+                % (TABLE, TABLE)
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO %s VALUES (%s)"
+                % (TABLE, ", ".join("?" * len(COLUMNS))),
+                [tuple(entry[column] for column in COLUMNS) for entry in entries],
+            )
+    finally:
+        connection.close()
+
+
+def load_artifact_index(path: str) -> List[Dict[str, str]]:
+    """Returns the artifact index written by `write_artifact_index`.
+
+    Args:
+        path (str): path to the json or sqlite file.
+
+    Returns:
+        List[Dict[str, str]]: entries of the index.
+    """
+    if not path.endswith(SQLITE_EXTENSIONS):
+        with open(path, "r") as filein:
+            return json.load(filein)
+
+    connection = sqlite3.connect(path)
+    try:
+        rows = connection.execute(
+            "SELECT %s FROM %s ORDER BY pipeline, op, artifact"
+            % (", ".join(COLUMNS), TABLE)
+        ).fetchall()
+    finally:
+        connection.close()
+    return [dict(zip(COLUMNS, row)) for row in rows]
+
+
+def resolve_artifacts(
+    entries: Iterable[Dict[str, str]], workflow: Dict[str, Any]
+) -> List[Dict[str, str]]:
+    """Returns the entries with the exact keys of the artifacts of a run.
+
+    The `{{workflow.name}}`, `{{workflow.namespace}}`, `{{workflow.uid}}` and
+    `{{pod.name}}` variables are filled in from the metadata and the pod nodes of
+    the run. An op that ran many times (e.g. in a `ParallelFor`) has one entry per
+    pod, and an op that did not run has none.
+
+    The pod names are the ids of the pod nodes, i.e. the pod naming of Argo before
+    v3.4 (or with `POD_NAMES=v1`), which kubeflow pipelines v1 runs on.
+
+    Args:
+        entries (Iterable[Dict[str, str]]): entries from `build_artifact_index`.
+        workflow (Dict[str, Any]): the Argo workflow of the run, with its status.
+
+    Returns:
+        List[Dict[str, str]]: resolved entries, with the `pod` of each artifact.
+    """
+    metadata = workflow["metadata"]
+    variables = {
+        "{{workflow.%s}}" % field: metadata[field]
+        for field in ("name", "namespace", "uid")
+        if metadata.get(field)
+    }
+    pods: Dict[str, List[str]] = {}
+    for node_id, node in sorted(workflow.get("status", {}).get("nodes", {}).items()):
+        if node.get("type") == "Pod":
+            pods.setdefault(node.get("templateName", ""), []).append(node_id)
+
+    resolved = []
+    for entry in entries:
+        for pod in pods.get(entry["op"], []):
+            item = dict(entry, pod=pod)
+            variables["{{pod.name}}"] = pod
+            for field in ("key", "uri", "ui_url"):
+                for variable, value in variables.items():
+                    item[field] = item[field].replace(variable, value)
+            resolved.append(item)
+    return resolved
@@ -0,0 +1,95 @@
+"""Tests for kfx.dsl._artifact_index."""
+import kfp.dsl
+import pytest
+
+from kfx.dsl._artifact_index import (
+    build_artifact_index,
+    load_artifact_index,
+    resolve_artifacts,
+    write_artifact_index,
+)
+from kfx.dsl._artifact_location import ArtifactLocationHelper
+from kfx.dsl._compiler import compile_pipeline
+
+
+@kfp.dsl.pipeline(name="indexed")
+def indexed_pipeline():
+    kfp.dsl.ContainerOp(
+        name="Train Model",
+        image="bash",
+        file_outputs={"model": "/out/model", "metrics": "/out/metrics"},
+    )
+    kfp.dsl.ContainerOp(name="noop", image="bash")
+
+
+@pytest.fixture
+def workflow_path(tmp_path) -> str:
+    path = str(tmp_path / "indexed.yaml")
+    compile_pipeline(indexed_pipeline, path)
+    return path
+
+
+def test_build_artifact_index(workflow_path):
+    helper = ArtifactLocationHelper("minio", "mlpipeline", key_prefix="artifacts/")
+    entries = build_artifact_index(workflow_path, helper)
+
+    assert sorted(entry["output"] for entry in entries) == ["metrics", "model"]
+    model = next(entry for entry in entries if entry["output"] == "model")
+    assert model == {
+        "pipeline": "indexed",
+        "op": "train-model",
+        "output": "model",
+        "artifact": "train-model-model",
+        "path": "/out/model",
+        "key": "artifacts/{{workflow.name}}/{{pod.name}}/train-model-model.tgz",
+        "uri": "minio://mlpipeline/artifacts/{{workflow.name}}/{{pod.name}}"
+        "/train-model-model.tgz",
+        "ui_url": "/pipeline/artifacts/get?source=minio&bucket=mlpipeline&key="
+        "artifacts/{{workflow.name}}/{{pod.name}}/train-model-model.tgz",
+    }
+
+    helper = ArtifactLocationHelper(
+        "gcs", "bucket", key_format="{{workflow.namespace}}/{{pod.name}}"
+    )
+    keys = {entry["key"] for entry in build_artifact_index(workflow_path, helper, "")}
+    assert "{{workflow.namespace}}/{{pod.name}}/train-model-model.tgz" in keys
+
+
+@pytest.mark.parametrize("name", ["index.json", "index.db"])
+def test_write_artifact_index(tmp_path, workflow_path, name):
+    helper = ArtifactLocationHelper("minio", "mlpipeline")
+    entries = build_artifact_index(workflow_path, helper)
+    path = str(tmp_path / name)
+
+    write_artifact_index(entries, path)
+    if name.endswith(".db"):
+        # upserts into the same database
+        write_artifact_index(entries, path)
+
+    assert sorted(
+        load_artifact_index(path), key=lambda entry: entry["artifact"]
+    ) == sorted(entries, key=lambda entry: entry["artifact"])
+
+
+def test_resolve_artifacts(workflow_path):
+    helper = ArtifactLocationHelper("minio", "mlpipeline", key_prefix="artifacts")
+    entries = build_artifact_index(workflow_path, helper)
+    workflow = {
+        "metadata": {"name": "indexed-abc12", "namespace": "kubeflow"},
+        "status": {
+            "nodes": {
+                "indexed-abc12": {"type": "DAG", "templateName": "indexed"},
+                "indexed-abc12-111": {"type": "Pod", "templateName": "train-model"},
+                "indexed-abc12-222": {"type": "Pod", "templateName": "noop"},
+            }
+        },
+    }
+
+    resolved = resolve_artifacts(entries, workflow)
+
+    assert sorted(entry["key"] for entry in resolved) == [
+        "artifacts/indexed-abc12/indexed-abc12-111/train-model-metrics.tgz",
+        "artifacts/indexed-abc12/indexed-abc12-111/train-model-model.tgz",
+    ]
+    assert all(entry["pod"] == "indexed-abc12-111" for entry in resolved)
+    assert all("{{" not in entry["ui_url"] for entry in resolved)
@@ -1,14 +1,21 @@
 """Utils."""
+import atexit
+import hashlib
 import os
 import os.path
-from typing import Callable, NamedTuple
+import sqlite3
+import warnings
+from typing import Callable, Dict, NamedTuple, Optional, Set
 
 import kfp.dsl
 from kubernetes import client as k8s_client
 
+from kfx.dsl._artifact_catalog import ArtifactCatalog
 from kfx.dsl._compat import sanitize_k8s_name
+from kfx.dsl._ops import mount_volume, op_matches
 
 DEFAULT_KEY_FORMAT = "{{workflow.name}}/{{pod.name}}"
+VOLUME_SCHEME = "volume"
 
 
 class WorkflowVars(NamedTuple):
@@ -18,6 +25,15 @@ class WorkflowVars(NamedTuple):
     template: str
 
 
+def _shared_volume_name(pvc_name: str) -> str:
+    """Returns a valid k8s volume name for the PVC (or its pipeline param)."""
+    name = sanitize_k8s_name("kfx-%s" % pvc_name)
+    if len(name) <= 63:
+        return name
+    digest = hashlib.sha256(str(pvc_name).encode("utf-8")).hexdigest()[:8]
+    return "%s-%s" % (name[:54].rstrip("-"), digest)
+
+
 def set_workflow_env(
     workflow_vars: WorkflowVars = WorkflowVars(
         name="WORKFLOW_DEFAULT_KEY_FORMAT", template="{{workflow.name}}/{{pod.name}}"
@@ -193,6 +209,10 @@ class ArtifactLocationHelper:
     artifact_storage_env: str = "WORKFLOW_ARTIFACT_STORAGE"
     artifact_bucket_env: str = "WORKFLOW_ARTIFACT_BUCKET"
     artifact_key_prefix_env: str = "WORKFLOW_ARTIFACT_KEY_PREFIX"
+    artifact_volume_env: str = "WORKFLOW_ARTIFACT_VOLUME"
+    artifact_volume_path_env: str = "WORKFLOW_ARTIFACT_VOLUME_PATH"
+    artifact_catalog_env: str = "WORKFLOW_ARTIFACT_CATALOG"
+    artifact_run_env: str = "WORKFLOW_ARTIFACT_RUN"
 
     def __init__(
         self, scheme: str, bucket: str, key_prefix: str = "", key_format: str = ""
@@ -248,19 +268,154 @@ class ArtifactLocationHelper:
 
         def set_workflow_envs(task: kfp.dsl.ContainerOp):
             task.container.image = image
-            artifact_prefix = sanitize_k8s_name(task.name)
+            self._add_location_envs(task)
 
-            for name, value in [
-                (self.artifact_storage_env, self.scheme),
-                (self.artifact_bucket_env, self.bucket),
-                (self.artifact_key_prefix_env, self._get_key_prefix()),
-                (self.artifact_prefix_env, artifact_prefix),
-            ]:
+        return set_workflow_envs
+
+    def _add_location_envs(self, task: kfp.dsl.ContainerOp):
+        """Adds the env vars for the artifact location, if they are not set yet."""
+        existing = {env.name for env in task.container.env or []}
+        for name, value in [
+            (self.artifact_storage_env, self.scheme),
+            (self.artifact_bucket_env, self.bucket),
+            (self.artifact_key_prefix_env, self._get_key_prefix()),
+            (self.artifact_prefix_env, sanitize_k8s_name(task.name)),
+        ]:
+            if name not in existing:
                 task.container.add_env_variable(
                     k8s_client.V1EnvVar(name=name, value=value)
                 )
 
-        return set_workflow_envs
+    def mount_shared_volume(
+        self, pvc_name: str, mount_path: str = "/mnt/kfx-artifacts", op_name: str = "*"
+    ) -> Callable[[kfp.dsl.ContainerOp], kfp.dsl.ContainerOp]:
+        """A kfp task modifier to pass artifacts between tasks on a shared volume.
+
+        Mounts a shared (ReadWriteMany) PVC in the matching tasks, as a volume named
+        after the PVC (i.e. "kfx-<pvc_name>"). Inside the tasks,
+        `KfpArtifact.path` is the path of the artifact in the volume (under the same
+        key as in the object storage), and `KfpArtifact.uri` is a
+        `volume://<pvc_name>/<key>` uri, which downstream tasks resolve to the
+        same file with `kfx.dsl.volume_path` - i.e. without uploading, downloading,
+        or archiving the artifact.
+
+        `KfpArtifact.source` is unchanged, as the kubeflow pipeline UI only reads
+        artifacts from the object storage.
+
+        ::
+
+            helper = kfx.dsl.ArtifactLocationHelper(scheme="minio", bucket="mlpipeline")
+
+            @kfp.components.func_to_container_op
+            def produce() -> str:
+                import kfx.dsl
+
+                artifact = kfx.dsl.KfpArtifact("features", ext=".parquet")
+                os.makedirs(os.path.dirname(artifact.path), exist_ok=True)
+                write_features(artifact.path)
+                return artifact.uri
+
+            @kfp.components.func_to_container_op
+            def consume(features_uri: str):
+                import kfx.dsl
+
+                read_features(kfx.dsl.volume_path(features_uri))
+
+            @kfp.dsl.pipeline()
+            def pipeline():
+                # e.g. kfp.dsl.VolumeOp(..., modes=kfp.dsl.VOLUME_MODE_RWM)
+                consume(produce().output)
+                kfp.dsl.get_pipeline_conf().add_op_transformer(
+                    helper.mount_shared_volume("kfx-artifacts")
+                )
+
+        Args:
+            pvc_name (str): name of the ReadWriteMany PersistentVolumeClaim.
+            mount_path (str, optional): mount path of the volume. Defaults to
+                "/mnt/kfx-artifacts".
+            op_name (str, optional): Glob pattern for the op name. Defaults to "*".
+
+        Returns:
+            Callable[[kfp.dsl.ContainerOp], kfp.dsl.ContainerOp]: modified task.
+        """
+
+        volume = k8s_client.V1Volume(
+            name=_shared_volume_name(pvc_name),
+            persistent_volume_claim=k8s_client.V1PersistentVolumeClaimVolumeSource(
+                claim_name=pvc_name
+            ),
+        )
+
+        def mount_shared_volume_transform(task: kfp.dsl.ContainerOp):
+            if not op_matches(task, op_name):
+                return task
+            existing = {env.name: env.value for env in task.container.env or []}
+            envs = [
+                (self.artifact_volume_env, pvc_name),
+                (self.artifact_volume_path_env, mount_path),
+            ]
+            for name, value in envs:
+                if name in existing and str(existing[name]) != str(value):
+                    raise ValueError(
+                        "op %s already shares artifacts on %s=%s"
+                        % (task.name, name, existing[name])
+                    )
+            mount_volume(task, volume, mount_path, None)
+            for name, value in envs:
+                if name not in existing:
+                    task.container.add_env_variable(
+                        k8s_client.V1EnvVar(name=name, value=value)
+                    )
+            self._add_location_envs(task)
+            return task
+
+        return mount_shared_volume_transform
+
+    def set_catalog(
+        self, catalog_path: str, op_name: str = "*"
+    ) -> Callable[[kfp.dsl.ContainerOp], kfp.dsl.ContainerOp]:
+        """A kfp task modifier to record the artifacts of the task in a catalog.
+
+        Inside the matching tasks, `KfpArtifact.record` (or a `KfpArtifact` used as
+        a context manager) appends the artifact to the sqlite
+        `kfx.dsl.ArtifactCatalog` at `catalog_path`, with the name of the run and
+        the op. The catalog must be on a volume shared by the tasks, e.g. the volume
+        of `mount_shared_volume`, with working POSIX file locks (see
+        `kfx.dsl.ArtifactCatalog`).
+
+        ::
+
+            kfp.dsl.get_pipeline_conf().add_op_transformer(
+                helper.mount_shared_volume("kfx-artifacts")
+            )
+            kfp.dsl.get_pipeline_conf().add_op_transformer(
+                helper.set_catalog("/mnt/kfx-artifacts/catalog.db")
+            )
+
+        Args:
+            catalog_path (str): path to the sqlite database inside the tasks.
+            op_name (str, optional): Glob pattern for the op name. Defaults to "*".
+
+        Returns:
+            Callable[[kfp.dsl.ContainerOp], kfp.dsl.ContainerOp]: modified task.
+        """
+
+        def set_catalog_transform(task: kfp.dsl.ContainerOp):
+            if not op_matches(task, op_name):
+                return task
+            existing = {env.name for env in task.container.env or []}
+            for name, value in [
+                (self.artifact_catalog_env, catalog_path),
+                (self.artifact_run_env, "{{workflow.name}}"),
+            ]:
+                if name not in existing:
+                    task.container.add_env_variable(
+                        k8s_client.V1EnvVar(name=name, value=value)
+                    )
+            self._add_location_envs(task)
+            return task
+
+        return set_catalog_transform
 
 
 def _handle_special_artifact_names(name: str) -> str:
@@ -406,6 +561,101 @@ class KfpArtifact:
         self.key = os.path.join(
             self.key_prefix, "%s-%s%s" % (self.prefix, self.name, self.ext)
         )
+        self.volume = os.environ.get(ArtifactLocationHelper.artifact_volume_env)
+        self.volume_path = os.environ.get(
+            ArtifactLocationHelper.artifact_volume_path_env
+        )
+        if (
+            os.environ.get(ArtifactLocationHelper.artifact_catalog_env)
+            and self.key not in _RECORDED_KEYS
+        ):
+            _PENDING_RECORDS.setdefault(self.key, self)
+
+    def __enter__(self) -> "KfpArtifact":
+        """Returns the artifact, which is recorded when the block exits.
+
+        Returns:
+            KfpArtifact: the artifact itself.
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Records the artifact if the block exits without error.
+
+        The artifact is not recorded if the block raises, e.g. if its write failed.
+        """
+        if exc_type is None:
+            self.record()
+        else:
+            _PENDING_RECORDS.pop(self.key, None)
+
+    def record(self, local_path: str = None) -> Optional[int]:
+        """Appends the artifact to the artifact catalog of the task, if any.
+
+        Artifacts created in a task with a catalog (see
+        `ArtifactLocationHelper.set_catalog`) are recorded once when the task
+        process exits, i.e. after they are written. The vis writers (e.g.
+        `kfx.vis.vega.write_arrow`) record their artifact as soon as it is written.
+        Call `record` (or use the artifact as a context manager, which records it
+        when the block exits without error) to record the artifact earlier, or with
+        the size and sha256 of a file outside of the shared volume. A failure to
+        record only raises a warning, i.e. it does not fail the task.
+
+        ::
+
+            with kfx.dsl.KfpArtifact("features", ext=".parquet") as artifact:
+                write_features(artifact.path)
+
+            # or, for a file outside of the shared volume
+            kfx.dsl.KfpArtifact("report_file").record(local_path="/tmp/report.md")
+
+        Args:
+            local_path (str, optional): local file of the artifact, for its size and
+                sha256. Defaults to the path in the shared volume if the file exists.
+
+        Returns:
+            Optional[int]: id of the record, or None if it is not recorded.
+        """
+        _PENDING_RECORDS.pop(self.key, None)
+        catalog_path = os.environ.get(ArtifactLocationHelper.artifact_catalog_env)
+        if not catalog_path:
+            return None
+        _RECORDED_KEYS.add(self.key)
+        if local_path is None and self.volume_path and os.path.isfile(self.path):
+            local_path = self.path
+        try:
+            with ArtifactCatalog(catalog_path) as catalog:
+                return catalog.record(
+                    self.name,
+                    self.key,
+                    self.storage,
+                    self.bucket,
+                    run=os.environ.get(ArtifactLocationHelper.artifact_run_env),
+                    op=self.prefix,
+                    local_path=local_path,
+                )
+        except (OSError, sqlite3.Error) as error:
+            warnings.warn(
+                "failed to record %s in the artifact catalog: %s" % (self.key, error)
+            )
+        return None
+
+    @property
+    def path(self) -> str:
+        """Path to the artifact in the shared volume.
+
+        See `ArtifactLocationHelper.mount_shared_volume`.
+        """
+        if not self.volume_path:
+            raise ValueError("no shared artifact volume is mounted in this task")
+        return os.path.join(self.volume_path, self.key)
+
+    @property
+    def uri(self) -> str:
+        """`volume://` uri to the artifact in the shared volume if any, otherwise the source."""
+        if not self.volume:
+            return self.source
+        return "%s://%s" % (VOLUME_SCHEME, os.path.join(self.volume, self.key))
 
     @property
     def source(self) -> str:
@@ -416,3 +666,40 @@ class KfpArtifact:
     def __str__(self):
         """Url to the artifact source."""
         return self.source
+
+
+# artifacts created by the task, recorded in its catalog when the process exits
+_PENDING_RECORDS: Dict[str, KfpArtifact] = {}
+_RECORDED_KEYS: Set[str] = set()
+
+
+def _record_pending():
+    """Records the artifacts created by the task that were not recorded yet."""
+    for artifact in list(_PENDING_RECORDS.values()):
+        artifact.record()
+
+
+atexit.register(_record_pending)
+
+
+def volume_path(uri: str) -> str:
+    """Returns the local path of a `volume://<pvc_name>/<key>` artifact uri.
+
+    The shared volume must be mounted in the current task (see
+    `ArtifactLocationHelper.mount_shared_volume`).
+
+    Args:
+        uri (str): uri from `KfpArtifact.uri`.
+
+    Returns:
+        str: path to the artifact in the shared volume.
+    """
+    scheme, sep, path = uri.partition("://")
+    if scheme != VOLUME_SCHEME or not sep:
+        raise ValueError("not a %s:// uri: %s" % (VOLUME_SCHEME, uri))
+    volume, _, key = path.partition("/")
+    if volume != os.environ.get(ArtifactLocationHelper.artifact_volume_env):
+        raise ValueError("volume %s is not mounted in this task" % volume)
+    return os.path.join(
+        os.environ[ArtifactLocationHelper.artifact_volume_path_env], key
+    )
@@ -6,6 +6,7 @@ import kfp.compiler
 import kfp.components
 import kfp.dsl
 import kubernetes.client as k8s_client
+import pytest
 from kfp.compiler import Compiler
 from kfp.components import OutputTextFile
 
@@ -15,7 +16,6 @@ import kfx.dsl._artifact_location
 def is_envs_similar(
     envs: List[k8s_client.V1EnvVar], expected_envs: List[k8s_client.V1EnvVar]
 ) -> bool:
-
     return [env.to_dict() for env in envs] == expected_envs
 
 
@@ -179,7 +179,6 @@ def test_artifact_location_helper(tmp_path):
 
 
 def test_kfp_artifact():
-
     os.environ[
         kfx.dsl._artifact_location.ArtifactLocationHelper.artifact_storage_env
     ] = "gcs"
@@ -202,3 +201,145 @@ def test_kfp_artifact():
         str(kfx.dsl.KfpArtifact("some_artifact_path"))
         == "gcs://your_bucket/pipelines/artifact/test-task-some_artifact.tgz"
     )
+
+
+def test_mount_shared_volume(tmp_path):
+    helper = kfx.dsl._artifact_location.ArtifactLocationHelper(
+        scheme="minio", bucket="mlpipeline"
+    )
+
+    @kfp.dsl.pipeline()
+    def test_pipeline():
+        op = kfp.dsl.ContainerOp(name="produce", image="bash")
+        skipped = kfp.dsl.ContainerOp(name="skipped", image="bash")
+        transform = helper.mount_shared_volume("artifacts-pvc", op_name="produce")
+        op.apply(transform).apply(transform)
+        skipped.apply(transform)
+
+        assert [volume.name for volume in op.volumes] == ["kfx-artifacts-pvc"]
+        assert op.volumes[0].persistent_volume_claim.claim_name == "artifacts-pvc"
+        assert [mount.mount_path for mount in op.container.volume_mounts] == [
+            "/mnt/kfx-artifacts"
+        ]
+        envs = {env.name: env.value for env in op.container.env}
+        assert len(envs) == len(op.container.env) == 6
+        assert envs["WORKFLOW_ARTIFACT_VOLUME"] == "artifacts-pvc"
+        assert envs["WORKFLOW_ARTIFACT_VOLUME_PATH"] == "/mnt/kfx-artifacts"
+        assert envs["WORKFLOW_ARTIFACT_BUCKET"] == "mlpipeline"
+        assert not skipped.volumes and not skipped.container.env
+
+        # a task only shares artifacts on one volume
+        with pytest.raises(ValueError):
+            op.apply(helper.mount_shared_volume("other-pvc", mount_path="/mnt/other"))
+        with pytest.raises(ValueError):
+            op.apply(helper.mount_shared_volume("other-pvc"))
+        assert len(op.volumes) == 1
+
+        long_name = kfx.dsl._artifact_location._shared_volume_name("x" * 80)
+        assert len(long_name) <= 63 and long_name.startswith("kfx-xxx")
+
+    Compiler().compile(test_pipeline, str(tmp_path / "pipeline.yaml"))
+
+
+def test_kfp_artifact_volume(monkeypatch):
+    helper = kfx.dsl._artifact_location.ArtifactLocationHelper
+    for name, value in [
+        (helper.artifact_storage_env, "minio"),
+        (helper.artifact_bucket_env, "mlpipeline"),
+        (helper.artifact_key_prefix_env, "run-1/pod-1"),
+        (helper.artifact_prefix_env, "produce"),
+    ]:
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv(helper.artifact_volume_env, raising=False)
+    monkeypatch.delenv(helper.artifact_volume_path_env, raising=False)
+
+    artifact = kfx.dsl.KfpArtifact("features", ext=".parquet")
+    assert artifact.uri == artifact.source
+    with pytest.raises(ValueError):
+        artifact.path
+
+    monkeypatch.setenv(helper.artifact_volume_env, "artifacts-pvc")
+    monkeypatch.setenv(helper.artifact_volume_path_env, "/mnt/kfx-artifacts")
+    artifact = kfx.dsl.KfpArtifact("features", ext=".parquet")
+
+    assert artifact.source == "minio://mlpipeline/run-1/pod-1/produce-features.parquet"
+    assert artifact.uri == "volume://artifacts-pvc/run-1/pod-1/produce-features.parquet"
+    assert artifact.path == "/mnt/kfx-artifacts/run-1/pod-1/produce-features.parquet"
+    assert kfx.dsl.volume_path(artifact.uri) == artifact.path
+
+    with pytest.raises(ValueError):
+        kfx.dsl.volume_path(artifact.source)
+    with pytest.raises(ValueError):
+        kfx.dsl.volume_path("volume://other-pvc/produce-features.parquet")
+
+
+def test_set_catalog(tmp_path):
+    helper = kfx.dsl._artifact_location.ArtifactLocationHelper(
+        scheme="minio", bucket="mlpipeline"
+    )
+
+    @kfp.dsl.pipeline()
+    def test_pipeline():
+        op = kfp.dsl.ContainerOp(name="produce", image="bash")
+        op.apply(helper.set_catalog("/mnt/kfx-artifacts/catalog.db"))
+
+        envs = {env.name: env.value for env in op.container.env}
+        assert envs["WORKFLOW_ARTIFACT_CATALOG"] == "/mnt/kfx-artifacts/catalog.db"
+        assert envs["WORKFLOW_ARTIFACT_RUN"] == "{{workflow.name}}"
+        assert envs["WORKFLOW_ARTIFACT_PREFIX"] == "produce"
+
+    Compiler().compile(test_pipeline, str(tmp_path / "pipeline.yaml"))
+
+
+def test_kfp_artifact_catalog(tmp_path, monkeypatch):
+    helper = kfx.dsl._artifact_location.ArtifactLocationHelper
+    catalog_path = str(tmp_path / "catalog.db")
+    for name, value in [
+        (helper.artifact_storage_env, "minio"),
+        (helper.artifact_bucket_env, "mlpipeline"),
+        (helper.artifact_key_prefix_env, "run-1/pod-1"),
+        (helper.artifact_prefix_env, "produce"),
+        (helper.artifact_volume_env, "artifacts-pvc"),
+        (helper.artifact_volume_path_env, str(tmp_path)),
+        (helper.artifact_catalog_env, catalog_path),
+        (helper.artifact_run_env, "run-1"),
+    ]:
+        monkeypatch.setenv(name, value)
+    (tmp_path / "run-1" / "pod-1").mkdir(parents=True)
+    (tmp_path / "run-1" / "pod-1" / "produce-features.csv").write_text("a,b\n")
+    report = tmp_path / "report.md"
+    report.write_text("# report")
+
+    # not recorded until the artifact is written, or the task exits
+    kfx.dsl.KfpArtifact("features", ext=".csv")
+    kfx.dsl.KfpArtifact("exit", ext=".csv")
+    kfx.dsl.KfpArtifact("exit", ext=".csv")
+    with kfx.dsl.ArtifactCatalog(catalog_path) as catalog:
+        assert not catalog.find()
+
+    with kfx.dsl.KfpArtifact("features", ext=".csv") as artifact:
+        with open(artifact.path, "a") as fileout:
+            fileout.write("1,2\n")
+    with pytest.raises(RuntimeError):
+        with kfx.dsl.KfpArtifact("failed"):
+            raise RuntimeError("write failed")
+    assert kfx.dsl.KfpArtifact("report_file").record(local_path=str(report))
+    kfx.dsl.KfpArtifact("missing").record()
+    kfx.dsl._artifact_location._record_pending()
+    kfx.dsl._artifact_location._record_pending()
+
+    with kfx.dsl.ArtifactCatalog(catalog_path) as catalog:
+        records = catalog.find(run="run-1", op="produce")
+    assert [(record["name"], record["size"]) for record in records] == [
+        ("exit", None),
+        ("missing", None),
+        ("report", 8),
+        ("features", 8),
+    ]
+    assert records[3]["key"] == "run-1/pod-1/produce-features.csv"
+
+    monkeypatch.setenv(helper.artifact_catalog_env, str(tmp_path / "no" / "x.db"))
+    with pytest.warns(UserWarning):
+        assert kfx.dsl.KfpArtifact("features", ext=".csv").record() is None
+    monkeypatch.delenv(helper.artifact_catalog_env)
+    assert kfx.dsl.KfpArtifact("features", ext=".csv").record() is None
@@ -1,8 +1,19 @@
 """Module for compatibilities with potential updates in dependent packages."""
+import inspect
 import re
+import warnings
 
+import yaml
 from kfp.compiler._k8s_helper import sanitize_k8s_name as _sanitize_k8s_name
 
+try:
+    from kfp.components._yaml_utils import dump_yaml
+except ImportError:  # pragma: no cover
+
+    def dump_yaml(data):
+        """Dumps the data as yaml, with the key order of the data."""
+        return yaml.safe_dump(data, default_flow_style=False, sort_keys=False)
+
 
 def __sanitize_k8s_name(name, allow_capital_underscore=False):
     """sanitize_k8s_name cleans and converts the names in the workflow.
@@ -34,3 +45,36 @@ def __sanitize_k8s_name(name, allow_capital_underscore=False):
 sanitize_k8s_name = (  # pylint: disable=invalid-name
     _sanitize_k8s_name or __sanitize_k8s_name
 )
+
+
+def set_retry(op, num_retries: int, policy: str = None, **backoff):
+    """Sets the retry strategy of the op, with the backoff if kfp supports it.
+
+    NOTE
+    The `backoff_duration`, `backoff_factor` and `backoff_max_duration` args of
+    `ContainerOp.set_retry` are only available from kfp 1.7 (and `policy` from kfp
+    1.0) - unsupported args are dropped with a warning.
+
+    Args:
+        op (kfp.dsl.ContainerOp): kfp op.
+        num_retries (int): max number of retries.
+        policy (str, optional): retry policy. Defaults to None.
+        **backoff: backoff args of `ContainerOp.set_retry`.
+
+    Returns:
+        kfp.dsl.ContainerOp: the same op.
+    """
+    params = inspect.signature(op.set_retry).parameters
+    kwargs = dict(backoff, policy=policy)
+    unsupported = sorted(
+        name for name, value in kwargs.items() if value and name not in params
+    )
+    if unsupported:
+        warnings.warn(
+            "ContainerOp.set_retry of this kfp version does not support %s - "
+            "upgrade to kfp>=1.7 for the retry backoff" % ", ".join(unsupported),
+            UserWarning,
+        )
+    return op.set_retry(
+        num_retries, **{name: value for name, value in kwargs.items() if name in params}
+    )
@@ -0,0 +1,28 @@
+"""Tests for kfx.dsl._compat."""
+import kfp.dsl
+import pytest
+
+from kfx.dsl._compat import set_retry
+
+
+class _LegacyOp:
+    """Op with the set_retry signature of kfp<1.7."""
+
+    def set_retry(self, num_retries, policy=None):
+        self.num_retries = num_retries
+        self.retry_policy = policy
+        return self
+
+
+def test_set_retry():
+    op = kfp.dsl.ContainerOp(name="train", image="bash")
+    assert set_retry(op, 3, policy="OnError", backoff_duration="1m") is op
+    assert op.num_retries == 3
+    assert op.retry_policy == "OnError"
+    assert op.backoff_duration == "1m"
+
+    legacy = _LegacyOp()
+    with pytest.warns(UserWarning, match="backoff_duration, backoff_factor"):
+        set_retry(legacy, 2, policy="Always", backoff_duration="1m", backoff_factor=2)
+    assert legacy.num_retries == 2
+    assert legacy.retry_policy == "Always"
@@ -0,0 +1,122 @@
+"""On-disk cache of compiled pipelines."""
+import os
+import tempfile
+from typing import List, Optional, Tuple
+
+
+class CompileCache:
+    """Local on-disk cache of compiled Argo workflow yamls.
+
+    Each entry is a `<key>.yaml` file inside the cache directory. The modified time
+    of an entry is updated on every hit, and the least recently used entries are
+    evicted when the cache is larger than `max_bytes` or `max_entries`.
+
+    ::
+
+        import kfx.dsl
+
+        cache = kfx.dsl.CompileCache("~/.cache/kfx/pipelines", max_bytes=64 << 20)
+        transform = kfx.dsl.ContainerOpTransform().set_resources(memory="4G")
+
+        for result in kfx.dsl.compile_pipelines(
+            [kfx.dsl.CompileJob(pipeline, [transform])], "./dist", cache=cache
+        ):
+            print(result["name"], result["cached"], result["seconds"])
+
+    """
+
+    def __init__(
+        self, directory: str, max_bytes: int = 256 << 20, max_entries: int = None
+    ):
+        """Creates a new instance of CompileCache object.
+
+        Args:
+            directory (str): directory of the cache entries.
+            max_bytes (int, optional): maximum total size of the entries. Defaults
+                to 256 MiB.
+            max_entries (int, optional): maximum number of entries. Defaults to
+                None (no limit).
+        """
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".yaml")
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached workflow yaml, or None if it is not in the cache.
+
+        Args:
+            key (str): cache key (see `kfx.dsl.pipeline_key`).
+
+        Returns:
+            Optional[str]: workflow yaml.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r") as filein:
+                text = filein.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return text
+
+    def put(self, key: str, text: str):
+        """Adds a workflow yaml to the cache.
+
+        Args:
+            key (str): cache key (see `kfx.dsl.pipeline_key`).
+            text (str): workflow yaml.
+        """
+        # write then rename, so that concurrent readers never see partial entries
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w") as fileout:
+                fileout.write(text)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".yaml"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self) -> int:
+        """Removes the least recently used entries above `max_bytes` or `max_entries`.
+
+        Returns:
+            int: number of removed entries.
+        """
+        entries = sorted(self._entries(), reverse=True)
+        total, removed = 0, 0
+        for count, (_, size, path) in enumerate(entries, 1):
+            total += size
+            if total <= self.max_bytes and (
+                self.max_entries is None or count <= self.max_entries
+            ):
+                continue
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def clear(self):
+        """Removes all entries."""
+        for _, _, path in self._entries():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
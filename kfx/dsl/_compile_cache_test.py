@@ -0,0 +1,29 @@
+"""Tests for kfx.dsl._compile_cache."""
+import os
+
+from kfx.dsl._compile_cache import CompileCache
+
+
+def test_compile_cache(tmp_path):
+    cache = CompileCache(str(tmp_path), max_bytes=15)
+    assert cache.get("a") is None
+
+    for index, key in enumerate("abc"):
+        cache.put(key, key * 10)
+        # modified times are used for LRU
+        os.utime(str(tmp_path / (key + ".yaml")), (index, index))
+    assert cache.get("a") == "a" * 10
+
+    # "a" is the most recently used, "b" is the least
+    assert cache.evict() == 2
+    assert sorted(os.listdir(str(tmp_path))) == ["a.yaml"]
+
+    cache = CompileCache(str(tmp_path), max_entries=2)
+    os.utime(str(tmp_path / "a.yaml"), (0, 0))
+    for key in "bc":
+        cache.put(key, key)
+    assert cache.evict() == 1
+    assert "a.yaml" not in os.listdir(str(tmp_path))
+
+    cache.clear()
+    assert os.listdir(str(tmp_path)) == []
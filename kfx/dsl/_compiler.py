@@ -0,0 +1,422 @@
+"""Compiles many kubeflow pipelines in parallel, applying kfx transforms."""
+import collections
+import enum
+import functools
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+
+import kfp
+import kfp.compiler
+import kfp.dsl
+
+from kfx.dsl._artifact_location import ArtifactLocationHelper
+from kfx.dsl._compile_cache import CompileCache
+from kfx.dsl._pod_spec_patch import (
+    apply_pod_spec_patches_file,
+    applying_pod_spec_patches,
+)
+from kfx.dsl._transformers import ContainerOpTransform
+
+PipelineRef = Union[str, Callable]
+
+# bump when the cache key or the content of the entries changes
+CACHE_VERSION = 2
+
+
+class CompileJob(NamedTuple):
+    """A pipeline to compile, and the kfx transforms to apply on all its ops.
+
+    Attributes:
+        pipeline (Union[str, Callable]): pipeline function, or its import path as
+            "module:function".
+        transforms (Sequence[Any]): `ContainerOpTransform`, `ArtifactLocationHelper`
+            (i.e. `set_envs()`), module-level transform functions, or their import
+            paths as "module:attribute". Defaults to ().
+        name (str): name of the output yaml file, without extension. Defaults to the
+            name of the pipeline function.
+    """
+
+    pipeline: PipelineRef
+    transforms: Sequence[Any] = ()
+    name: str = ""
+
+
+def import_object(path: str) -> Any:
+    """Returns the object for an import path, e.g. "my_pipelines.train:pipeline".
+
+    Args:
+        path (str): "module:attribute", where attribute can be dotted.
+
+    Returns:
+        Any: the imported object.
+    """
+    module_name, sep, attr = path.partition(":")
+    if not sep or not attr:
+        raise ValueError("import path must be 'module:attribute': %s" % path)
+    obj = importlib.import_module(module_name)
+    for name in attr.split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+def _job_name(job: CompileJob) -> str:
+    if job.name:
+        return job.name
+    if isinstance(job.pipeline, str):
+        return job.pipeline.rpartition(":")[2].rpartition(".")[2]
+    return job.pipeline.__name__
+
+
+def _portable(job: CompileJob) -> Optional[CompileJob]:
+    """Returns the job with picklable transforms for the worker processes.
+
+    Returns None if a `ContainerOpTransform` cannot be serialized, i.e. it has
+    custom transform functions.
+    """
+    transforms = []
+    for transform in job.transforms:
+        if isinstance(transform, ContainerOpTransform):
+            try:
+                transform = transform.to_dict()
+            except ValueError:
+                return None
+        transforms.append(transform)
+    return job._replace(transforms=transforms)
+
+
+def _resolve(transform: Any) -> Callable:
+    """Returns the op transformer for a (portable) transform."""
+    if isinstance(transform, str):
+        transform = import_object(transform)
+    if isinstance(transform, dict):
+        return ContainerOpTransform.from_dict(transform)
+    if isinstance(transform, ArtifactLocationHelper):
+        return transform.set_envs()
+    if not callable(transform):
+        raise TypeError("transform is not callable: %r" % transform)
+    return transform
+
+
+def _with_transforms(pipeline: Callable, transforms: Sequence[Callable]) -> Callable:
+    """Returns the pipeline function, with the transforms added to its conf."""
+
+    # providing a `pipeline_conf` to the compiler would replace the conf set inside
+    # the pipeline function - add the transforms to the pipeline conf instead.
+    @functools.wraps(pipeline)
+    def pipeline_with_transforms(*args, **kwargs):
+        result = pipeline(*args, **kwargs)
+        conf = kfp.dsl.get_pipeline_conf()
+        for transform in transforms:
+            conf.add_op_transformer(transform)
+        return result
+
+    return pipeline_with_transforms
+
+
+def _source(obj: Any) -> str:
+    """Returns the source of a function, or its bytecode if the source is missing."""
+    func = inspect.unwrap(obj)
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        code = getattr(func, "__code__", None)
+        if code is None:
+            raise ValueError("cannot hash %r for the compile cache" % obj)
+        return code.co_code.hex()
+
+
+def _function_key(obj: Any, seen: frozenset = frozenset()) -> Any:
+    """Returns the json-like cache key of a function, with its closure and defaults."""
+    func = inspect.unwrap(obj)
+    if id(func) in seen:
+        return {"recursive": getattr(func, "__qualname__", "")}
+    seen = seen | {id(func)}
+    try:
+        nonlocals = inspect.getclosurevars(func).nonlocals
+    except TypeError:
+        raise ValueError("cannot hash %r for the compile cache" % obj)
+    return {
+        "source": _source(func),
+        "closure": {
+            name: _value_key(value, seen) for name, value in sorted(nonlocals.items())
+        },
+        "defaults": _value_key(getattr(func, "__defaults__", None), seen),
+        "kwdefaults": _value_key(getattr(func, "__kwdefaults__", None), seen),
+    }
+
+
+def _value_key(value: Any, seen: frozenset = frozenset()) -> Any:
+    """Returns the json-like cache key of a closure or default value.
+
+    Raises:
+        ValueError: the value cannot be hashed stably across processes.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, bytes):
+        return {"bytes": value.hex()}
+    if isinstance(value, enum.Enum):
+        return {"enum": "%s.%s" % (type(value).__qualname__, value.name)}
+    if isinstance(value, (list, tuple)):
+        return {type(value).__name__: [_value_key(item, seen) for item in value]}
+    if isinstance(value, (set, frozenset)):
+        items = [_value_key(item, seen) for item in value]
+        return {"set": sorted(items, key=lambda item: json.dumps(item, sort_keys=True))}
+    if isinstance(value, dict):
+        items = [[_value_key(k, seen), _value_key(v, seen)] for k, v in value.items()]
+        return {
+            "dict": sorted(items, key=lambda item: json.dumps(item, sort_keys=True))
+        }
+    return _object_key(value, seen)
+
+
+def _object_key(value: Any, seen: frozenset) -> Any:
+    """Returns the json-like cache key of a transform, module, class or function."""
+    if isinstance(value, (ContainerOpTransform, ArtifactLocationHelper)):
+        return _transform_key(value)
+    if inspect.ismodule(value):
+        return {"module": value.__name__}
+    if inspect.isclass(value):
+        return {"class": "%s:%s" % (value.__module__, value.__qualname__)}
+    if callable(value):
+        return _function_key(value, seen)
+    raise ValueError("cannot hash %r for the compile cache" % (value,))
+
+
+def _transform_key(transform: Any) -> Any:
+    """Returns the json-like cache key of a transform."""
+    if isinstance(transform, dict):
+        transform = ContainerOpTransform.from_dict(transform)
+    if isinstance(transform, ContainerOpTransform):
+        return {"spec": transform.spec_hash()}
+    if isinstance(transform, ArtifactLocationHelper):
+        return {"helper": _value_key(vars(transform))}
+    if isinstance(transform, str):
+        return {"import": transform, "key": _transform_key(import_object(transform))}
+    return _function_key(transform)
+
+
+def pipeline_key(
+    pipeline: Callable,
+    transforms: Sequence[Any] = (),
+    extra: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Returns the cache key of a compiled pipeline.
+
+    The key is the sha256 of the kfp version, the pipeline function and the
+    transforms. Functions (the pipeline and transform functions) are hashed with
+    their source, signature, default values and closure values (e.g. the arguments
+    of a pipeline factory). `ContainerOpTransform` are hashed with their spec hash.
+
+    NOTE
+    Components defined outside of the pipeline function are not part of the key,
+    provide their version (e.g. a hash of their yaml) with `extra`.
+
+    Args:
+        pipeline (Callable): pipeline function.
+        transforms (Sequence[Any], optional): transforms applied on all ops of
+            the pipeline (see `kfx.dsl.CompileJob`). Defaults to ().
+        extra (Optional[Dict[str, Any]], optional): any other json-like values
+            that change the compiled pipeline. Defaults to None.
+
+    Raises:
+        ValueError: a closure or default value cannot be hashed stably, e.g. an
+            arbitrary object.
+
+    Returns:
+        str: hex digest.
+    """
+    material = {
+        "version": CACHE_VERSION,
+        "kfp": kfp.__version__,
+        "pipeline": "%s:%s" % (pipeline.__module__, pipeline.__qualname__),
+        "function": _function_key(pipeline),
+        "signature": str(inspect.signature(pipeline)),
+        "extra": extra or {},
+        "transforms": [_transform_key(transform) for transform in transforms],
+    }
+    canonical = json.dumps(material, sort_keys=True, default=repr)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _cache_key(func: Callable, transforms: Sequence[Any]) -> Optional[str]:
+    """Returns the cache key of the pipeline, or None if it cannot be hashed."""
+    try:
+        return pipeline_key(func, transforms)
+    except ValueError:
+        return None
+
+
+def _compile(
+    func: Callable, package_path: str, transforms: Sequence[Any], cache: CompileCache
+) -> bool:
+    """Compiles the pipeline, or copies it from the cache. Returns True if cached."""
+    if not package_path.endswith((".yaml", ".yml")):
+        raise ValueError("package path must be a yaml file: %s" % package_path)
+    key = _cache_key(func, transforms) if cache is not None else None
+    text = cache.get(key) if key is not None else None
+    if text is not None:
+        with open(package_path, "w") as fileout:
+            fileout.write(text)
+        return True
+
+    func = _with_transforms(func, [_resolve(item) for item in transforms])
+    with applying_pod_spec_patches():
+        kfp.compiler.Compiler().compile(func, package_path)
+    apply_pod_spec_patches_file(package_path)
+    if key is not None:
+        with open(package_path, "r") as filein:
+            cache.put(key, filein.read())
+    return False
+
+
+def compile_pipeline(
+    pipeline: PipelineRef,
+    package_path: str,
+    transforms: Sequence[Any] = (),
+    cache: CompileCache = None,
+) -> Dict[str, Any]:
+    """Compiles a single pipeline in the current process.
+
+    Args:
+        pipeline (Union[str, Callable]): pipeline function, or "module:function".
+        package_path (str): path to the output workflow yaml (".yaml" or ".yml").
+        transforms (Sequence[Any], optional): transforms to apply on all ops of
+            the pipeline (see `CompileJob`). Defaults to ().
+        cache (CompileCache, optional): returns the cached workflow yaml if the
+            pipeline and transforms are unchanged (see `pipeline_key`). Pipelines
+            that cannot be hashed are compiled without the cache. Defaults to None.
+
+    Returns:
+        Dict[str, Any]: path, timing (in seconds), cache hit and error (if any) of
+            the job.
+    """
+    result: Dict[str, Any] = {
+        "path": package_path,
+        "seconds": 0.0,
+        "cached": False,
+        "error": None,
+    }
+    started = time.perf_counter()
+    try:
+        func = import_object(pipeline) if isinstance(pipeline, str) else pipeline
+        result["cached"] = _compile(func, package_path, transforms, cache)
+    except Exception:  # pylint: disable=broad-except
+        result["error"] = traceback.format_exc(limit=-3)
+    result["seconds"] = round(time.perf_counter() - started, 6)
+    return result
+
+
+def _compile_job(
+    index: int, name: str, job: CompileJob, output_dir: str, cache: CompileCache
+):
+    result = compile_pipeline(
+        job.pipeline, os.path.join(output_dir, name + ".yaml"), job.transforms, cache
+    )
+    result.update(index=index, name=name, pid=os.getpid())
+    return result
+
+
+def _compile_in_pool(tasks: Sequence[tuple], workers: Optional[int]):
+    """Compiles the jobs across a process pool, and the jobs with transforms that
+    cannot be serialized in the current process."""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        local_tasks = []
+        for index, name, job, *args in tasks:
+            portable = _portable(job)
+            if portable is None:
+                local_tasks.append((index, name, job, *args))
+            else:
+                futures.append(
+                    executor.submit(_compile_job, index, name, portable, *args)
+                )
+        for task in local_tasks:
+            yield _compile_job(*task)
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def compile_pipelines(
+    jobs: Iterable[Union[CompileJob, PipelineRef]],
+    output_dir: str,
+    workers: int = None,
+    cache: CompileCache = None,
+) -> Iterator[Dict[str, Any]]:
+    """Compiles many pipelines in parallel across a process pool.
+
+    ::
+
+        import kfx.dsl
+
+        transform = kfx.dsl.ContainerOpTransform().set_image_pull_policy("Always")
+        jobs = [
+            kfx.dsl.CompileJob(
+                "my_pipelines.train:pipeline",
+                transforms=[transform.set_resources(memory=memory)],
+                name="train-%s" % memory,
+            )
+            for memory in ("1G", "4G", "16G")
+        ]
+
+        for result in kfx.dsl.compile_pipelines(jobs, "./dist", workers=4):
+            print(result["name"], result["seconds"], result["error"])
+
+    `ContainerOpTransform` are sent to the workers as dicts (see
+    `ContainerOpTransform.to_dict`), other transforms must be picklable, e.g.
+    module-level functions or "module:attribute" import paths. Steps registered with
+    `kfx.dsl.register_step` must be registered when the workers import the module.
+    Jobs with a `ContainerOpTransform` of custom transform functions are compiled in
+    the current process.
+
+    Args:
+        jobs (Iterable[Union[CompileJob, str, Callable]]): pipelines to compile.
+        output_dir (str): directory for the workflow yamls (`<name>.yaml`).
+        workers (int, optional): number of worker processes. Compiles in the
+            current process if 1. Defaults to the number of cpus.
+        cache (CompileCache, optional): cache of the compiled workflow yamls. Least
+            recently used entries are evicted after all the jobs. Defaults to None.
+
+    Yields:
+        Dict[str, Any]: index, name, path, timing (in seconds), cache hit and error
+            (if any) of each job, as soon as it is compiled.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = []
+    for index, job in enumerate(jobs):
+        if not isinstance(job, CompileJob):
+            job = CompileJob(job)
+        tasks.append((index, _job_name(job), job, output_dir, cache))
+
+    counts = collections.Counter(task[1] for task in tasks)
+    duplicated = sorted(name for name, count in counts.items() if count > 1)
+    if duplicated:
+        raise ValueError("pipelines must have unique names: %s" % duplicated)
+
+    try:
+        if workers == 1 or len(tasks) <= 1:
+            for task in tasks:
+                yield _compile_job(*task)
+            return
+
+        yield from _compile_in_pool(tasks, workers)
+    finally:
+        if cache is not None:
+            cache.evict()
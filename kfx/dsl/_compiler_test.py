@@ -0,0 +1,199 @@
+"""Tests for kfx.dsl._compiler."""
+import json
+import os
+
+import kfp.dsl
+import pytest
+import yaml
+
+from kfx.dsl._artifact_location import ArtifactLocationHelper, set_pod_metadata_envs
+from kfx.dsl._compile_cache import CompileCache
+from kfx.dsl._compiler import CompileJob, compile_pipelines, import_object, pipeline_key
+from kfx.dsl._transformers import ContainerOpTransform
+
+
+@kfp.dsl.pipeline(name="echo")
+def echo_pipeline(text: str = "hello"):
+    kfp.dsl.ContainerOp(name="echo", image="bash", arguments=["echo", text])
+
+
+@kfp.dsl.pipeline(name="broken")
+def broken_pipeline():
+    raise RuntimeError("broken pipeline")
+
+
+def set_label(op: kfp.dsl.ContainerOp) -> kfp.dsl.ContainerOp:
+    op.add_pod_label("compiled-by", "kfx")
+    return op
+
+
+def _container(path) -> dict:
+    with open(path, "r") as filein:
+        workflow = yaml.safe_load(filein)
+    return next(
+        template
+        for template in workflow["spec"]["templates"]
+        if "container" in template
+    )
+
+
+def test_import_object():
+    assert import_object("kfx.dsl._compiler_test:echo_pipeline") is echo_pipeline
+    assert import_object("kfx.dsl:ContainerOpTransform.set_resources")
+    with pytest.raises(ValueError):
+        import_object("kfx.dsl._compiler_test")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_compile_pipelines(tmp_path, workers):
+    transform = (
+        ContainerOpTransform()
+        .set_image_pull_policy("Always")
+        .set_priority_class("high")
+    )
+    helper = ArtifactLocationHelper(scheme="minio", bucket="mlpipeline")
+    jobs = [
+        CompileJob(
+            "kfx.dsl._compiler_test:echo_pipeline",
+            transforms=[transform.set_resources(memory=memory), helper, set_label],
+            name="echo-%s" % memory,
+        )
+        for memory in ("1G", "4G")
+    ] + [broken_pipeline]
+
+    results = sorted(
+        compile_pipelines(jobs, str(tmp_path / "dist"), workers=workers),
+        key=lambda result: result["index"],
+    )
+
+    assert [result["name"] for result in results] == [
+        "echo-1G",
+        "echo-4G",
+        "broken_pipeline",
+    ]
+    assert [result["error"] is None for result in results] == [True, True, False]
+    assert "broken pipeline" in results[2]["error"]
+    assert all(result["seconds"] > 0 for result in results)
+
+    container = _container(results[1]["path"])
+    assert container["container"]["imagePullPolicy"] == "Always"
+    assert container["container"]["resources"]["limits"] == {"memory": "4G"}
+    assert container["metadata"]["labels"]["compiled-by"] == "kfx"
+    assert "WORKFLOW_ARTIFACT_BUCKET" in {
+        env["name"] for env in container["container"]["env"]
+    }
+    assert json.loads(container["podSpecPatch"]) == {"priorityClassName": "high"}
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_compile_pipelines_custom_transforms(tmp_path, workers):
+    jobs = [
+        CompileJob(echo_pipeline, [ContainerOpTransform([set_label])], "custom"),
+        CompileJob(echo_pipeline, [ContainerOpTransform().set_resources(cpu="1")], "1"),
+    ]
+
+    results = list(compile_pipelines(jobs, str(tmp_path), workers=workers))
+    assert [result["error"] for result in results] == [None, None]
+    container = _container(str(tmp_path / "custom.yaml"))
+    assert container["metadata"]["labels"]["compiled-by"] == "kfx"
+
+
+def test_compile_pipelines_unique_names(tmp_path):
+    with pytest.raises(ValueError):
+        list(compile_pipelines([echo_pipeline, echo_pipeline], str(tmp_path)))
+
+
+def test_pipeline_key():
+    transform = ContainerOpTransform().set_resources(memory="1G")
+
+    assert pipeline_key(echo_pipeline) == pipeline_key(echo_pipeline)
+    assert pipeline_key(echo_pipeline, [transform]) == pipeline_key(
+        echo_pipeline, [transform.to_dict()]
+    )
+    assert (
+        len(
+            {
+                pipeline_key(echo_pipeline),
+                pipeline_key(broken_pipeline),
+                pipeline_key(echo_pipeline, [transform]),
+                pipeline_key(echo_pipeline, [transform.set_resources(memory="2G")]),
+                pipeline_key(echo_pipeline, [set_label]),
+                pipeline_key(echo_pipeline, extra={"component": "v2"}),
+            }
+        )
+        == 6
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_compile_pipelines_cache(tmp_path, workers):
+    cache = CompileCache(str(tmp_path / "cache"))
+    jobs = [
+        CompileJob(echo_pipeline, [ContainerOpTransform().set_resources(cpu=cpu)], cpu)
+        for cpu in ("1", "2")
+    ]
+
+    results = list(compile_pipelines(jobs, str(tmp_path / "a"), workers, cache))
+    assert [result["cached"] for result in results] == [False, False]
+    assert len(os.listdir(cache.directory)) == 2
+
+    jobs.append(CompileJob(echo_pipeline, [], "3"))
+    results = sorted(
+        compile_pipelines(jobs, str(tmp_path / "b"), workers, cache),
+        key=lambda result: result["index"],
+    )
+    assert [result["cached"] for result in results] == [True, True, False]
+    for name in ("1", "2"):
+        assert (tmp_path / "a" / (name + ".yaml")).read_text() == (
+            tmp_path / "b" / (name + ".yaml")
+        ).read_text()
+
+
+def make_echo_pipeline(region: str):
+    @kfp.dsl.pipeline(name="echo-region")
+    def echo_region_pipeline():
+        kfp.dsl.ContainerOp(name="echo", image="bash", arguments=["echo", region])
+
+    return echo_region_pipeline
+
+
+def test_pipeline_key_closure(tmp_path):
+    assert pipeline_key(make_echo_pipeline("us")) != pipeline_key(
+        make_echo_pipeline("eu")
+    )
+    assert pipeline_key(make_echo_pipeline("us")) == pipeline_key(
+        make_echo_pipeline("us")
+    )
+    assert pipeline_key(echo_pipeline, [set_pod_metadata_envs(pod_name="A")]) != (
+        pipeline_key(echo_pipeline, [set_pod_metadata_envs(pod_name="B")])
+    )
+
+    def with_default(op, label=("a", 1)):
+        return op
+
+    def with_kwdefault(op, *, label="a"):
+        return op
+
+    keys = {pipeline_key(echo_pipeline, [with_default])}
+    with_default.__defaults__ = (("b", 1),)
+    keys.add(pipeline_key(echo_pipeline, [with_default]))
+    keys.add(pipeline_key(echo_pipeline, [with_kwdefault]))
+    with_kwdefault.__kwdefaults__ = {"label": "b"}
+    keys.add(pipeline_key(echo_pipeline, [with_kwdefault]))
+    assert len(keys) == 4
+
+    with pytest.raises(ValueError):
+        pipeline_key(make_echo_pipeline(object()))
+
+    cache = CompileCache(str(tmp_path / "cache"))
+    for _ in range(2):
+        jobs = [
+            CompileJob(make_echo_pipeline(region), name=region)
+            for region in ("us", "eu")
+        ] + [CompileJob(make_echo_pipeline(object()), name="unhashable")]
+        results = list(compile_pipelines(jobs, str(tmp_path / "dist"), 1, cache))
+        assert [result["error"] for result in results] == [None, None, None]
+    assert [result["cached"] for result in results] == [True, True, False]
+    for region in ("us", "eu"):
+        container = _container(str(tmp_path / "dist" / (region + ".yaml")))
+        assert container["container"]["args"] == ["echo", region]
@@ -0,0 +1,84 @@
+"""Pins container images to immutable digests from a lock file.
+
+A lock file is a json or yaml mapping of image references to their digests, e.g.
+
+::
+
+    # images.lock.yaml
+    images:
+      e2fyi/kfx:latest: sha256:4f2b...
+      python:3.8-slim: docker.io/library/python@sha256:9c1d...
+
+The `images` key is optional. A digest can be a bare `sha256:...` (the tag of the
+image is replaced by the digest) or a full image reference with a digest.
+"""
+import json
+from typing import Dict, Union
+
+DIGEST_SEPARATOR = "@"
+
+
+def _repository(image: str) -> str:
+    """Returns the image without its tag or digest, e.g. "e2fyi/kfx:1.0" -> "e2fyi/kfx"."""
+    image = image.split(DIGEST_SEPARATOR, 1)[0]
+    name_start = image.rfind("/") + 1
+    tag_start = image.find(":", name_start)
+    return image if tag_start < 0 else image[:tag_start]
+
+
+def _with_default_tag(image: str) -> str:
+    """Returns the image with the "latest" tag if it has no tag or digest."""
+    if DIGEST_SEPARATOR in image or image != _repository(image):
+        return image
+    return image + ":latest"
+
+
+def load_image_lock(source: Union[str, Dict[str, str]]) -> Dict[str, str]:
+    """Returns the image references and their pinned references with digests.
+
+    Args:
+        source (Union[str, Dict[str, str]]): path to a json or yaml lock file, or
+            the lock itself.
+
+    Returns:
+        Dict[str, str]: e.g. `{"e2fyi/kfx:latest": "e2fyi/kfx@sha256:4f2b..."}`.
+    """
+    if isinstance(source, str):
+        with open(source, "r") as filein:
+            if source.endswith(".json"):
+                source = json.load(filein)
+            else:
+                import yaml  # pylint: disable=import-outside-toplevel
+
+                source = yaml.safe_load(filein) or {}
+    images = source.get("images", source)  # type: ignore
+
+    lock = {}
+    for image, digest in images.items():
+        if DIGEST_SEPARATOR not in digest:
+            if not digest.startswith("sha256:"):
+                raise ValueError("invalid digest for %s: %s" % (image, digest))
+            digest = _repository(image) + DIGEST_SEPARATOR + digest
+        lock[_with_default_tag(image)] = digest
+    return lock
+
+
+def pin_image(image: str, lock: Dict[str, str]) -> str:
+    """Returns the image reference with a digest.
+
+    Args:
+        image (str): image reference, e.g. "bash" or "e2fyi/kfx:latest".
+        lock (Dict[str, str]): lock from `load_image_lock`.
+
+    Raises:
+        KeyError: if the image is not pinned in the lock.
+
+    Returns:
+        str: image reference with a digest, e.g. "e2fyi/kfx@sha256:4f2b...".
+    """
+    if DIGEST_SEPARATOR in image:
+        return image
+    try:
+        return lock[_with_default_tag(image)]
+    except KeyError:
+        raise KeyError("image is not pinned in the lock file: %s" % image) from None
@@ -0,0 +1,35 @@
+"""Tests for kfx.dsl._image_lock."""
+import pytest
+
+from kfx.dsl._image_lock import load_image_lock, pin_image
+
+DIGEST = "sha256:" + "a" * 64
+
+
+def test_load_image_lock(tmp_path):
+    path = tmp_path / "images.lock.yaml"
+    path.write_text(
+        "images:\n"
+        "  bash: %s\n"
+        "  localhost:5000/e2fyi/kfx:1.0: %s\n"
+        "  python:3.8: docker.io/library/python@%s\n" % (DIGEST, DIGEST, DIGEST)
+    )
+    lock = load_image_lock(str(path))
+    assert lock == {
+        "bash:latest": "bash@" + DIGEST,
+        "localhost:5000/e2fyi/kfx:1.0": "localhost:5000/e2fyi/kfx@" + DIGEST,
+        "python:3.8": "docker.io/library/python@" + DIGEST,
+    }
+    assert load_image_lock(lock) == lock
+
+    with pytest.raises(ValueError):
+        load_image_lock({"bash": "latest"})
+
+
+def test_pin_image():
+    lock = load_image_lock({"bash": DIGEST})
+    assert pin_image("bash", lock) == "bash@" + DIGEST
+    assert pin_image("bash:latest", lock) == "bash@" + DIGEST
+    assert pin_image("other@" + DIGEST, lock) == "other@" + DIGEST
+    with pytest.raises(KeyError):
+        pin_image("bash:5", lock)
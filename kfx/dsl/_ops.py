@@ -0,0 +1,67 @@
+"""Helpers shared by the transforms and task modifiers of kfp ops."""
+from fnmatch import fnmatch
+from typing import Optional, Tuple
+
+import kfp.dsl
+import kubernetes.client as k8s
+
+from kfx.dsl._compat import sanitize_k8s_name
+
+
+def op_names(op: kfp.dsl.ContainerOp) -> Tuple[str, ...]:
+    """Returns the names of the op - its display name, and its unique name."""
+    return (op.human_name, op.name, sanitize_k8s_name(op.name))
+
+
+def op_matches(op: kfp.dsl.ContainerOp, op_name: str) -> bool:
+    """Returns True if any name of the op matches the glob pattern."""
+    return any(fnmatch(name, op_name) for name in op_names(op))
+
+
+def mount_volume(
+    op: kfp.dsl.ContainerOp,
+    volume: k8s.V1Volume,
+    mount_path: str,
+    sidecar_name: Optional[str],
+    read_only: bool = None,
+) -> kfp.dsl.ContainerOp:
+    """Adds the volume to the op (once), and mounts it in the main container and sidecars.
+
+    Raises:
+        ValueError: if the op has another volume with the same name, or another
+            volume is mounted at the mount path.
+    """
+    existing = [item for item in op.volumes if item.name == volume.name]
+    if existing and existing[0] != volume:
+        raise ValueError(
+            "op %s already has a different volume named %s" % (op.name, volume.name)
+        )
+    containers = [op.container] + [
+        sidecar
+        for sidecar in op.sidecars
+        if sidecar_name is not None and fnmatch(sidecar.name, sidecar_name)
+    ]
+    mounts = {
+        mount.mount_path: mount.name
+        for container in containers
+        for mount in container.volume_mounts or []
+        if mount.mount_path == mount_path and mount.name != volume.name
+    }
+    if mounts:
+        raise ValueError(
+            "%s is already mounted from volume %s in op %s"
+            % (mount_path, mounts[mount_path], op.name)
+        )
+
+    if not existing:
+        op.add_volume(volume)
+    for container in containers:
+        if all(
+            mount.mount_path != mount_path for mount in container.volume_mounts or []
+        ):
+            container.add_volume_mount(
+                k8s.V1VolumeMount(
+                    name=volume.name, mount_path=mount_path, read_only=read_only
+                )
+            )
+    return op
@@ -0,0 +1,135 @@
+"""Pod spec fields that kfp ContainerOp does not support, e.g. priorityClassName.
+
+kfp ops have no field for the pod priority class or the topology spread
+constraints. kfx stores them as a json pod annotation on the op, which is moved
+into the `podSpecPatch` of the Argo template after compilation (see
+`apply_pod_spec_patches`). `kfx.dsl.compile_pipeline` does this automatically.
+
+NOTE
+`kfp.compiler.Compiler` and `kfp.Client.create_run_from_pipeline_func` do not
+apply the annotation, i.e. the pod spec fields are silently ignored. A warning is
+raised when a patch is added outside of `kfx.dsl.compile_pipeline`, unless the op
+supports `set_pod_spec_patch` (which kfp compiles natively).
+"""
+import contextlib
+import json
+import threading
+import warnings
+from typing import Any, Dict, Iterator
+
+import kfp.dsl
+import yaml
+
+from kfx.dsl._compat import dump_yaml
+
+POD_SPEC_PATCH_ANNOTATION = "kfx.e2fyi.com/pod-spec-patch"
+
+_STATE = threading.local()
+
+
+@contextlib.contextmanager
+def applying_pod_spec_patches() -> Iterator[None]:
+    """Context in which the pod spec patches are known to be applied after compile.
+
+    Used by `kfx.dsl.compile_pipeline` (and anything that calls
+    `apply_pod_spec_patches_file` on the compiled workflow) to silence the warning of
+    `update_pod_spec_patch`.
+    """
+    depth = getattr(_STATE, "depth", 0)
+    _STATE.depth = depth + 1
+    try:
+        yield
+    finally:
+        _STATE.depth = depth
+
+
+def _merge(patch: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """Merges the update into the patch - lists are appended, the rest replaced."""
+    for key, value in update.items():
+        if isinstance(value, list) and isinstance(patch.get(key), list):
+            patch[key] = patch[key] + [item for item in value if item not in patch[key]]
+        else:
+            patch[key] = value
+    return patch
+
+
+def update_pod_spec_patch(
+    op: kfp.dsl.ContainerOp, update: Dict[str, Any]
+) -> kfp.dsl.ContainerOp:
+    """Adds pod spec fields to the pod spec patch annotation of the op.
+
+    The patch is also set with `op.set_pod_spec_patch` if the kfp version supports
+    it. Otherwise, a `UserWarning` is raised unless called inside
+    `applying_pod_spec_patches` (e.g. by `kfx.dsl.compile_pipeline`), as the
+    annotation is ignored by `kfp.compiler.Compiler`.
+
+    Args:
+        op (kfp.dsl.ContainerOp): kfp op.
+        update (Dict[str, Any]): pod spec fields, e.g. `{"priorityClassName": "high"}`.
+
+    Returns:
+        kfp.dsl.ContainerOp: the same op.
+    """
+    patch = json.loads(op.pod_annotations.get(POD_SPEC_PATCH_ANNOTATION, "{}"))
+    patch_json = json.dumps(_merge(patch, update), sort_keys=True)
+    op.add_pod_annotation(POD_SPEC_PATCH_ANNOTATION, patch_json)
+
+    set_pod_spec_patch = getattr(op, "set_pod_spec_patch", None)
+    if callable(set_pod_spec_patch):
+        set_pod_spec_patch(patch_json)
+    elif not getattr(_STATE, "depth", 0):
+        warnings.warn(
+            "pod spec patch %s of op %s is only applied by kfx.dsl.compile_pipeline "
+            "or kfx.dsl.apply_pod_spec_patches_file - it is ignored by "
+            "kfp.compiler.Compiler" % (sorted(update), op.name),
+            UserWarning,
+        )
+    return op
+
+
+def apply_pod_spec_patches(workflow: Dict[str, Any]) -> bool:
+    """Moves the kfx pod spec patch annotations into `podSpecPatch` of the templates.
+
+    Args:
+        workflow (Dict[str, Any]): compiled Argo workflow.
+
+    Returns:
+        bool: True if the workflow is modified.
+    """
+    modified = False
+    for template in workflow.get("spec", {}).get("templates", []):
+        annotations = template.get("metadata", {}).get("annotations", {})
+        if POD_SPEC_PATCH_ANNOTATION not in annotations:
+            continue
+        update = json.loads(annotations.pop(POD_SPEC_PATCH_ANNOTATION))
+        patch = json.loads(template.get("podSpecPatch", "{}"))
+        template["podSpecPatch"] = json.dumps(_merge(patch, update), sort_keys=True)
+        modified = True
+    return modified
+
+
+def apply_pod_spec_patches_file(path: str) -> bool:
+    """Same as `apply_pod_spec_patches`, for a compiled workflow yaml.
+
+    ::
+
+        kfp.compiler.Compiler().compile(pipeline, "pipeline.yaml")
+        kfx.dsl.apply_pod_spec_patches_file("pipeline.yaml")
+
+    Args:
+        path (str): path to the workflow yaml.
+
+    Returns:
+        bool: True if the workflow is modified.
+    """
+    with open(path, "r") as filein:
+        text = filein.read()
+    if POD_SPEC_PATCH_ANNOTATION not in text:
+        return False
+
+    workflow = yaml.safe_load(text)
+    if not apply_pod_spec_patches(workflow):
+        return False
+    with open(path, "w") as fileout:
+        fileout.write(dump_yaml(workflow))
+    return True
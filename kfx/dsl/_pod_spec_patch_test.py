@@ -0,0 +1,64 @@
+"""Tests for kfx.dsl._pod_spec_patch."""
+import json
+import warnings
+
+import kfp.dsl
+import pytest
+
+from kfx.dsl._pod_spec_patch import (
+    POD_SPEC_PATCH_ANNOTATION,
+    apply_pod_spec_patches,
+    applying_pod_spec_patches,
+    update_pod_spec_patch,
+)
+
+
+def test_apply_pod_spec_patches():
+    workflow = {
+        "spec": {
+            "templates": [
+                {"name": "dag"},
+                {
+                    "name": "train",
+                    "metadata": {
+                        "annotations": {
+                            POD_SPEC_PATCH_ANNOTATION: json.dumps(
+                                {"priorityClassName": "high"}
+                            ),
+                            "other": "value",
+                        }
+                    },
+                    "podSpecPatch": json.dumps({"containers": [{"name": "main"}]}),
+                },
+            ]
+        }
+    }
+
+    assert apply_pod_spec_patches(workflow)
+    template = workflow["spec"]["templates"][1]
+    assert template["metadata"]["annotations"] == {"other": "value"}
+    assert json.loads(template["podSpecPatch"]) == {
+        "containers": [{"name": "main"}],
+        "priorityClassName": "high",
+    }
+    assert not apply_pod_spec_patches(workflow)
+
+
+def test_update_pod_spec_patch():
+    op = kfp.dsl.ContainerOp(name="train", image="bash")
+
+    with pytest.warns(UserWarning, match="ignored by kfp.compiler.Compiler"):
+        update_pod_spec_patch(op, {"priorityClassName": "high"})
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        with applying_pod_spec_patches():
+            update_pod_spec_patch(op, {"hostNetwork": True})
+
+        patches = []
+        op.set_pod_spec_patch = patches.append
+        update_pod_spec_patch(op, {"priorityClassName": "low"})
+
+    expected = {"hostNetwork": True, "priorityClassName": "low"}
+    assert json.loads(op.pod_annotations[POD_SPEC_PATCH_ANNOTATION]) == expected
+    assert json.loads(patches[0]) == expected
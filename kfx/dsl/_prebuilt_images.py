@@ -0,0 +1,195 @@
+"""Prebuilt images for lightweight python components with `packages_to_install`.
+
+`kfp.components.func_to_container_op(..., packages_to_install=[...])` runs
+`pip install` every time a pod starts. `collect_images` finds the base images and
+packages of the ops in compiled pipelines, `write_build_contexts` writes a Dockerfile
+for each unique (base image, packages), and
+`ContainerOpTransform.use_prebuilt_images` replaces the image of the matching ops by
+the prebuilt image, without the `pip install` step.
+
+::
+
+    kfx prebuild dist/*.yaml --repository registry.example.com/kfp-prebuilt -d build
+    # build and push each build/<tag>/ context, e.g.
+    # docker build -t registry.example.com/kfp-prebuilt:<tag> build/<tag>
+
+    transform = kfx.dsl.ContainerOpTransform().use_prebuilt_images(
+        "build/images.json"
+    )
+"""
+import hashlib
+import json
+import os
+import shlex
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import yaml
+
+MANIFEST_NAME = "images.json"
+_PIP_INSTALL = (
+    "PIP_DISABLE_PIP_VERSION_CHECK=1 python3 -m pip install --quiet "
+    "--no-warn-script-location "
+)
+_DOCKERFILE = """FROM {base_image}
+COPY requirements.txt /tmp/kfx-requirements.txt
+RUN PIP_DISABLE_PIP_VERSION_CHECK=1 python3 -m pip install --no-cache-dir \\
+    -r /tmp/kfx-requirements.txt && rm /tmp/kfx-requirements.txt
+"""
+
+
+class PrebuiltImage(NamedTuple):
+    """A base image with the packages installed by a lightweight component.
+
+    Attributes:
+        base_image (str): base image of the component.
+        packages (Tuple[str, ...]): sorted unique packages to install.
+        image (str): reference of the prebuilt image.
+    """
+
+    base_image: str
+    packages: Tuple[str, ...]
+    image: str = ""
+
+    @property
+    def tag(self) -> str:
+        """Tag of the prebuilt image - a hash of the base image and packages."""
+        return image_tag(self.base_image, self.packages)
+
+
+def image_tag(base_image: str, packages: Iterable[str]) -> str:
+    """Returns the tag of the prebuilt image for the base image and packages.
+
+    Args:
+        base_image (str): base image of the component.
+        packages (Iterable[str]): packages to install.
+
+    Returns:
+        str: the first 16 hex chars of a sha256.
+    """
+    key = json.dumps([base_image, sorted(set(packages))])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def parse_pip_install(command: Optional[List[str]]) -> Optional[List[str]]:
+    """Returns the packages of the `pip install` step of a lightweight component.
+
+    Args:
+        command (Optional[List[str]]): command of the container.
+
+    Returns:
+        Optional[List[str]]: packages, or None if the command has no pip install.
+    """
+    if not command or len(command) < 3 or command[:2] != ["sh", "-c"]:
+        return None
+    script = command[2]
+    if not script.startswith("(" + _PIP_INSTALL) or not script.endswith(
+        ' --user) && "$0" "$@"'
+    ):
+        return None
+    packages = script[len(_PIP_INSTALL) + 1 :].split(" || ", 1)[0]
+    return shlex.split(packages)
+
+
+def strip_pip_install(command: List[str]) -> List[str]:
+    """Returns the command without the `pip install` step.
+
+    Args:
+        command (List[str]): command of the container.
+
+    Returns:
+        List[str]: command of the component.
+    """
+    if parse_pip_install(command) is None:
+        return command
+    return command[3:]
+
+
+def _templates(workflow: Union[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if isinstance(workflow, str):
+        with open(workflow, "r") as filein:
+            workflow = yaml.safe_load(filein)
+    return workflow.get("spec", {}).get("templates", [])  # type: ignore
+
+
+def collect_images(
+    workflows: Iterable[Union[str, Dict[str, Any]]], repository: str
+) -> List[PrebuiltImage]:
+    """Returns the unique base images and packages of the ops in the workflows.
+
+    Args:
+        workflows (Iterable[Union[str, Dict[str, Any]]]): paths to compiled workflow
+            yamls, or the workflows.
+        repository (str): image repository of the prebuilt images, e.g.
+            "registry.example.com/kfp-prebuilt".
+
+    Returns:
+        List[PrebuiltImage]: prebuilt images, sorted by base image and packages.
+    """
+    images = {}
+    for workflow in workflows:
+        for template in _templates(workflow):
+            container = template.get("container") or {}
+            packages = parse_pip_install(container.get("command"))
+            if not packages or not container.get("image"):
+                continue
+            image = PrebuiltImage(container["image"], tuple(sorted(set(packages))))
+            images[image.tag] = image._replace(image="%s:%s" % (repository, image.tag))
+    return sorted(images.values())
+
+
+def write_build_contexts(
+    images: Iterable[PrebuiltImage], output_dir: str
+) -> Dict[str, Any]:
+    """Writes a docker build context for each prebuilt image, and a manifest.
+
+    Each context `<output_dir>/<tag>/` has a `Dockerfile` and a `requirements.txt`.
+    The manifest `<output_dir>/images.json` is used by
+    `ContainerOpTransform.use_prebuilt_images`.
+
+    Args:
+        images (Iterable[PrebuiltImage]): images from `collect_images`.
+        output_dir (str): directory of the build contexts.
+
+    Returns:
+        Dict[str, Any]: the manifest.
+    """
+    manifest: Dict[str, Any] = {"images": []}
+    for image in images:
+        context = os.path.join(output_dir, image.tag)
+        os.makedirs(context, exist_ok=True)
+        with open(os.path.join(context, "Dockerfile"), "w") as fileout:
+            fileout.write(_DOCKERFILE.format(base_image=image.base_image))
+        with open(os.path.join(context, "requirements.txt"), "w") as fileout:
+            fileout.write("".join(package + "\n" for package in image.packages))
+        manifest["images"].append(
+            {
+                "base_image": image.base_image,
+                "packages": list(image.packages),
+                "image": image.image,
+                "context": image.tag,
+            }
+        )
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w") as fileout:
+        json.dump(manifest, fileout, indent=2)
+    return manifest
+
+
+def load_prebuilt_images(source: Union[str, Dict[str, Any]]) -> Dict[str, str]:
+    """Returns the prebuilt images by their tag (see `image_tag`).
+
+    Args:
+        source (Union[str, Dict[str, Any]]): path to the manifest written by
+            `write_build_contexts`, the manifest, or the returned dict itself.
+
+    Returns:
+        Dict[str, str]: image references by their tag.
+    """
+    if isinstance(source, str):
+        with open(source, "r") as filein:
+            source = json.load(filein)
+    if "images" not in source:
+        return dict(source)  # type: ignore
+    return {
+        image_tag(item["base_image"], item["packages"]): item["image"]
+        for item in source["images"]  # type: ignore
+    }
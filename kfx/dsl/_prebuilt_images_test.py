@@ -0,0 +1,86 @@
+"""Tests for kfx.dsl._prebuilt_images."""
+import json
+
+import kfp.components
+import kfp.dsl
+import yaml
+
+from kfx.dsl._compiler import compile_pipeline
+from kfx.dsl._prebuilt_images import (
+    collect_images,
+    parse_pip_install,
+    strip_pip_install,
+    write_build_contexts,
+)
+from kfx.dsl._transformers import ContainerOpTransform
+
+
+def echo(text: str) -> str:
+    return text
+
+
+echo_op = kfp.components.func_to_container_op(
+    echo, base_image="python:3.8", packages_to_install=["kfx", "numpy==1.19"]
+)
+plain_op = kfp.components.func_to_container_op(echo, base_image="python:3.8")
+
+
+@kfp.dsl.pipeline(name="prebuilt")
+def prebuilt_pipeline(text: str = "hello"):
+    echo_op(text)
+    echo_op(text)
+    plain_op(text)
+
+
+def _containers(path) -> list:
+    with open(path, "r") as filein:
+        workflow = yaml.safe_load(filein)
+    return [
+        template["container"]
+        for template in workflow["spec"]["templates"]
+        if "container" in template
+    ]
+
+
+def test_parse_pip_install():
+    command = echo_op.component_spec.implementation.container.command
+    assert parse_pip_install(command) == ["kfx", "numpy==1.19"]
+    assert strip_pip_install(command)[:2] == ["sh", "-ec"]
+    assert strip_pip_install(command[3:]) == command[3:]
+    assert (
+        parse_pip_install(plain_op.component_spec.implementation.container.command)
+        is None
+    )
+    assert parse_pip_install(["sh", "-c", "echo"]) is None
+
+
+def test_prebuilt_images(tmp_path):
+    path = str(tmp_path / "pipeline.yaml")
+    assert compile_pipeline(prebuilt_pipeline, path)["error"] is None
+
+    images = collect_images([path], "registry/prebuilt")
+    assert len(images) == 1
+    assert images[0].base_image == "python:3.8"
+    assert images[0].packages == ("kfx", "numpy==1.19")
+    assert images[0].image == "registry/prebuilt:" + images[0].tag
+
+    manifest = write_build_contexts(images, str(tmp_path / "build"))
+    context = tmp_path / "build" / images[0].tag
+    assert (context / "Dockerfile").read_text().startswith("FROM python:3.8\n")
+    assert (context / "requirements.txt").read_text() == "kfx\nnumpy==1.19\n"
+    assert json.loads((tmp_path / "build" / "images.json").read_text()) == manifest
+
+    transform = ContainerOpTransform().use_prebuilt_images(
+        str(tmp_path / "build" / "images.json")
+    )
+    assert compile_pipeline(prebuilt_pipeline, path, [transform])["error"] is None
+    containers = _containers(path)
+    assert [container["image"] for container in containers] == [
+        images[0].image,
+        images[0].image,
+        "python:3.8",
+    ]
+    assert all(
+        parse_pip_install(container["command"]) is None for container in containers
+    )
+    assert collect_images([path], "registry/prebuilt") == []
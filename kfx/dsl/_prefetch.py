@@ -0,0 +1,271 @@
+"""Concurrent download of the input artifacts of a task into a local directory.
+
+Tasks usually download their inputs one after another before any compute starts.
+`prefetch` downloads all of them at the same time with a bounded thread pool, and
+each store reuses a pool of connections across the downloads. The progress and
+throughput are logged to the `kfx.dsl._prefetch` logger.
+
+`ContainerOpTransform.prefetch_inputs` runs `kfx prefetch` as an init container,
+which downloads the inputs into an `emptyDir` volume mounted in the main container.
+
+Stores are selected by the scheme of the uri:
+
+- `file://` or a local path (e.g. a mounted volume),
+- `volume://` uris from `KfpArtifact.uri` (see `kfx.dsl.volume_path`),
+- `http://` and `https://`,
+- `gs://` and `gcs://` (with `google-cloud-storage`).
+
+Other stores can be added with `register_store`.
+"""
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, BinaryIO, Callable, Dict, List, Mapping, Union
+from urllib.parse import urlparse
+
+from kfx.dsl._artifact_location import VOLUME_SCHEME, volume_path
+
+LOGGER = logging.getLogger(__name__)
+CHUNK_SIZE = 1 << 20
+
+Opener = Callable[[str], BinaryIO]
+Inputs = Union[Mapping[str, str], List[str]]
+
+_STORES: Dict[str, Callable[[int], Opener]] = {}
+
+
+def register_store(scheme: str, factory: Callable[[int], Opener]):
+    """Registers a store for the uris with the scheme.
+
+    The factory is called once per `prefetch` with the maximum number of concurrent
+    downloads (e.g. to size its connection pool), and returns a thread-safe function
+    that opens a uri as a readable binary file.
+
+    ::
+
+        def minio_store(max_connections: int):
+            client = minio.Minio(
+                "minio-service.kubeflow:9000",
+                http_client=urllib3.PoolManager(maxsize=max_connections),
+            )
+
+            def open_uri(uri: str):
+                parsed = urllib.parse.urlparse(uri)
+                return client.get_object(parsed.netloc, parsed.path.lstrip("/"))
+
+            return open_uri
+
+        kfx.dsl.register_store("minio", minio_store)
+
+    Args:
+        scheme (str): scheme of the uris, e.g. "s3".
+        factory (Callable[[int], Callable[[str], BinaryIO]]): store factory.
+    """
+    _STORES[scheme] = factory
+
+
+def _file_store(max_connections: int) -> Opener:
+    def open_file(uri: str) -> BinaryIO:
+        parsed = urlparse(uri)
+        return open(parsed.path if parsed.scheme == "file" else uri, "rb")
+
+    return open_file
+
+
+def _volume_store(max_connections: int) -> Opener:
+    def open_volume(uri: str) -> BinaryIO:
+        return open(volume_path(uri), "rb")
+
+    return open_volume
+
+
+def _http_store(max_connections: int) -> Opener:
+    import urllib3  # pylint: disable=import-outside-toplevel
+
+    pool = urllib3.PoolManager(maxsize=max_connections, retries=3)
+
+    def open_url(uri: str) -> BinaryIO:
+        response = pool.request("GET", uri, preload_content=False)
+        if response.status >= 400:
+            response.release_conn()
+            raise IOError("GET %s returned HTTP %d" % (uri, response.status))
+        return response
+
+    return open_url
+
+
+def _gcs_store(max_connections: int) -> Opener:
+    # pylint: disable=import-outside-toplevel
+    import google.auth
+    from google.auth.transport.requests import AuthorizedSession
+    from google.cloud import storage
+    from requests.adapters import HTTPAdapter
+
+    credentials, project = google.auth.default()
+    session = AuthorizedSession(credentials)
+    session.mount("https://", HTTPAdapter(pool_maxsize=max_connections))
+    client = storage.Client(project=project, credentials=credentials, _http=session)
+
+    def open_blob(uri: str) -> BinaryIO:
+        parsed = urlparse(uri)
+        return client.bucket(parsed.netloc).blob(parsed.path.lstrip("/")).open("rb")
+
+    return open_blob
+
+
+_STORES.update(
+    {
+        "": _file_store,
+        "file": _file_store,
+        VOLUME_SCHEME: _volume_store,
+        "http": _http_store,
+        "https": _http_store,
+        "gs": _gcs_store,
+        "gcs": _gcs_store,
+    }
+)
+
+
+def _scheme(uri: str) -> str:
+    scheme, sep, _ = uri.partition("://")
+    return scheme if sep else ""
+
+
+def parse_inputs(inputs: Inputs) -> Dict[str, str]:
+    """Returns the uris of the inputs by their local file name.
+
+    Args:
+        inputs (Union[Mapping[str, str], List[str]]): uris by their local file name,
+            or a list of uris (named by their basename) or "name=uri" strings.
+
+    Returns:
+        Dict[str, str]: uris by their local file name.
+    """
+    if isinstance(inputs, Mapping):
+        return dict(inputs)
+    parsed = {}
+    for item in inputs:
+        name, sep, uri = item.partition("=")
+        if not sep or "://" in name:
+            name, uri = os.path.basename(urlparse(item).path.rstrip("/")), item
+        if not name or name in parsed:
+            raise ValueError("invalid or duplicated input name for %s" % item)
+        parsed[name] = uri
+    return parsed
+
+
+def _download(opener: Opener, uri: str, path: str) -> int:
+    """Downloads the uri into a temp file next to the path, then renames it."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".part"
+    source = opener(uri)
+    try:
+        with open(tmp_path, "wb") as fileout:
+            shutil.copyfileobj(source, fileout, CHUNK_SIZE)
+            size = fileout.tell()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    finally:
+        # return pooled http connections to their pool instead of closing them
+        getattr(source, "release_conn", source.close)()
+    return size
+
+
+def _throughput(size: int, seconds: float) -> float:
+    return size / (1 << 20) / max(seconds, 1e-6)
+
+
+def prefetch(
+    inputs: Inputs, output_dir: str, max_workers: int = 8, overwrite: bool = False
+) -> List[Dict[str, Any]]:
+    """Downloads the inputs concurrently into the output directory.
+
+    Inputs that are already in the output directory are skipped (e.g. when an init
+    container is restarted), unless `overwrite` is True.
+
+    ::
+
+        results = kfx.dsl.prefetch(
+            {"train.parquet": "gs://bucket/train.parquet", "vocab.txt": vocab_url},
+            "/prefetch",
+            max_workers=16,
+        )
+
+    Args:
+        inputs (Union[Mapping[str, str], List[str]]): uris by their local file name
+            (see `parse_inputs`).
+        output_dir (str): local directory of the downloaded files.
+        max_workers (int, optional): maximum number of concurrent downloads.
+            Defaults to 8.
+        overwrite (bool, optional): download the inputs that are already in the
+            output directory. Defaults to False.
+
+    Returns:
+        List[Dict[str, Any]]: `{"name", "uri", "path", "bytes", "seconds", "cached",
+        "error"}` of each input, in the order of the inputs.
+    """
+    uris = parse_inputs(inputs)
+    openers: Dict[str, Opener] = {}
+    for scheme in sorted({_scheme(uri) for uri in uris.values()}):
+        if scheme not in _STORES:
+            raise ValueError("no store registered for %s:// uris" % scheme)
+        openers[scheme] = _STORES[scheme](max_workers)
+
+    def fetch(name: str, uri: str) -> Dict[str, Any]:
+        path = os.path.join(output_dir, name)
+        result = {"name": name, "uri": uri, "path": path, "cached": False}
+        start = time.perf_counter()
+        try:
+            if not overwrite and os.path.exists(path):
+                result.update(bytes=os.path.getsize(path), cached=True)
+            else:
+                result["bytes"] = _download(openers[_scheme(uri)], uri, path)
+            result["error"] = None
+        except Exception as error:  # pylint: disable=broad-except
+            result.update(bytes=0, error="%s: %s" % (type(error).__name__, error))
+        result["seconds"] = time.perf_counter() - start
+        return result
+
+    start = time.perf_counter()
+    results: Dict[str, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [executor.submit(fetch, name, uri) for name, uri in uris.items()]
+        for count, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results[result["name"]] = result
+            if result["error"]:
+                LOGGER.error(
+                    "[%d/%d] failed %s: %s",
+                    count,
+                    len(uris),
+                    result["uri"],
+                    result["error"],
+                )
+            else:
+                LOGGER.info(
+                    "[%d/%d] %s %s -> %s (%d bytes, %.2fs, %.1f MiB/s)",
+                    count,
+                    len(uris),
+                    "skipped" if result["cached"] else "downloaded",
+                    result["uri"],
+                    result["path"],
+                    result["bytes"],
+                    result["seconds"],
+                    _throughput(result["bytes"], result["seconds"]),
+                )
+
+    seconds = time.perf_counter() - start
+    size = sum(result["bytes"] for result in results.values() if not result["cached"])
+    LOGGER.info(
+        "prefetched %d inputs (%d bytes) in %.2fs (%.1f MiB/s)",
+        len(uris),
+        size,
+        seconds,
+        _throughput(size, seconds),
+    )
+    return [results[name] for name in uris]
@@ -0,0 +1,109 @@
+"""Tests for kfx.dsl._prefetch."""
+import logging
+import os
+import threading
+import time
+
+import pytest
+
+from kfx.dsl._artifact_location import ArtifactLocationHelper
+from kfx.dsl._prefetch import parse_inputs, prefetch, register_store
+
+
+class FileBackedStore:
+    """Stand-in object store for "fake://<bucket>/<key>" uris, backed by a directory."""
+
+    def __init__(self, root, delay: float = 0.05):
+        self.root = root
+        self.delay = delay
+        self.factory_calls = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, max_connections: int):
+        self.factory_calls.append(max_connections)
+
+        def open_uri(uri: str):
+            with self.lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            try:
+                time.sleep(self.delay)
+                return open(os.path.join(self.root, uri[len("fake://") :]), "rb")
+            finally:
+                with self.lock:
+                    self.active -= 1
+
+        return open_uri
+
+
+@pytest.fixture
+def store(tmp_path) -> FileBackedStore:
+    root = tmp_path / "store"
+    (root / "bucket").mkdir(parents=True)
+    for index in range(6):
+        (root / "bucket" / ("part-%d.csv" % index)).write_bytes(b"x" * (index + 1))
+    store = FileBackedStore(str(root))
+    register_store("fake", store)
+    return store
+
+
+def test_parse_inputs():
+    assert parse_inputs({"a": "gs://b/a"}) == {"a": "gs://b/a"}
+    assert parse_inputs(
+        ["data.csv=gs://b/x.csv", "https://x/y/vocab.txt?v=1", "/local/file.txt"]
+    ) == {
+        "data.csv": "gs://b/x.csv",
+        "vocab.txt": "https://x/y/vocab.txt?v=1",
+        "file.txt": "/local/file.txt",
+    }
+    with pytest.raises(ValueError):
+        parse_inputs(["gs://a/x.csv", "gs://b/x.csv"])
+
+
+def test_prefetch(tmp_path, store, caplog):
+    inputs = ["fake://bucket/part-%d.csv" % index for index in range(6)]
+    output_dir = tmp_path / "prefetch"
+
+    with caplog.at_level(logging.INFO, logger="kfx.dsl._prefetch"):
+        results = prefetch(inputs, str(output_dir), max_workers=3)
+
+    assert [result["name"] for result in results] == [
+        "part-%d.csv" % index for index in range(6)
+    ]
+    assert [result["bytes"] for result in results] == [1, 2, 3, 4, 5, 6]
+    assert all(result["error"] is None for result in results)
+    assert (output_dir / "part-5.csv").read_bytes() == b"x" * 6
+    assert not list(output_dir.glob("*.part"))
+    # bounded concurrency, with a single store (i.e. connection pool) per prefetch
+    assert 1 < store.max_active <= 3
+    assert store.factory_calls == [3]
+    assert "prefetched 6 inputs (21 bytes)" in caplog.text
+    assert "MiB/s" in caplog.text
+
+    results = prefetch(inputs[:2] + ["fake://bucket/missing.csv"], str(output_dir))
+    assert [result["cached"] for result in results] == [True, True, False]
+    assert results[2]["error"].startswith("FileNotFoundError")
+    assert not (output_dir / "missing.csv").exists()
+
+
+def test_prefetch_local_and_volume(tmp_path, monkeypatch):
+    source = tmp_path / "src.txt"
+    source.write_text("hello")
+    monkeypatch.setenv(ArtifactLocationHelper.artifact_volume_env, "pvc")
+    monkeypatch.setenv(ArtifactLocationHelper.artifact_volume_path_env, str(tmp_path))
+
+    results = prefetch(
+        {
+            "a.txt": str(source),
+            "b.txt": "file://%s" % source,
+            "c/d.txt": "volume://pvc/src.txt",
+        },
+        str(tmp_path / "out"),
+    )
+    assert [result["error"] for result in results] == [None, None, None]
+    assert (tmp_path / "out" / "c" / "d.txt").read_text() == "hello"
+
+    with pytest.raises(ValueError):
+        prefetch(["unknown://bucket/a.txt"], str(tmp_path / "out"))
@@ -0,0 +1,170 @@
+"""Usage profiles of ops from previous runs, to right-size their resources.
+
+A usage profile maps op names to the cpu (in cores) and memory (in bytes) used in
+previous runs. It can be loaded from
+
+- a json object, e.g. `{"train": {"cpu": "1500m", "memory": "3Gi"}, ...}`,
+- a json list of records, e.g. `[{"op_name": "train", "cpu": 1.5, ...}, ...]`, or
+- a csv with the columns `op_name`, `cpu` and `memory`.
+
+If there are many records for an op (e.g. one per run), the p95 of the cpu and the
+max of the memory are used.
+"""
+import csv
+import json
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+Quantity = Union[int, float, str]
+UsageProfile = Dict[str, Dict[str, float]]
+
+_CPU_COLUMNS = ("cpu", "cpu_p95", "p95_cpu")
+_MEMORY_COLUMNS = ("memory", "memory_peak", "peak_memory")
+_NAME_COLUMNS = ("op_name", "name", "op")
+_QUANTITY = re.compile(r"^\s*([0-9.eE+-]+)\s*([a-zA-Z]*)\s*$")
+_MEMORY_UNITS = {
+    "": 1,
+    "k": 10**3,
+    "K": 10**3,
+    "M": 10**6,
+    "G": 10**9,
+    "T": 10**12,
+    "P": 10**15,
+    "E": 10**18,
+    "Ki": 1 << 10,
+    "Mi": 1 << 20,
+    "Gi": 1 << 30,
+    "Ti": 1 << 40,
+    "Pi": 1 << 50,
+    "Ei": 1 << 60,
+}
+
+
+def _split_quantity(value: Quantity) -> Any:
+    match = _QUANTITY.match(str(value))
+    if not match:
+        raise ValueError("invalid quantity: %r" % value)
+    return float(match.group(1)), match.group(2)
+
+
+def parse_cpu(value: Quantity) -> float:
+    """Returns the number of cores for a k8s cpu quantity, e.g. "500m" -> 0.5."""
+    number, unit = _split_quantity(value)
+    if unit not in {"", "m"}:
+        raise ValueError("invalid cpu quantity: %r" % value)
+    return number / 1000 if unit == "m" else number
+
+
+def parse_memory(value: Quantity) -> float:
+    """Returns the number of bytes for a k8s memory quantity, e.g. "1Ki" -> 1024."""
+    number, unit = _split_quantity(value)
+    if unit not in _MEMORY_UNITS:
+        raise ValueError("invalid memory quantity: %r" % value)
+    return number * _MEMORY_UNITS[unit]
+
+
+def format_cpu(cores: float) -> str:
+    """Returns the cpu quantity in millicores, rounded up, e.g. 0.7501 -> "751m"."""
+    return "%dm" % max(1, math.ceil(round(cores * 1000, 6)))
+
+
+def format_memory(size: float) -> str:
+    """Returns the memory quantity in mebibytes, rounded up, e.g. 1e9 -> "954Mi"."""
+    return "%dMi" % max(1, math.ceil(round(size / (1 << 20), 6)))
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Returns the nearest-rank percentile of the values."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _column(record: Dict[str, Any], names: Iterable[str]) -> Any:
+    for name in names:
+        if record.get(name) not in (None, ""):
+            return record[name]
+    return None
+
+
+def _from_records(records: Iterable[Dict[str, Any]]) -> UsageProfile:
+    samples: Dict[str, Dict[str, List[float]]] = {}
+    for record in records:
+        name = _column(record, _NAME_COLUMNS)
+        if name is None:
+            raise ValueError("usage record without op name: %r" % record)
+        op_samples = samples.setdefault(str(name), {"cpu": [], "memory": []})
+        cpu = _column(record, _CPU_COLUMNS)
+        memory = _column(record, _MEMORY_COLUMNS)
+        if cpu is not None:
+            op_samples["cpu"].append(parse_cpu(cpu))
+        if memory is not None:
+            op_samples["memory"].append(parse_memory(memory))
+
+    profile: UsageProfile = {}
+    for name, op_samples in samples.items():
+        usage = profile[name] = {}
+        if op_samples["cpu"]:
+            usage["cpu"] = _percentile(op_samples["cpu"], 95)
+        if op_samples["memory"]:
+            usage["memory"] = max(op_samples["memory"])
+    return profile
+
+
+def load_usage_profile(
+    source: Union[str, Dict[str, Any], List[Dict[str, Any]]]
+) -> UsageProfile:
+    """Returns the cpu (cores) and memory (bytes) used by each op.
+
+    Args:
+        source (Union[str, Dict[str, Any], List[Dict[str, Any]]]): path to a json or
+            csv file, a dict of op name to usage, or a list of usage records.
+
+    Returns:
+        Dict[str, Dict[str, float]]: `{"op name": {"cpu": 1.5, "memory": 3.2e9}}`.
+    """
+    if isinstance(source, str):
+        with open(source, "r", newline="") as filein:
+            if source.endswith(".csv"):
+                return _from_records(csv.DictReader(filein))
+            source = json.load(filein)
+    if isinstance(source, dict):
+        source = [dict(usage, op_name=name) for name, usage in source.items()]
+    return _from_records(source)
+
+
+def right_size(
+    usage: Optional[Dict[str, float]],
+    cpu_headroom: float = 1.2,
+    memory_headroom: float = 1.2,
+    cpu_limit_ratio: Optional[float] = None,
+    memory_limit_ratio: Optional[float] = 1.0,
+) -> Dict[str, Dict[str, str]]:
+    """Returns the resource requests and limits for the usage of an op.
+
+    Args:
+        usage (Optional[Dict[str, float]]): cpu (cores) and memory (bytes) used.
+        cpu_headroom (float, optional): request = usage x headroom. Defaults to 1.2.
+        memory_headroom (float, optional): request = usage x headroom. Defaults
+            to 1.2.
+        cpu_limit_ratio (Optional[float], optional): limit = request x ratio, or no
+            limit if None. Defaults to None.
+        memory_limit_ratio (Optional[float], optional): limit = request x ratio, or
+            no limit if None. Defaults to 1.0.
+
+    Returns:
+        Dict[str, Dict[str, str]]: `{"requests": {...}, "limits": {...}}`.
+    """
+    resources: Dict[str, Dict[str, str]] = {"requests": {}, "limits": {}}
+    for resource, headroom, limit_ratio, format_quantity in (
+        ("cpu", cpu_headroom, cpu_limit_ratio, format_cpu),
+        ("memory", memory_headroom, memory_limit_ratio, format_memory),
+    ):
+        if not usage or usage.get(resource) is None:
+            continue
+        request = usage[resource] * headroom
+        resources["requests"][resource] = format_quantity(request)
+        if limit_ratio is not None:
+            resources["limits"][resource] = format_quantity(request * limit_ratio)
+    return resources
@@ -0,0 +1,66 @@
+"""Tests for kfx.dsl._resource_profile."""
+import json
+
+import pytest
+
+from kfx.dsl._resource_profile import (
+    format_cpu,
+    format_memory,
+    load_usage_profile,
+    parse_cpu,
+    parse_memory,
+    right_size,
+)
+
+
+def test_quantities():
+    assert parse_cpu("500m") == 0.5
+    assert parse_cpu(2) == 2.0
+    assert parse_memory("1Ki") == 1024
+    assert parse_memory("1G") == 1e9
+    assert parse_memory(1.5e6) == 1.5e6
+    with pytest.raises(ValueError):
+        parse_cpu("1Gi")
+    with pytest.raises(ValueError):
+        parse_memory("1Xi")
+
+    assert format_cpu(0.7501) == "751m"
+    assert format_cpu(0.0001) == "1m"
+    assert format_memory(1e9) == "954Mi"
+    assert format_memory(1 << 30) == "1024Mi"
+
+
+def test_load_usage_profile(tmp_path):
+    csv_path = tmp_path / "usage.csv"
+    csv_path.write_text(
+        "op_name,cpu,memory\n"
+        + "".join("train,%dm,%dMi\n" % (100 * run, 10 * run) for run in range(1, 21))
+        + "evaluate,250m,\n"
+    )
+    profile = load_usage_profile(str(csv_path))
+    # p95 of the cpu, max of the memory
+    assert profile == {
+        "train": {"cpu": 1.9, "memory": 200 * (1 << 20)},
+        "evaluate": {"cpu": 0.25},
+    }
+
+    json_path = tmp_path / "usage.json"
+    json_path.write_text(json.dumps({"train": {"cpu": "1900m", "memory": "200Mi"}}))
+    assert load_usage_profile(str(json_path))["train"] == profile["train"]
+    assert load_usage_profile(profile) == profile
+    assert load_usage_profile([{"name": "a", "cpu_p95": 1}]) == {"a": {"cpu": 1.0}}
+
+
+def test_right_size():
+    usage = {"cpu": 1.0, "memory": 1 << 30}
+    assert right_size(usage) == {
+        "requests": {"cpu": "1200m", "memory": "1229Mi"},
+        "limits": {"memory": "1229Mi"},
+    }
+    assert right_size(
+        usage, cpu_headroom=1, cpu_limit_ratio=2, memory_limit_ratio=None
+    ) == {
+        "requests": {"cpu": "1000m", "memory": "1229Mi"},
+        "limits": {"cpu": "2000m"},
+    }
+    assert right_size(None) == {"requests": {}, "limits": {}}
@@ -1,11 +1,126 @@
 """Transform functions that modify containerOp."""
+import hashlib
+import json
 from fnmatch import fnmatch
-from typing import Callable, Dict, List, Tuple, Union
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
 
 import kfp.dsl
 import kubernetes.client as k8s
 
+from kfx.dsl._compat import set_retry
+from kfx.dsl._image_lock import load_image_lock, pin_image
+from kfx.dsl._ops import mount_volume, op_matches, op_names
+from kfx.dsl._pod_spec_patch import update_pod_spec_patch
+from kfx.dsl._prebuilt_images import (
+    image_tag,
+    load_prebuilt_images,
+    parse_pip_install,
+    strip_pip_install,
+)
+from kfx.dsl._resource_profile import load_usage_profile, right_size
+
 TransformFunc = Callable[[kfp.dsl.ContainerOp], kfp.dsl.ContainerOp]
+# taints of spot / preemptible nodes on GKE and AKS
+PREEMPTIBLE_TAINTS = {
+    "cloud.google.com/gke-spot": "true",
+    "cloud.google.com/gke-preemptible": "true",
+    "kubernetes.azure.com/scalesetpriority": "spot",
+}
+ResourceQuantity = Union[int, str, Tuple[Union[int, str], Union[int, str]]]
+
+
+def _freeze(value: Any) -> Hashable:
+    """Returns a hashable version of the value, e.g. dicts as sorted tuples."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    try:
+        hash(value)
+    except TypeError as error:
+        raise TypeError(
+            "transform args must be hashable, or dicts, lists or sets: %r" % (value,)
+        ) from error
+    return value
+
+
+def _to_jsonable(value: Any, name: str) -> Any:
+    """Returns the value with tuples as lists, or raises if it is not json-like."""
+    if isinstance(value, dict):
+        return {str(key): _to_jsonable(item, name) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(item, name) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise ValueError("args of %s cannot be serialized: %r" % (name, value))
+
+
+# named steps that can be loaded from a dict, i.e. the methods of
+# ContainerOpTransform, and the steps added with `register_step`
+_STEPS: Dict[str, Callable[..., "ContainerOpTransform"]] = {}
+
+
+def _step(method: Callable[..., "ContainerOpTransform"]):
+    """Registers a ContainerOpTransform method as a named step."""
+    _STEPS[method.__name__] = method
+    return method
+
+
+def register_step(name: str, factory: Callable[..., TransformFunc]):
+    """Registers a custom step, so that it can be serialized and loaded back.
+
+    ::
+
+        def set_node_pool(pool: str):
+            return lambda op: op.add_node_selector_constraint("pool", pool)
+
+        kfx.dsl.register_step("set_node_pool", set_node_pool)
+
+        transform = kfx.dsl.ContainerOpTransform().step("set_node_pool", pool="gpu")
+
+    Args:
+        name (str): name of the step.
+        factory (Callable[..., TransformFunc]): function that returns the transform
+            function for the provided (json-like) keyword args.
+    """
+    if name in _STEPS:
+        raise ValueError("step is already registered: %s" % name)
+
+    def custom_step(transform: "ContainerOpTransform", **kwargs):
+        return transform._then(  # pylint: disable=protected-access
+            factory(**kwargs), name, **kwargs
+        )
+
+    _STEPS[name] = custom_step
+
+
+def _affinity(op: kfp.dsl.ContainerOp) -> k8s.V1Affinity:
+    """Returns the affinity of the op, which is created if it is not set."""
+    if not op.affinity:
+        op.add_affinity(k8s.V1Affinity())
+    return op.affinity
+
+
+def _add_term(
+    affinity: Any, weight: Optional[int], term: Any, weighted_term_cls: Any
+) -> None:
+    """Adds a required (if weight is None) or preferred term to a k8s affinity."""
+    if weight is None:
+        required = affinity.required_during_scheduling_ignored_during_execution or []
+        affinity.required_during_scheduling_ignored_during_execution = required + [term]
+        return
+    preferred = affinity.preferred_during_scheduling_ignored_during_execution or []
+    affinity.preferred_during_scheduling_ignored_during_execution = preferred + [
+        weighted_term_cls(term, weight)
+    ]
+
+
+def _set_env_var(container: Any, name: str, value: str):
+    """Sets the env var of the container, replacing the existing one if any."""
+    container.env = [env for env in container.env or [] if env.name != name]
+    container.add_env_variable(k8s.V1EnvVar(name=name, value=value))
 
 
 class ContainerOpTransform:
@@ -48,13 +163,199 @@ class ContainerOpTransform:
 
     """
 
+    __slots__ = (
+        "_parent",
+        "_transform",
+        "_step",
+        "_kwargs",
+        "_length",
+        "_hash",
+        "_chain",
+    )
+
     def __init__(self, transforms: List[TransformFunc] = None):
         """Creates a new instance of ContainerOpTransform object.
 
+        ContainerOpTransform is immutable - each method returns a new
+        ContainerOpTransform which shares the transforms of the current one, so that
+        a base transform can be extended, and shared across threads, without being
+        modified. ContainerOpTransform is hashable, and equal if the same methods
+        were called with the same args (or the same custom transform functions were
+        provided), so it can be used as a cache key.
+
+        NOTE
+        Methods do not modify the transform in place - assign the returned
+        transform, e.g. `transform = transform.set_resources(...)` instead of
+        `transform.set_resources(...)`.
+
         Args:
             transforms (List[TransformFunc], optional): Optional list of custom transform functions. Defaults to None.
         """
-        self._transforms: List[TransformFunc] = transforms or []
+        self._parent: Optional["ContainerOpTransform"] = None
+        self._transform: Optional[TransformFunc] = None
+        self._step: Hashable = None
+        self._kwargs: Dict[str, Any] = {}
+        self._length = 0
+        self._hash = hash(())
+        self._chain: Optional[Tuple[TransformFunc, ...]] = None
+        if transforms:
+            node = ContainerOpTransform()
+            for transform in transforms:
+                node = node._then(transform, "transform", func=transform)
+            # pylint: disable=protected-access
+            self._parent, self._transform = node._parent, node._transform
+            self._step, self._length, self._hash = node._step, node._length, node._hash
+            self._kwargs = node._kwargs
+
+    def _then(
+        self, _transform: TransformFunc, _name: str, **kwargs
+    ) -> "ContainerOpTransform":
+        """Returns a new ContainerOpTransform with the transform added at the end.
+
+        Args:
+            _transform (TransformFunc): function to modify the ContainerOp.
+            _name (str): name of the step, e.g. the method name.
+            kwargs: args of the step, used for equality and hashing.
+        """
+        node = object.__new__(type(self))
+        node._parent = self  # pylint: disable=protected-access
+        node._transform = _transform  # pylint: disable=protected-access
+        node._step = (_name, _freeze(kwargs))  # pylint: disable=protected-access
+        node._kwargs = kwargs  # pylint: disable=protected-access
+        node._length = self._length + 1  # pylint: disable=protected-access
+        node._hash = hash((self._hash, node._step))  # pylint: disable=protected-access
+        node._chain = None  # pylint: disable=protected-access
+        return node
+
+    def _nodes(self) -> List["ContainerOpTransform"]:
+        nodes = []
+        node: Optional[ContainerOpTransform] = self
+        while node is not None and node._length:  # pylint: disable=protected-access
+            nodes.append(node)
+            node = node._parent  # pylint: disable=protected-access
+        nodes.reverse()
+        return nodes
+
+    @property
+    def transforms(self) -> Tuple[TransformFunc, ...]:
+        """Transform functions in the order they are applied."""
+        if self._chain is None:
+            # immutable - computing it twice in different threads is harmless
+            self._chain = tuple(
+                node._transform  # type: ignore # pylint: disable=protected-access
+                for node in self._nodes()
+            )
+        return self._chain
+
+    def __len__(self) -> int:
+        """Number of transforms."""
+        return self._length
+
+    def __hash__(self) -> int:
+        """Hash of the transform steps and their args."""
+        return self._hash
+
+    def __eq__(self, other: Any) -> bool:
+        """Whether the transforms have the same steps with the same args."""
+        if not isinstance(other, ContainerOpTransform):
+            return NotImplemented
+        left: Optional[ContainerOpTransform] = self
+        right: Optional[ContainerOpTransform] = other
+        if len(self) != len(other) or hash(self) != hash(other):
+            return False
+        while left is not right and left is not None and right is not None:
+            if left._step != right._step:  # pylint: disable=protected-access
+                return False
+            left = left._parent  # pylint: disable=protected-access
+            right = right._parent  # pylint: disable=protected-access
+        return True
+
+    def __repr__(self) -> str:
+        """Steps of the transform, e.g. `ContainerOpTransform([set_labels(...)])`."""
+        steps = ", ".join(
+            "%s(%s)"
+            % (
+                node._step[0],  # type: ignore # pylint: disable=protected-access
+                ", ".join(
+                    "%s=%r" % item
+                    for item in node._kwargs.items()  # pylint: disable=protected-access
+                ),
+            )
+            for node in self._nodes()
+        )
+        return "%s([%s])" % (type(self).__name__, steps)
+
+    def step(self, step_name: str, **kwargs) -> "ContainerOpTransform":
+        """Adds a named step - a ContainerOpTransform method or a registered step.
+
+        Args:
+            step_name (str): name of the step, e.g. "set_resources".
+            kwargs: args of the step.
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+        if step_name not in _STEPS:
+            raise ValueError("unknown transform step: %s" % step_name)
+        return _STEPS[step_name](self, **kwargs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the steps of the transform as a json-like dict.
+
+        Custom transform functions (provided to the constructor) cannot be
+        serialized - use `kfx.dsl.register_step` instead.
+
+        Returns:
+            Dict[str, Any]: `{"steps": [{"name": ..., "kwargs": {...}}, ...]}`.
+        """
+        steps = []
+        for node in self._nodes():
+            name = node._step[0]  # type: ignore # pylint: disable=protected-access
+            if name not in _STEPS:
+                raise ValueError(
+                    "custom transform functions cannot be serialized, "
+                    "use kfx.dsl.register_step instead"
+                )
+            kwargs = node._kwargs  # pylint: disable=protected-access
+            steps.append({"name": name, "kwargs": _to_jsonable(kwargs, name)})
+        return {"steps": steps}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ContainerOpTransform":
+        """Loads a transform from the dict returned by `to_dict`.
+
+        Args:
+            data (Dict[str, Any]): `{"steps": [{"name": ..., "kwargs": {...}}, ...]}`.
+
+        Returns:
+            ContainerOpTransform: ContainerOpTransform object.
+        """
+        transform = cls()
+        for step in data.get("steps", []):
+            transform = transform.step(step["name"], **step.get("kwargs", {}))
+        return transform
+
+    def to_yaml(self) -> str:
+        """Returns the steps of the transform as yaml (see `to_dict`)."""
+        import yaml  # pylint: disable=import-outside-toplevel
+
+        return yaml.safe_dump(self.to_dict(), sort_keys=False)
+
+    @classmethod
+    def from_yaml(cls, text: str) -> "ContainerOpTransform":
+        """Loads a transform from the yaml returned by `to_yaml`."""
+        import yaml  # pylint: disable=import-outside-toplevel
+
+        return cls.from_dict(yaml.safe_load(text) or {})
+
+    def spec_hash(self) -> str:
+        """Returns a sha256 of the steps, which is stable across processes.
+
+        Returns:
+            str: hex digest of the canonical json of `to_dict`.
+        """
+        canonical = json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
 
     def __call__(self, op: kfp.dsl.ContainerOp) -> kfp.dsl.ContainerOp:
         """In-place transform of the provided ContainerOp.
@@ -65,11 +366,11 @@ class ContainerOpTransform:
         Returns:
             kfp.dsl.ContainerOp: ContainerOp obj.
         """
-        [  # pylint: disable=expression-not-assigned
-            transform(op) for transform in self._transforms
-        ]
+        for transform in self.transforms:
+            transform(op)
         return op
 
+    @_step
     def set_annotations(self, annotations: Dict[str, str]) -> "ContainerOpTransform":
         """Update the transform function to set the provided annotations to the ContainerOp.
 
@@ -84,9 +385,11 @@ class ContainerOpTransform:
             ]
             return op
 
-        self._transforms.append(set_annotations_transform)
-        return self
+        return self._then(
+            set_annotations_transform, "set_annotations", annotations=annotations
+        )
 
+    @_step
     def set_labels(self, labels: Dict[str, str]) -> "ContainerOpTransform":
         """Update the transform function to set the provided labels to the ContainerOp.
 
@@ -100,9 +403,9 @@ class ContainerOpTransform:
             ]
             return op
 
-        self._transforms.append(set_labels_transform)
-        return self
+        return self._then(set_labels_transform, "set_labels", labels=labels)
 
+    @_step
     def add_env_vars(self, env_vars: Dict[str, str]) -> "ContainerOpTransform":
         """Update the transform function to set the provided env vars to the ContainerOp.
 
@@ -117,9 +420,9 @@ class ContainerOpTransform:
             ]
             return op
 
-        self._transforms.append(set_env_vars_transform)
-        return self
+        return self._then(set_env_vars_transform, "add_env_vars", env_vars=env_vars)
 
+    @_step
     def add_env_var(self, name: str, value: str) -> "ContainerOpTransform":
         """Update the transform function to set the provided env var to the ContainerOp.
 
@@ -128,13 +431,16 @@ class ContainerOpTransform:
             value (str): value of the env var.
 
         Returns:
-            ContainerOpTransform: updated ContainerOpTransform object.
+            ContainerOpTransform: new ContainerOpTransform object.
         """
-        self._transforms.append(
-            lambda op: op.container.add_env_variable(k8s.V1EnvVar(name, value))
+        return self._then(
+            lambda op: op.container.add_env_variable(k8s.V1EnvVar(name, value)),
+            "add_env_var",
+            name=name,
+            value=value,
         )
-        return self
 
+    @_step
     def add_env_var_from_secret(
         self, name: str, secret_name: str, secret_key: str
     ) -> "ContainerOpTransform":
@@ -146,9 +452,9 @@ class ContainerOpTransform:
             secret_key (str): key to retrieve from the k8s secret.
 
         Returns:
-            ContainerOpTransform: updated ContainerOpTransform object.
+            ContainerOpTransform: new ContainerOpTransform object.
         """
-        self._transforms.append(
+        return self._then(
             lambda op: op.container.add_env_variable(
                 k8s.V1EnvVar(
                     name,
@@ -158,10 +464,14 @@ class ContainerOpTransform:
                         )
                     ),
                 )
-            )
+            ),
+            "add_env_var_from_secret",
+            name=name,
+            secret_name=secret_name,
+            secret_key=secret_key,
         )
-        return self
 
+    @_step
     def add_env_var_from_configmap(self, configmap_name: str) -> "ContainerOpTransform":
         """Update the transform function to set env vars from a configmap.
 
@@ -169,17 +479,19 @@ class ContainerOpTransform:
             configmap_name (str): name of the configmap.
 
         Returns:
-            ContainerOpTransform: updated ContainerOpTransform object.
+            ContainerOpTransform: new ContainerOpTransform object.
         """
-        self._transforms.append(
+        return self._then(
             lambda op: op.container.add_env_from(
                 k8s.V1EnvFromSource(
                     config_map_ref=k8s.V1ConfigMapEnvSource(name=configmap_name)
                 )
-            )
+            ),
+            "add_env_var_from_configmap",
+            configmap_name=configmap_name,
         )
-        return self
 
+    @_step
     def set_cpu_resources(
         self, request: Union[int, str], limit: Union[int, str] = None
     ) -> "ContainerOpTransform":
@@ -190,17 +502,19 @@ class ContainerOpTransform:
             limit (Union[int, str], optional): Max cpu load before throttling. Defaults to None.
 
         Returns:
-            ContainerOpTransform: updated ContainerOpTransform object.
+            ContainerOpTransform: new ContainerOpTransform object.
         """
 
-        self._transforms.append(
+        return self._then(
             lambda op: op.container.set_cpu_request(str(request)).set_cpu_limit(
                 str(limit or request)
-            )
+            ),
+            "set_cpu_resources",
+            request=request,
+            limit=limit,
         )
 
-        return self
-
+    @_step
     def set_memory_resources(
         self, request: Union[int, str], limit: Union[int, str] = None
     ) -> "ContainerOpTransform":
@@ -211,16 +525,18 @@ class ContainerOpTransform:
             limit (Union[int, str], optional): Max memory before killing the pod. Defaults to None.
 
         Returns:
-            ContainerOpTransform: updated ContainerOpTransform object.
+            ContainerOpTransform: new ContainerOpTransform object.
         """
-        self._transforms.append(
+        return self._then(
             lambda op: op.container.set_memory_request(str(request)).set_memory_limit(
                 str(limit or request)
-            )
+            ),
+            "set_memory_resources",
+            request=request,
+            limit=limit,
         )
 
-        return self
-
+    @_step
     def set_gpu_limit(
         self, value: Union[int, str], vendor: str = "nvidia"
     ) -> "ContainerOpTransform":
@@ -231,13 +547,16 @@ class ContainerOpTransform:
             vendor (str, optional): Either "nvidia" or "amd". Defaults to "nvidia".
 
         Returns:
-            ContainerOpTransform: updated ContainerOpTransform object.
+            ContainerOpTransform: new ContainerOpTransform object.
         """
-        self._transforms.append(
-            lambda op: op.container.set_gpu_limit(str(value), vendor)
+        return self._then(
+            lambda op: op.container.set_gpu_limit(str(value), vendor),
+            "set_gpu_limit",
+            value=value,
+            vendor=vendor,
         )
-        return self
 
+    @_step
     def set_image_pull_policy(self, policy: str) -> "ContainerOpTransform":
         """Update the transform function to set the image pull policy for the main container.
 
@@ -245,11 +564,15 @@ class ContainerOpTransform:
             policy (str): One of "Always", "Never", "IfNotPresent".
 
         Returns:
-            ContainerOpTransform: updated ContainerOpTransform object.
+            ContainerOpTransform: new ContainerOpTransform object.
         """
-        self._transforms.append(lambda op: op.container.set_image_pull_policy(policy))
-        return self
+        return self._then(
+            lambda op: op.container.set_image_pull_policy(policy),
+            "set_image_pull_policy",
+            policy=policy,
+        )
 
+    @_step
     def set_sidecar_image_pull_policy(
         self, policy: str, sidecar_name: str = "*"
     ) -> "ContainerOpTransform":
@@ -260,7 +583,7 @@ class ContainerOpTransform:
             sidecar_name (str, optional): Glob pattern for sidecar name. Defaults to "*".
 
         Returns:
-            ContainerOpTransform: updated ContainerOpTransform object.
+            ContainerOpTransform: new ContainerOpTransform object.
         """
 
         def set_sidecar_transform(op: kfp.dsl.ContainerOp) -> kfp.dsl.ContainerOp:
@@ -270,9 +593,14 @@ class ContainerOpTransform:
                 if fnmatch(sidecar.name, sidecar_name)
             ]
 
-        self._transforms.append(set_sidecar_transform)
-        return self
+        return self._then(
+            set_sidecar_transform,
+            "set_sidecar_image_pull_policy",
+            policy=policy,
+            sidecar_name=sidecar_name,
+        )
 
+    @_step
     def set_resources(
         self,
         cpu: Union[int, str, Tuple[Union[int, str], Union[int, str]]] = None,
@@ -288,7 +616,7 @@ class ContainerOpTransform:
             memory (Union[str, Tuple[str, str]], optional): A str or tuple representing the memory request and limit.
 
         Returns:
-            ContainerOpTransform: updated ContainerOpTransform object.
+            ContainerOpTransform: new ContainerOpTransform object.
         """
         if isinstance(cpu, (tuple, list)):
             cpu_request, cpu_limit = cpu
@@ -303,7 +631,6 @@ class ContainerOpTransform:
             memory_limit = memory  # type: ignore
 
         def set_resources_transform(op: kfp.dsl.ContainerOp) -> kfp.dsl.ContainerOp:
-
             if cpu_request:
                 op.container.set_cpu_request(str(cpu_request))
             if cpu_limit:
@@ -314,9 +641,11 @@ class ContainerOpTransform:
                 op.container.set_memory_limit(memory_limit)
             return op
 
-        self._transforms.append(set_resources_transform)
-        return self
+        return self._then(
+            set_resources_transform, "set_resources", cpu=cpu, memory=memory
+        )
 
+    @_step
     def set_sidecar_resources(
         self,
         cpu: Union[int, str, Tuple[Union[int, str], Union[int, str]]] = None,
@@ -334,7 +663,7 @@ class ContainerOpTransform:
             sidecar_name (str, optional): Glob pattern matching the sidecar name. Defaults to "*".
 
         Returns:
-            ContainerOpTransform: updated ContainerOpTransform object.
+            ContainerOpTransform: new ContainerOpTransform object.
         """
         if isinstance(cpu, (tuple, list)):
             cpu_request, cpu_limit = cpu
@@ -363,5 +692,831 @@ class ContainerOpTransform:
                         sidecar.set_memory_limit(memory_limit)
             return op
 
-        self._transforms.append(set_sidecar_resources_transform)
-        return self
+        return self._then(
+            set_sidecar_resources_transform,
+            "set_sidecar_resources",
+            cpu=cpu,
+            memory=memory,
+            sidecar_name=sidecar_name,
+        )
+
+    @_step
+    def set_resources_from_profile(
+        self,
+        profile: Union[str, Dict[str, Any], List[Dict[str, Any]]],
+        cpu_headroom: float = 1.2,
+        memory_headroom: float = 1.2,
+        cpu_limit_ratio: float = None,
+        memory_limit_ratio: float = 1.0,
+        default_cpu: ResourceQuantity = None,
+        default_memory: ResourceQuantity = None,
+    ) -> "ContainerOpTransform":
+        """Update the transform function to right-size the resources of the main container from a usage profile.
+
+        The cpu and memory requests are the p95 cpu and peak memory used by the op
+        in previous runs, plus headroom. Ops are matched by name (or glob pattern)
+        against the profile, and unknown ops are set with `default_cpu` and
+        `default_memory` (same as `set_resources`).
+
+        ::
+
+            # usage.csv
+            # op_name,cpu,memory
+            # train,1.7,3.1Gi
+            # evaluate,250m,600Mi
+
+            transform = kfx.dsl.ContainerOpTransform().set_resources_from_profile(
+                "usage.csv", cpu_headroom=1.1, default_cpu="500m", default_memory="1G"
+            )
+
+        The profile is loaded immediately, and is part of the transform spec
+        (see `to_dict`).
+
+        Args:
+            profile (Union[str, Dict[str, Any], List[Dict[str, Any]]]): path to a
+                json or csv usage profile, or the usage itself (see
+                `kfx.dsl.load_usage_profile`).
+            cpu_headroom (float, optional): cpu request = p95 cpu x headroom.
+                Defaults to 1.2.
+            memory_headroom (float, optional): memory request = peak memory x
+                headroom. Defaults to 1.2.
+            cpu_limit_ratio (float, optional): cpu limit = cpu request x ratio, or
+                no cpu limit if None. Defaults to None.
+            memory_limit_ratio (float, optional): memory limit = memory request x
+                ratio, or no memory limit if None. Defaults to 1.0.
+            default_cpu (Union[int, str, Tuple[Union[int, str], Union[int, str]]], optional): cpu request and limit of unknown ops.
+            default_memory (Union[int, str, Tuple[Union[int, str], Union[int, str]]], optional): memory request and limit of unknown ops.
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+        usage = load_usage_profile(profile)
+        patterns = [name for name in usage if any(char in name for char in "*?[")]
+        fallback = ContainerOpTransform().set_resources(default_cpu, default_memory)
+
+        def set_resources_from_profile_transform(
+            op: kfp.dsl.ContainerOp,
+        ) -> kfp.dsl.ContainerOp:
+            names = op_names(op)
+            name = next((name for name in names if name in usage), None) or next(
+                (pattern for pattern in patterns if op_matches(op, pattern)), None
+            )
+            if name is None:
+                return fallback(op)
+
+            resources = right_size(
+                usage[name],
+                cpu_headroom,
+                memory_headroom,
+                cpu_limit_ratio,
+                memory_limit_ratio,
+            )
+            for resource, value in resources["requests"].items():
+                op.container.add_resource_request(resource, value)
+            for resource, value in resources["limits"].items():
+                op.container.add_resource_limit(resource, value)
+            return op
+
+        return self._then(
+            set_resources_from_profile_transform,
+            "set_resources_from_profile",
+            profile=usage,
+            cpu_headroom=cpu_headroom,
+            memory_headroom=memory_headroom,
+            cpu_limit_ratio=cpu_limit_ratio,
+            memory_limit_ratio=memory_limit_ratio,
+            default_cpu=default_cpu,
+            default_memory=default_memory,
+        )
+
+    @_step
+    def add_node_selector(self, labels: Dict[str, str]) -> "ContainerOpTransform":
+        """Update the transform function to only schedule the pod on nodes with the labels.
+
+        Args:
+            labels (Dict[str, str]): node labels, e.g. `{"disktype": "ssd"}`.
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+
+        def add_node_selector_transform(op: kfp.dsl.ContainerOp) -> kfp.dsl.ContainerOp:
+            for key, value in labels.items():
+                op.add_node_selector_constraint(key, value)
+            return op
+
+        return self._then(
+            add_node_selector_transform, "add_node_selector", labels=labels
+        )
+
+    @_step
+    def add_toleration(
+        self,
+        key: str = None,
+        operator: str = "Equal",
+        value: str = None,
+        effect: str = None,
+        toleration_seconds: int = None,
+    ) -> "ContainerOpTransform":
+        """Update the transform function to add a toleration for node taints.
+
+        Args:
+            key (str, optional): taint key, or all taints if None with "Exists".
+                Defaults to None.
+            operator (str, optional): "Equal" or "Exists". Defaults to "Equal".
+            value (str, optional): taint value for "Equal". Defaults to None.
+            effect (str, optional): "NoSchedule", "PreferNoSchedule" or "NoExecute",
+                or all effects if None. Defaults to None.
+            toleration_seconds (int, optional): how long the pod stays on a node
+                with a "NoExecute" taint. Defaults to None (forever).
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+
+        def add_toleration_transform(op: kfp.dsl.ContainerOp) -> kfp.dsl.ContainerOp:
+            return op.add_toleration(
+                k8s.V1Toleration(
+                    key=key,
+                    operator=operator,
+                    value=value,
+                    effect=effect,
+                    toleration_seconds=toleration_seconds,
+                )
+            )
+
+        return self._then(
+            add_toleration_transform,
+            "add_toleration",
+            key=key,
+            operator=operator,
+            value=value,
+            effect=effect,
+            toleration_seconds=toleration_seconds,
+        )
+
+    @_step
+    def add_node_affinity(
+        self,
+        key: str,
+        values: List[str] = None,
+        operator: str = "In",
+        weight: int = None,
+    ) -> "ContainerOpTransform":
+        """Update the transform function to add a node affinity.
+
+        The affinity is required if no weight is provided, otherwise it is preferred.
+        Required affinities are ORed, and preferred affinities are summed by weight.
+
+        Args:
+            key (str): node label, e.g. "cloud.google.com/gke-nodepool".
+            values (List[str], optional): label values. Defaults to None.
+            operator (str, optional): "In", "NotIn", "Exists", "DoesNotExist", "Gt"
+                or "Lt". Defaults to "In".
+            weight (int, optional): weight (1-100) of a preferred affinity. Defaults
+                to None (required).
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+
+        def add_node_affinity_transform(op: kfp.dsl.ContainerOp) -> kfp.dsl.ContainerOp:
+            affinity = _affinity(op)
+            expression = k8s.V1NodeSelectorRequirement(
+                key=key, operator=operator, values=values
+            )
+            node_affinity = affinity.node_affinity = (
+                affinity.node_affinity or k8s.V1NodeAffinity()
+            )
+            if weight is None:
+                selector = (
+                    node_affinity.required_during_scheduling_ignored_during_execution
+                    or k8s.V1NodeSelector(node_selector_terms=[])
+                )
+                selector.node_selector_terms.append(
+                    k8s.V1NodeSelectorTerm(match_expressions=[expression])
+                )
+                node_affinity.required_during_scheduling_ignored_during_execution = (
+                    selector
+                )
+            else:
+                _add_term(
+                    node_affinity,
+                    weight,
+                    k8s.V1NodeSelectorTerm(match_expressions=[expression]),
+                    k8s.V1PreferredSchedulingTerm,
+                )
+            return op
+
+        return self._then(
+            add_node_affinity_transform,
+            "add_node_affinity",
+            key=key,
+            values=values,
+            operator=operator,
+            weight=weight,
+        )
+
+    @_step
+    def add_pod_affinity(
+        self,
+        labels: Dict[str, str],
+        topology_key: str = "kubernetes.io/hostname",
+        weight: int = None,
+        anti: bool = False,
+    ) -> "ContainerOpTransform":
+        """Update the transform function to add a pod affinity or anti-affinity.
+
+        i.e. (do not) schedule the pod in the same topology (e.g. node or zone) as the
+        pods with the labels. The affinity is required if no weight is provided,
+        otherwise it is preferred.
+
+        Args:
+            labels (Dict[str, str]): labels of the other pods.
+            topology_key (str, optional): node label of the topology. Defaults to
+                "kubernetes.io/hostname".
+            weight (int, optional): weight (1-100) of a preferred affinity. Defaults
+                to None (required).
+            anti (bool, optional): pod anti-affinity. Defaults to False.
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+
+        def add_pod_affinity_transform(op: kfp.dsl.ContainerOp) -> kfp.dsl.ContainerOp:
+            affinity = _affinity(op)
+            term = k8s.V1PodAffinityTerm(
+                label_selector=k8s.V1LabelSelector(match_labels=labels),
+                topology_key=topology_key,
+            )
+            if anti:
+                pod_affinity = affinity.pod_anti_affinity = (
+                    affinity.pod_anti_affinity or k8s.V1PodAntiAffinity()
+                )
+            else:
+                pod_affinity = affinity.pod_affinity = (
+                    affinity.pod_affinity or k8s.V1PodAffinity()
+                )
+            _add_term(pod_affinity, weight, term, k8s.V1WeightedPodAffinityTerm)
+            return op
+
+        return self._then(
+            add_pod_affinity_transform,
+            "add_pod_affinity",
+            labels=labels,
+            topology_key=topology_key,
+            weight=weight,
+            anti=anti,
+        )
+
+    @_step
+    def set_priority_class(self, priority_class_name: str) -> "ContainerOpTransform":
+        """Update the transform function to set the priority class of the pod.
+
+        NOTE
+        kfp ops do not have a priority class - it is set in the `podSpecPatch` of
+        the compiled workflow by `kfx.dsl.compile_pipeline`, or
+        `kfx.dsl.apply_pod_spec_patches_file` after `kfp.compiler`. It is ignored
+        by `kfp.compiler.Compiler` and `kfp.Client.create_run_from_pipeline_func`
+        alone, and a `UserWarning` is raised when applied outside of
+        `kfx.dsl.compile_pipeline`.
+
+        Args:
+            priority_class_name (str): name of the k8s PriorityClass.
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+        return self._then(
+            lambda op: update_pod_spec_patch(
+                op, {"priorityClassName": priority_class_name}
+            ),
+            "set_priority_class",
+            priority_class_name=priority_class_name,
+        )
+
+    @_step
+    def add_topology_spread(
+        self,
+        labels: Dict[str, str],
+        topology_key: str = "topology.kubernetes.io/zone",
+        max_skew: int = 1,
+        when_unsatisfiable: str = "ScheduleAnyway",
+    ) -> "ContainerOpTransform":
+        """Update the transform function to spread the pods with the labels across a topology.
+
+        NOTE
+        kfp ops do not have topology spread constraints - they are set in the
+        `podSpecPatch` of the compiled workflow by `kfx.dsl.compile_pipeline`, or
+        `kfx.dsl.apply_pod_spec_patches_file` after `kfp.compiler`. They are
+        ignored by `kfp.compiler.Compiler` and
+        `kfp.Client.create_run_from_pipeline_func` alone, and a `UserWarning` is
+        raised when applied outside of `kfx.dsl.compile_pipeline`.
+
+        Args:
+            labels (Dict[str, str]): labels of the pods to spread (e.g. the pod
+                labels of the op).
+            topology_key (str, optional): node label of the topology. Defaults to
+                "topology.kubernetes.io/zone".
+            max_skew (int, optional): max difference in the number of pods between
+                topologies. Defaults to 1.
+            when_unsatisfiable (str, optional): "DoNotSchedule" or "ScheduleAnyway".
+                Defaults to "ScheduleAnyway".
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+        constraint = {
+            "labelSelector": {"matchLabels": labels},
+            "maxSkew": max_skew,
+            "topologyKey": topology_key,
+            "whenUnsatisfiable": when_unsatisfiable,
+        }
+        return self._then(
+            lambda op: update_pod_spec_patch(
+                op, {"topologySpreadConstraints": [constraint]}
+            ),
+            "add_topology_spread",
+            labels=labels,
+            topology_key=topology_key,
+            max_skew=max_skew,
+            when_unsatisfiable=when_unsatisfiable,
+        )
+
+    @_step
+    def set_shm_size(
+        self, size: str = "1Gi", sidecar_name: Optional[str] = "*"
+    ) -> "ContainerOpTransform":
+        """Update the transform function to mount a memory-backed `/dev/shm` of the size.
+
+        e.g. PyTorch DataLoader workers share tensors through `/dev/shm`, which is only
+        64M by default. The `/dev/shm` is an `emptyDir` with `medium: Memory`, and
+        counts towards the memory limit of the containers.
+
+        Args:
+            size (str, optional): size limit of `/dev/shm`. Defaults to "1Gi".
+            sidecar_name (Optional[str], optional): Glob pattern for the sidecars
+                that also mount `/dev/shm`, or None for the main container only.
+                Defaults to "*".
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+        volume = k8s.V1Volume(
+            name="kfx-dshm",
+            empty_dir=k8s.V1EmptyDirVolumeSource(medium="Memory", size_limit=size),
+        )
+        return self._then(
+            lambda op: mount_volume(op, volume, "/dev/shm", sidecar_name),
+            "set_shm_size",
+            size=size,
+            sidecar_name=sidecar_name,
+        )
+
+    @_step
+    def add_scratch_volume(
+        self,
+        mount_path: str = "/scratch",
+        size: str = "10Gi",
+        name: str = "kfx-scratch",
+        sidecar_name: Optional[str] = "*",
+        set_limit: bool = False,
+    ) -> "ContainerOpTransform":
+        """Update the transform function to mount an ephemeral local scratch volume.
+
+        The volume is an `emptyDir` on the local disk of the node, with a size limit.
+        The size is also requested as `ephemeral-storage` by the main container, so
+        that the pod is only scheduled on nodes with enough local disk.
+
+        Args:
+            mount_path (str, optional): mount path. Defaults to "/scratch".
+            size (str, optional): size limit of the volume. Defaults to "10Gi".
+            name (str, optional): name of the volume. Defaults to "kfx-scratch".
+            sidecar_name (Optional[str], optional): Glob pattern for the sidecars
+                that also mount the volume, or None for the main container only.
+                Defaults to "*".
+            set_limit (bool, optional): also set the `ephemeral-storage` limit of the
+                main container, i.e. the pod is evicted if the container writes more
+                than the size (to the volume, logs, or its writable layer). Defaults
+                to False.
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+        volume = k8s.V1Volume(
+            name=name, empty_dir=k8s.V1EmptyDirVolumeSource(size_limit=size)
+        )
+
+        def add_scratch_volume_transform(
+            op: kfp.dsl.ContainerOp,
+        ) -> kfp.dsl.ContainerOp:
+            mount_volume(op, volume, mount_path, sidecar_name)
+            op.container.add_resource_request("ephemeral-storage", size)
+            if set_limit:
+                op.container.add_resource_limit("ephemeral-storage", size)
+            return op
+
+        return self._then(
+            add_scratch_volume_transform,
+            "add_scratch_volume",
+            mount_path=mount_path,
+            size=size,
+            name=name,
+            sidecar_name=sidecar_name,
+            set_limit=set_limit,
+        )
+
+    @_step
+    def set_retry(
+        self,
+        num_retries: int,
+        policy: str = "Always",
+        backoff_duration: str = "30s",
+        backoff_factor: float = 2.0,
+        backoff_max_duration: str = "10m",
+        op_name: str = "*",
+    ) -> "ContainerOpTransform":
+        """Update the transform function to retry the matching ops with exponential backoff.
+
+        NOTE
+        The backoff requires kfp>=1.7 - with older kfp versions, the ops are
+        retried without backoff and a `UserWarning` is raised.
+
+        Args:
+            num_retries (int): max number of retries.
+            policy (str, optional): "Always", "OnFailure" (non-zero exit code),
+                "OnError" (e.g. pod evicted or node gone) or "OnTransientError".
+                Defaults to "Always".
+            backoff_duration (str, optional): wait before the first retry, e.g.
+                "30s", "2m". Defaults to "30s".
+            backoff_factor (float, optional): wait x factor for each next retry.
+                Defaults to 2.0.
+            backoff_max_duration (str, optional): max wait between retries. Defaults
+                to "10m".
+            op_name (str, optional): Glob pattern for the op name. Defaults to "*".
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+
+        def set_retry_transform(op: kfp.dsl.ContainerOp) -> kfp.dsl.ContainerOp:
+            if op_matches(op, op_name):
+                set_retry(
+                    op,
+                    num_retries,
+                    policy=policy,
+                    backoff_duration=backoff_duration,
+                    backoff_factor=backoff_factor,
+                    backoff_max_duration=backoff_max_duration,
+                )
+            return op
+
+        return self._then(
+            set_retry_transform,
+            "set_retry",
+            num_retries=num_retries,
+            policy=policy,
+            backoff_duration=backoff_duration,
+            backoff_factor=backoff_factor,
+            backoff_max_duration=backoff_max_duration,
+            op_name=op_name,
+        )
+
+    @_step
+    def set_timeout(self, seconds: int, op_name: str = "*") -> "ContainerOpTransform":
+        """Update the transform function to stop the matching ops after the timeout.
+
+        i.e. the `activeDeadlineSeconds` of the pod, so that stuck ops release
+        their nodes. Each retry has its own deadline.
+
+        Args:
+            seconds (int): timeout in seconds.
+            op_name (str, optional): Glob pattern for the op name. Defaults to "*".
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+
+        def set_timeout_transform(op: kfp.dsl.ContainerOp) -> kfp.dsl.ContainerOp:
+            if op_matches(op, op_name):
+                op.set_timeout(seconds)
+            return op
+
+        return self._then(
+            set_timeout_transform, "set_timeout", seconds=seconds, op_name=op_name
+        )
+
+    @_step
+    def tolerate_preemption(
+        self,
+        num_retries: int = 3,
+        backoff_duration: str = "30s",
+        backoff_factor: float = 2.0,
+        taints: Dict[str, str] = None,
+        op_name: str = "*",
+    ) -> "ContainerOpTransform":
+        """Update the transform function to run the matching ops on spot / preemptible nodes.
+
+        Tolerates the `NoSchedule` taints of spot nodes (see `PREEMPTIBLE_TAINTS`),
+        and retries the ops with exponential backoff. The retry policy is
+        "OnError", i.e. only evicted or lost pods are retried, not the ops that
+        fail with a non-zero exit code.
+
+        ::
+
+            transform = (
+                kfx.dsl.ContainerOpTransform()
+                .tolerate_preemption(num_retries=5, op_name="shard-*")
+                .set_timeout(3600, op_name="shard-*")
+            )
+
+        Args:
+            num_retries (int, optional): max number of retries. Defaults to 3.
+            backoff_duration (str, optional): wait before the first retry. Defaults
+                to "30s".
+            backoff_factor (float, optional): wait x factor for each next retry.
+                Defaults to 2.0.
+            taints (Dict[str, str], optional): taint keys and values of the spot
+                nodes. Defaults to `PREEMPTIBLE_TAINTS` (GKE and AKS).
+            op_name (str, optional): Glob pattern for the op name. Defaults to "*".
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+        tolerations = [
+            k8s.V1Toleration(
+                key=key, operator="Equal", value=value, effect="NoSchedule"
+            )
+            for key, value in (taints or PREEMPTIBLE_TAINTS).items()
+        ]
+
+        def tolerate_preemption_transform(
+            op: kfp.dsl.ContainerOp,
+        ) -> kfp.dsl.ContainerOp:
+            if not op_matches(op, op_name):
+                return op
+            for toleration in tolerations:
+                if toleration not in op.tolerations:
+                    op.add_toleration(toleration)
+            return set_retry(
+                op,
+                num_retries,
+                policy="OnError",
+                backoff_duration=backoff_duration,
+                backoff_factor=backoff_factor,
+            )
+
+        return self._then(
+            tolerate_preemption_transform,
+            "tolerate_preemption",
+            num_retries=num_retries,
+            backoff_duration=backoff_duration,
+            backoff_factor=backoff_factor,
+            taints=taints,
+            op_name=op_name,
+        )
+
+    @_step
+    def pin_images(
+        self,
+        lock: Union[str, Dict[str, str]],
+        pull_policy: Optional[str] = "IfNotPresent",
+        strict: bool = True,
+    ) -> "ContainerOpTransform":
+        """Update the transform function to pin the images of the op to immutable digests.
+
+        The images of the main container, init containers and sidecars are
+        replaced by the digests in the lock file (see `kfx.dsl.load_image_lock`),
+        and the image pull policy is set to "IfNotPresent", so that nodes reuse the
+        cached image layers instead of pulling the images for every pod.
+
+        This should be the last transform, i.e. after transforms that change the
+        image, such as `ArtifactLocationHelper.set_envs`.
+
+        ::
+
+            transform = kfx.dsl.ContainerOpTransform().pin_images("images.lock.yaml")
+
+            kfp.dsl.get_pipeline_conf().add_op_transformer(helper.set_envs())
+            kfp.dsl.get_pipeline_conf().add_op_transformer(transform)
+
+        The lock is loaded immediately, and is part of the transform spec
+        (see `to_dict`).
+
+        Args:
+            lock (Union[str, Dict[str, str]]): path to a json or yaml lock file, or
+                the lock itself.
+            pull_policy (Optional[str], optional): image pull policy for the
+                pinned images, or None to keep the current policy. Defaults to
+                "IfNotPresent".
+            strict (bool, optional): raise an error (i.e. fail the compilation) if
+                an image is not pinned. Otherwise, the image is unchanged. Defaults
+                to True.
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+        images = load_image_lock(lock)
+
+        def pin_images_transform(op: kfp.dsl.ContainerOp) -> kfp.dsl.ContainerOp:
+            for container in [op.container] + op.init_containers + op.sidecars:
+                try:
+                    container.image = pin_image(container.image, images)
+                except KeyError as error:
+                    if strict:
+                        raise ValueError(
+                            "%s (op: %s)" % (error.args[0], op.name)
+                        ) from None
+                    continue
+                if pull_policy:
+                    container.image_pull_policy = pull_policy
+            return op
+
+        return self._then(
+            pin_images_transform,
+            "pin_images",
+            lock=images,
+            pull_policy=pull_policy,
+            strict=strict,
+        )
+
+    @_step
+    def use_prebuilt_images(
+        self, images: Union[str, Dict[str, Any]]
+    ) -> "ContainerOpTransform":
+        """Update the transform function to run lightweight components on prebuilt images.
+
+        Ops created with `func_to_container_op(..., packages_to_install=[...])` run
+        `pip install` when the pod starts. If there is a prebuilt image for the base
+        image and packages of the op (see `kfx.dsl.write_build_contexts` or
+        `kfx prebuild`), the image of the op is replaced by the prebuilt image, and
+        the `pip install` step is removed. Other ops are unchanged.
+
+        The manifest is loaded immediately, and is part of the transform spec
+        (see `to_dict`).
+
+        Args:
+            images (Union[str, Dict[str, Any]]): path to the `images.json` manifest
+                of the prebuilt images, or the manifest itself.
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+        prebuilt = load_prebuilt_images(images)
+
+        def use_prebuilt_images_transform(
+            op: kfp.dsl.ContainerOp,
+        ) -> kfp.dsl.ContainerOp:
+            packages = parse_pip_install(op.container.command)
+            if packages:
+                image = prebuilt.get(image_tag(op.container.image, packages))
+                if image:
+                    op.container.image = image
+                    op.container.command = strip_pip_install(op.container.command)
+            return op
+
+        return self._then(
+            use_prebuilt_images_transform, "use_prebuilt_images", images=prebuilt
+        )
+
+    @_step
+    def use_wheelhouse(
+        self,
+        pvc_name: str,
+        mount_path: str = "/wheelhouse",
+        read_only: bool = True,
+        offline: bool = True,
+        cache_dir: str = None,
+    ) -> "ContainerOpTransform":
+        """Update the transform function to pip install from a shared wheelhouse PVC.
+
+        The PVC is mounted in the main container, and `PIP_FIND_LINKS` points pip to
+        the wheels in it, so that each pod does not download the same wheels again.
+        With `offline`, `PIP_NO_INDEX` stops pip from reaching PyPI, i.e. installs
+        only resolve from the wheelhouse (e.g. in air-gapped clusters).
+
+        pip ignores caches that are not writable, so `PIP_CACHE_DIR` is inside the
+        PVC only if it is not read-only (i.e. a shared pip cache).
+
+        ::
+
+            # populate the wheelhouse once, e.g. in a job that mounts the PVC
+            # pip wheel -r requirements.txt -w /wheelhouse
+
+            transform = kfx.dsl.ContainerOpTransform().use_wheelhouse("wheelhouse")
+
+        Args:
+            pvc_name (str): name of the PersistentVolumeClaim with the wheels (it must
+                support ReadOnlyMany or ReadWriteMany to be shared across pods).
+            mount_path (str, optional): mount path of the PVC. Defaults to
+                "/wheelhouse".
+            read_only (bool, optional): mount the PVC as read-only. Defaults to True.
+            offline (bool, optional): do not use the package index. Defaults to True.
+            cache_dir (str, optional): pip cache directory. Defaults to
+                "<mount_path>/cache" if the PVC is writable, otherwise
+                "/tmp/pip-cache".
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+        volume = k8s.V1Volume(
+            name="kfx-wheelhouse",
+            persistent_volume_claim=k8s.V1PersistentVolumeClaimVolumeSource(
+                claim_name=pvc_name, read_only=read_only
+            ),
+        )
+        env_vars = {
+            "PIP_FIND_LINKS": mount_path,
+            "PIP_CACHE_DIR": cache_dir
+            or ("/tmp/pip-cache" if read_only else mount_path.rstrip("/") + "/cache"),
+        }
+        if offline:
+            env_vars["PIP_NO_INDEX"] = "1"
+
+        def use_wheelhouse_transform(op: kfp.dsl.ContainerOp) -> kfp.dsl.ContainerOp:
+            mount_volume(op, volume, mount_path, None, read_only=read_only)
+            for name, value in env_vars.items():
+                _set_env_var(op.container, name, value)
+            return op
+
+        return self._then(
+            use_wheelhouse_transform,
+            "use_wheelhouse",
+            pvc_name=pvc_name,
+            mount_path=mount_path,
+            read_only=read_only,
+            offline=offline,
+            cache_dir=cache_dir,
+        )
+
+    @_step
+    def prefetch_inputs(
+        self,
+        inputs: Dict[str, str],
+        image: str,
+        mount_path: str = "/prefetch",
+        max_workers: int = 8,
+        op_name: str = "*",
+    ) -> "ContainerOpTransform":
+        """Update the transform function to download the inputs in an init container.
+
+        The init container runs `kfx prefetch` (see `kfx.dsl.prefetch`), which
+        downloads all the inputs concurrently into an `emptyDir` volume, before the
+        main container starts. The volume is mounted in the main container at the
+        same path, i.e. the inputs are at `<mount_path>/<name>`.
+
+        ::
+
+            transform = kfx.dsl.ContainerOpTransform().prefetch_inputs(
+                {
+                    "train.parquet": "gs://bucket/data/train.parquet",
+                    "vocab.txt": "https://example.com/vocab.txt",
+                },
+                image="e2fyi/kfx@sha256:4f2b...",
+                op_name="train",
+            )
+
+        Args:
+            inputs (Dict[str, str]): uris of the inputs by their local file name. Argo
+                variables (e.g. "{{workflow.name}}") are resolved in the uris.
+            image (str): image of the init container, with a kfx version that has
+                the `kfx prefetch` cli. Pin it with a version tag or a digest.
+            mount_path (str, optional): mount path of the volume. Defaults to
+                "/prefetch".
+            max_workers (int, optional): maximum number of concurrent downloads.
+                Defaults to 8.
+            op_name (str, optional): Glob pattern for the op name. Defaults to "*".
+
+        Returns:
+            ContainerOpTransform: new ContainerOpTransform object.
+        """
+        volume = k8s.V1Volume(
+            name="kfx-prefetch", empty_dir=k8s.V1EmptyDirVolumeSource()
+        )
+        args = ["prefetch", "-d", mount_path, "-j", str(max_workers)] + [
+            "%s=%s" % (name, uri) for name, uri in sorted(inputs.items())
+        ]
+
+        def prefetch_inputs_transform(op: kfp.dsl.ContainerOp) -> kfp.dsl.ContainerOp:
+            if not op_matches(op, op_name) or any(
+                container.name == volume.name for container in op.init_containers
+            ):
+                return op
+            mount_volume(op, volume, mount_path, None)
+            init_container = kfp.dsl.UserContainer(
+                volume.name, image, command=["kfx"], args=args
+            )
+            init_container.add_volume_mount(
+                k8s.V1VolumeMount(name=volume.name, mount_path=mount_path)
+            )
+            return op.add_init_container(init_container)
+
+        return self._then(
+            prefetch_inputs_transform,
+            "prefetch_inputs",
+            inputs=inputs,
+            image=image,
+            mount_path=mount_path,
+            max_workers=max_workers,
+            op_name=op_name,
+        )
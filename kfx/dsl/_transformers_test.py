@@ -1,8 +1,13 @@
 """Test for ContainerOp transformers."""
+import json
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
 import kfp.dsl
 import pytest
 
-from kfx.dsl._transformers import ContainerOpTransform
+from kfx.dsl._pod_spec_patch import POD_SPEC_PATCH_ANNOTATION
+from kfx.dsl._transformers import ContainerOpTransform, register_step
 
 
 @pytest.fixture
@@ -18,7 +23,6 @@ def op() -> kfp.dsl.ContainerOp:
 
 
 def test_containerop_transform_image_pull_policy(op: kfp.dsl.ContainerOp):
-
     transform = (
         ContainerOpTransform()
         .set_image_pull_policy("Always")
@@ -43,7 +47,6 @@ def test_containerop_transform_set_resources(op: kfp.dsl.ContainerOp):
 
 
 def test_containerop_transform_set_sidecar_resources(op: kfp.dsl.ContainerOp):
-
     transform = ContainerOpTransform().set_sidecar_resources(cpu="500m", memory="4G")
     op.apply(transform)
     assert [sidecar.resources.requests for sidecar in op.sidecars] == [
@@ -121,3 +124,384 @@ def test_containerop_transform_add_envs(op: kfp.dsl.ContainerOp):
             "secret_ref": None,
         }
     ]
+
+
+def test_containerop_transform_is_immutable(op: kfp.dsl.ContainerOp):
+    base = ContainerOpTransform().set_labels({"team": "ml"})
+    small = base.set_resources(cpu="500m", memory="1G")
+    large = base.set_resources(cpu="4", memory="16G")
+
+    assert len(base) == 1
+    assert len(small) == len(large) == 2
+    # the prefix is shared, not copied
+    assert small._parent is base and large._parent is base
+
+    op.apply(base)
+    assert op.container.resources is None
+    op.apply(large)
+    assert op.container.resources.limits == {"cpu": "4", "memory": "16G"}
+
+
+def test_containerop_transform_not_modified_in_place(op: kfp.dsl.ContainerOp):
+    transform = ContainerOpTransform().set_labels({"team": "ml"})
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        transform.set_resources(cpu="500m")
+
+    op.apply(transform)
+    assert op.container.resources is None
+    assert transform == ContainerOpTransform.from_dict(transform.to_dict())
+
+
+def test_containerop_transform_unhashable_args():
+    class Unhashable:
+        __hash__ = None
+
+    with pytest.raises(TypeError):
+        ContainerOpTransform().set_annotations({"a": Unhashable()})
+
+
+def test_containerop_transform_is_hashable():
+    def custom(op):
+        return op
+
+    def build(memory):
+        return (
+            ContainerOpTransform([custom])
+            .set_annotations({"a": "1", "b": "2"})
+            .set_resources(cpu=(1, 2), memory=memory)
+        )
+
+    assert build("1G") == build("1G")
+    assert hash(build("1G")) == hash(build("1G"))
+    assert build("1G") != build("2G")
+    assert build("1G") != ContainerOpTransform().set_resources(cpu=(1, 2), memory="1G")
+    assert ContainerOpTransform([custom]).transforms == (custom,)
+    assert ContainerOpTransform() == ContainerOpTransform()
+    assert {build("1G"): "cached"}[build("1G")] == "cached"
+
+
+def test_containerop_transform_shared_across_threads():
+    base = ContainerOpTransform().set_image_pull_policy("Always")
+
+    def compile_op(index):
+        op = kfp.dsl.ContainerOp(name="op-%d" % index, image="bash")
+        op.apply(base.set_resources(cpu=str(index), memory="1G"))
+        return op.container.image_pull_policy, op.container.resources.limits["cpu"]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(compile_op, range(32)))
+
+    assert results == [("Always", str(index)) for index in range(32)]
+    assert len(base) == 1
+
+
+def test_containerop_transform_to_dict(op: kfp.dsl.ContainerOp):
+    transform = (
+        ContainerOpTransform()
+        .set_resources(cpu=("500m", "1"), memory="1G")
+        .add_env_vars({"ENV": "production"})
+        .set_sidecar_resources(cpu="1", sidecar_name="f*")
+    )
+    # args named "name" are not confused with the step name
+    assert ContainerOpTransform.from_dict(
+        ContainerOpTransform().add_env_var("name", "value").to_dict()
+    ) == ContainerOpTransform().add_env_var("name", "value")
+
+    data = transform.to_dict()
+    assert data == {
+        "steps": [
+            {"name": "set_resources", "kwargs": {"cpu": ["500m", "1"], "memory": "1G"}},
+            {"name": "add_env_vars", "kwargs": {"env_vars": {"ENV": "production"}}},
+            {
+                "name": "set_sidecar_resources",
+                "kwargs": {"cpu": "1", "memory": None, "sidecar_name": "f*"},
+            },
+        ]
+    }
+
+    for loaded in (
+        ContainerOpTransform.from_dict(data),
+        ContainerOpTransform.from_yaml(transform.to_yaml()),
+    ):
+        assert loaded.spec_hash() == transform.spec_hash()
+        assert loaded.to_dict() == data
+
+    op.apply(ContainerOpTransform.from_yaml(transform.to_yaml()))
+    assert op.container.resources.requests == {"cpu": "500m", "memory": "1G"}
+    assert op.container.resources.limits == {"cpu": "1", "memory": "1G"}
+    assert op.sidecars[0].resources.limits == {"cpu": "1"}
+    assert op.sidecars[1].resources is None
+
+
+def test_containerop_transform_spec_hash():
+    def build(memory):
+        return (
+            ContainerOpTransform()
+            .set_annotations({"a": "1", "b": "2"})
+            .set_resources(memory=memory)
+        )
+
+    assert build("1G").spec_hash() == build("1G").spec_hash()
+    assert build("1G").spec_hash() != build("2G").spec_hash()
+    # dict order of the args does not matter
+    assert (
+        ContainerOpTransform().set_annotations({"b": "2", "a": "1"}).spec_hash()
+        == ContainerOpTransform().set_annotations({"a": "1", "b": "2"}).spec_hash()
+    )
+    assert len(ContainerOpTransform().spec_hash()) == 64
+
+    with pytest.raises(ValueError):
+        ContainerOpTransform([lambda op: op]).to_dict()
+
+
+def test_containerop_transform_register_step(op: kfp.dsl.ContainerOp):
+    def set_node_pool(pool: str):
+        return lambda op: op.add_node_selector_constraint("pool", pool)
+
+    register_step("test_set_node_pool", set_node_pool)
+    with pytest.raises(ValueError):
+        register_step("test_set_node_pool", set_node_pool)
+    with pytest.raises(ValueError):
+        register_step("set_resources", set_node_pool)
+    with pytest.raises(ValueError):
+        ContainerOpTransform().step("unknown_step")
+
+    transform = ContainerOpTransform().step("test_set_node_pool", pool="gpu")
+    loaded = ContainerOpTransform.from_dict(transform.to_dict())
+    assert loaded == transform
+    assert "test_set_node_pool(pool='gpu')" in repr(loaded)
+
+    op.apply(loaded)
+    assert op.node_selector == {"pool": "gpu"}
+
+
+def test_containerop_transform_set_resources_from_profile():
+    profile = {
+        "train": {"cpu": "1500m", "memory": "2Gi"},
+        "eval-*": {"cpu": 0.5},
+    }
+    transform = ContainerOpTransform().set_resources_from_profile(
+        profile, default_cpu="100m", default_memory="256Mi"
+    )
+    train, evaluate, unknown = [
+        kfp.dsl.ContainerOp(name=name, image="bash")
+        for name in ("train", "eval-test", "unknown")
+    ]
+
+    train.apply(transform)
+    assert train.container.resources.requests == {"cpu": "1800m", "memory": "2458Mi"}
+    assert train.container.resources.limits == {"memory": "2458Mi"}
+
+    evaluate.apply(transform)
+    assert evaluate.container.resources.requests == {"cpu": "600m"}
+    assert evaluate.container.resources.limits is None
+
+    unknown.apply(transform)
+    assert unknown.container.resources.requests == {"cpu": "100m", "memory": "256Mi"}
+    assert unknown.container.resources.limits == {"cpu": "100m", "memory": "256Mi"}
+
+    # the loaded profile is part of the spec
+    loaded = ContainerOpTransform.from_yaml(transform.to_yaml())
+    assert loaded.spec_hash() == transform.spec_hash()
+    assert loaded == transform
+
+
+def test_containerop_transform_placement(op: kfp.dsl.ContainerOp):
+    transform = (
+        ContainerOpTransform()
+        .add_node_selector({"disktype": "ssd"})
+        .add_toleration("gpu", value="true", effect="NoSchedule")
+        .add_node_affinity("pool", ["fast", "local-ssd"])
+        .add_node_affinity("zone", ["a"], weight=50)
+        .add_pod_affinity({"app": "cache"}, weight=100)
+        .add_pod_affinity({"app": "train"}, anti=True)
+        .set_priority_class("high")
+        .add_topology_spread({"app": "train"}, max_skew=2)
+    )
+    with pytest.warns(UserWarning, match="compile_pipeline"):
+        op.apply(transform)
+
+    assert op.node_selector == {"disktype": "ssd"}
+    assert op.tolerations[0].to_dict()["key"] == "gpu"
+    affinity = op.affinity.to_dict()
+    node_affinity = affinity["node_affinity"]
+    assert node_affinity["required_during_scheduling_ignored_during_execution"][
+        "node_selector_terms"
+    ][0]["match_expressions"] == [
+        {"key": "pool", "operator": "In", "values": ["fast", "local-ssd"]}
+    ]
+    assert (
+        node_affinity["preferred_during_scheduling_ignored_during_execution"][0][
+            "weight"
+        ]
+        == 50
+    )
+    assert affinity["pod_affinity"][
+        "preferred_during_scheduling_ignored_during_execution"
+    ][0]["pod_affinity_term"]["label_selector"]["match_labels"] == {"app": "cache"}
+    assert affinity["pod_anti_affinity"][
+        "required_during_scheduling_ignored_during_execution"
+    ][0]["topology_key"] == ("kubernetes.io/hostname")
+    assert json.loads(op.pod_annotations[POD_SPEC_PATCH_ANNOTATION]) == {
+        "priorityClassName": "high",
+        "topologySpreadConstraints": [
+            {
+                "labelSelector": {"matchLabels": {"app": "train"}},
+                "maxSkew": 2,
+                "topologyKey": "topology.kubernetes.io/zone",
+                "whenUnsatisfiable": "ScheduleAnyway",
+            }
+        ],
+    }
+    assert ContainerOpTransform.from_dict(transform.to_dict()) == transform
+
+
+def test_containerop_transform_volumes(op: kfp.dsl.ContainerOp):
+    transform = (
+        ContainerOpTransform()
+        .set_shm_size("2Gi", sidecar_name="f*")
+        .add_scratch_volume(size="20Gi", sidecar_name=None)
+    )
+    # applying twice does not add the volumes twice
+    op.apply(transform)
+    op.apply(transform)
+
+    assert [volume.to_dict()["empty_dir"] for volume in op.volumes] == [
+        {"medium": "Memory", "size_limit": "2Gi"},
+        {"medium": None, "size_limit": "20Gi"},
+    ]
+    assert [(mount.name, mount.mount_path) for mount in op.container.volume_mounts] == [
+        ("kfx-dshm", "/dev/shm"),
+        ("kfx-scratch", "/scratch"),
+    ]
+    assert [mount.mount_path for mount in op.sidecars[0].volume_mounts] == ["/dev/shm"]
+    assert op.sidecars[1].volume_mounts is None
+    assert op.container.resources.requests == {"ephemeral-storage": "20Gi"}
+    assert op.container.resources.limits is None
+
+    # conflicting volume spec, or mount path of another volume
+    with pytest.raises(ValueError, match="different volume named kfx-dshm"):
+        op.apply(ContainerOpTransform().set_shm_size("4Gi"))
+    with pytest.raises(ValueError, match="already mounted from volume kfx-scratch"):
+        op.apply(ContainerOpTransform().add_scratch_volume(name="other"))
+    assert [volume.name for volume in op.volumes] == ["kfx-dshm", "kfx-scratch"]
+
+
+def test_containerop_transform_retry_timeout():
+    transform = (
+        ContainerOpTransform()
+        .tolerate_preemption(num_retries=5, op_name="shard-*")
+        .set_timeout(3600, op_name="shard-*")
+        .set_retry(2, policy="OnFailure", op_name="merge")
+    )
+    shard, merge = [
+        kfp.dsl.ContainerOp(name=name, image="bash") for name in ("shard-1", "merge")
+    ]
+    shard.apply(transform)
+    shard.apply(transform)
+    merge.apply(transform)
+
+    assert shard.num_retries == 5
+    assert shard.retry_policy == "OnError"
+    assert shard.backoff_duration == "30s"
+    assert shard.backoff_factor == 2.0
+    assert shard.timeout == 3600
+    assert sorted(toleration.key for toleration in shard.tolerations) == [
+        "cloud.google.com/gke-preemptible",
+        "cloud.google.com/gke-spot",
+        "kubernetes.azure.com/scalesetpriority",
+    ]
+
+    assert merge.num_retries == 2
+    assert merge.retry_policy == "OnFailure"
+    assert merge.backoff_max_duration == "10m"
+    assert merge.timeout == 0
+    assert merge.tolerations == []
+
+
+def test_containerop_transform_pin_images(op: kfp.dsl.ContainerOp):
+    digest = "sha256:" + "a" * 64
+    transform = (
+        ContainerOpTransform()
+        .set_image_pull_policy("Always")
+        .pin_images({"bash": digest})
+    )
+    op.apply(transform)
+    for container in [op.container] + op.sidecars:
+        assert container.image == "bash@" + digest
+        assert container.image_pull_policy == "IfNotPresent"
+    assert ContainerOpTransform.from_dict(transform.to_dict()) == transform
+
+    unpinned = kfp.dsl.ContainerOp(name="unpinned", image="python:3.8")
+    with pytest.raises(ValueError):
+        unpinned.apply(transform)
+    unpinned.apply(ContainerOpTransform().pin_images({"bash": digest}, strict=False))
+    assert unpinned.container.image == "python:3.8"
+    # unchanged by pin_images
+    assert unpinned.container.image_pull_policy == "Always"
+
+
+def test_containerop_transform_use_wheelhouse(op: kfp.dsl.ContainerOp):
+    transform = ContainerOpTransform().use_wheelhouse("wheels")
+    op.apply(transform)
+    op.apply(transform)
+
+    volume = op.volumes[0].to_dict()
+    assert len(op.volumes) == 1
+    assert volume["persistent_volume_claim"] == {
+        "claim_name": "wheels",
+        "read_only": True,
+    }
+    assert [
+        (mount.mount_path, mount.read_only) for mount in op.container.volume_mounts
+    ] == [("/wheelhouse", True)]
+    assert {env.name: env.value for env in op.container.env} == {
+        "PIP_FIND_LINKS": "/wheelhouse",
+        "PIP_CACHE_DIR": "/tmp/pip-cache",
+        "PIP_NO_INDEX": "1",
+    }
+    assert op.sidecars[0].volume_mounts is None
+
+    shared_cache = kfp.dsl.ContainerOp(name="cache", image="bash")
+    shared_cache.apply(
+        ContainerOpTransform().use_wheelhouse(
+            "pip", "/pip/", read_only=False, offline=False
+        )
+    )
+    assert {env.name: env.value for env in shared_cache.container.env} == {
+        "PIP_FIND_LINKS": "/pip/",
+        "PIP_CACHE_DIR": "/pip/cache",
+    }
+
+
+def test_containerop_transform_prefetch_inputs(op: kfp.dsl.ContainerOp):
+    transform = ContainerOpTransform().prefetch_inputs(
+        {"vocab.txt": "https://example.com/vocab.txt", "train.csv": "gs://b/train.csv"},
+        image="e2fyi/kfx:0.1.0",
+        max_workers=4,
+        op_name="hel*",
+    )
+    op.apply(transform)
+    op.apply(transform)
+    other = kfp.dsl.ContainerOp(name="other", image="bash")
+    other.apply(transform)
+
+    assert [volume.name for volume in op.volumes] == ["kfx-prefetch"]
+    assert [mount.mount_path for mount in op.container.volume_mounts] == ["/prefetch"]
+    assert len(op.init_containers) == 1
+    init_container = op.init_containers[0]
+    assert init_container.image == "e2fyi/kfx:0.1.0"
+    assert init_container.command == ["kfx"]
+    assert init_container.args == [
+        "prefetch",
+        "-d",
+        "/prefetch",
+        "-j",
+        "4",
+        "train.csv=gs://b/train.csv",
+        "vocab.txt=https://example.com/vocab.txt",
+    ]
+    assert [mount.mount_path for mount in init_container.volume_mounts] == ["/prefetch"]
+    assert not other.init_containers and not other.volumes
+    assert ContainerOpTransform.from_dict(transform.to_dict()) == transform
@@ -103,3 +103,4 @@ from kfx.vis._helpers import (
     tolocalfile,
     web_app,
 )
+from kfx.vis._series import MetricSeries
@@ -0,0 +1,199 @@
+"""Shape-preserving downsampling of Vega-Lite line and area charts.
+
+Each series of a line or area chart (i.e. the rows sharing the same color, detail,
+etc) is reduced to a target number of points with either
+
+- largest-triangle-three-buckets (`lttb`), which keeps the points that best
+  preserve the visual shape of the line, or
+- min-max decimation (`minmax`), which keeps the min and max of each bucket, so
+  that spikes are never dropped.
+
+Only the selected rows of `data.values` are kept, the rest of the spec is unchanged.
+"""
+import math
+from typing import Any, Tuple
+
+import numpy as np
+
+from kfx.vis._vega_pushdown import Unsupported, group_rows, to_columns
+
+METHODS = ("lttb", "minmax")
+LINE_MARKS = {"line", "area"}
+_INDEPENDENT_TYPES = {"quantitative", "temporal"}
+
+
+def _buckets(length: int, n_buckets: int) -> Any:
+    """Returns the bounds of the buckets for the points between the first and last."""
+    return np.linspace(1, length - 1, n_buckets + 1).astype(np.int64)
+
+
+def lttb(x: Any, y: Any, n_out: int) -> Any:
+    """Returns the indices of the points selected by largest-triangle-three-buckets.
+
+    Args:
+        x (Any): x values, sorted in ascending order.
+        y (Any): y values.
+        n_out (int): number of points to select (at least 3).
+
+    Returns:
+        Any: sorted indices of the selected points.
+    """
+    length = len(x)
+    if n_out >= length or n_out < 3:
+        return np.arange(length)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    bounds = _buckets(length, n_out - 2)
+    # average point of each bucket, with the last point as the final "bucket"
+    sizes = np.diff(bounds)
+    avg_x = np.append(np.add.reduceat(x[1:-1], bounds[:-1] - 1) / sizes, x[-1])
+    avg_y = np.append(np.add.reduceat(y[1:-1], bounds[:-1] - 1) / sizes, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, length - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = bounds[bucket], bounds[bucket + 1]
+        # twice the area of the triangles (previous, candidate, next average)
+        areas = np.abs(
+            (x[previous] - avg_x[bucket + 1]) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (avg_y[bucket + 1] - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax(x: Any, y: Any, n_out: int) -> Any:
+    """Returns the indices of the min and max points of each bucket.
+
+    Args:
+        x (Any): x values, sorted in ascending order.
+        y (Any): y values.
+        n_out (int): approximate number of points to select (at least 4).
+
+    Returns:
+        Any: sorted indices of the selected points.
+    """
+    length = len(x)
+    if n_out >= length or n_out < 4:
+        return np.arange(length)
+
+    y = np.asarray(y, dtype=np.float64)
+    bounds = _buckets(length, (n_out - 2) // 2)
+    bucket = np.searchsorted(bounds, np.arange(1, length - 1), side="right") - 1
+    # sorted by (bucket, y) - the first and last of each bucket are its min and max
+    order = np.lexsort((y[1:-1], bucket)) + 1
+    starts = bounds[:-1] - 1
+    stops = bounds[1:] - 2
+    selected = np.concatenate([[0, length - 1], order[starts], order[stops]])
+    return np.unique(selected)
+
+
+def _to_numbers(column: Any, field_type: str) -> Any:
+    if column.dtype == np.float64:
+        return column
+    if field_type != "temporal":
+        raise Unsupported("x values are not numbers")
+    try:
+        return (
+            np.array(
+                [
+                    value[:-1]
+                    if isinstance(value, str) and value.endswith("Z")
+                    else value
+                    for value in column
+                ],
+                dtype="datetime64[ms]",
+            )
+            .astype(np.int64)
+            .astype(np.float64)
+        )
+    except (TypeError, ValueError) as error:
+        raise Unsupported("x values are not dates") from error
+
+
+def _line_fields(spec: dict) -> Tuple[str, str, list]:
+    """Returns the x, y and series fields of a line or area chart."""
+    mark = spec.get("mark")
+    mark = mark.get("type") if isinstance(mark, dict) else mark
+    encoding = spec.get("encoding", {})
+    x_def, y_def = encoding.get("x", {}), encoding.get("y", {})
+    if (
+        mark not in LINE_MARKS
+        or x_def.get("type") not in _INDEPENDENT_TYPES
+        or any(
+            key in field_def
+            for field_def in (x_def, y_def)
+            for key in ("aggregate", "bin", "timeUnit")
+        )
+        or not isinstance(x_def.get("field"), str)
+        or not isinstance(y_def.get("field"), str)
+    ):
+        raise Unsupported("not a line or area chart")
+
+    series = []
+    for channel, field_def in encoding.items():
+        if channel in {"x", "y", "tooltip"} or not isinstance(field_def, dict):
+            continue
+        if "aggregate" in field_def:
+            raise Unsupported("aggregated series")
+        if "field" in field_def:
+            series.append(field_def["field"])
+    return x_def["field"], y_def["field"], series
+
+
+def downsample(spec: dict, max_points: int, method: str = "lttb") -> dict:
+    """Returns a line or area chart with at most about `max_points` rows.
+
+    Args:
+        spec (dict): Vega-Lite spec with inline `data.values`.
+        max_points (int): target number of rows across all series.
+        method (str, optional): "lttb" or "minmax". Defaults to "lttb".
+
+    Returns:
+        dict: a new spec with fewer rows, or the same spec if it is not a line or
+            area chart, or has fewer rows than `max_points`.
+    """
+    if method not in METHODS:
+        raise ValueError("method must be one of %s: %s" % (METHODS, method))
+    data = spec.get("data")
+    if (
+        not isinstance(data, dict)
+        or not isinstance(data.get("values"), list)
+        or len(data["values"]) <= max_points
+        or spec.get("transform")
+    ):
+        return spec
+
+    try:
+        x_field, y_field, series = _line_fields(spec)
+        rows = data["values"]
+        columns, length = to_columns(rows)
+        x_type = spec["encoding"]["x"]["type"]
+        x = _to_numbers(columns.get(x_field, np.full(length, np.nan)), x_type)
+        y = columns.get(y_field, np.full(length, np.nan))
+        if y.dtype != np.float64:
+            raise Unsupported("y values are not numbers")
+        groups, first = group_rows(columns, series, length)
+    except Unsupported:
+        return spec
+
+    # nulls are filtered by vega-lite anyway
+    valid = ~(np.isnan(x) | np.isnan(y))
+    select = lttb if method == "lttb" else minmax
+    # sorted by (series, x)
+    order = np.lexsort((x, groups))
+    order = order[valid[order]]
+    bounds = np.searchsorted(groups[order], np.arange(len(first) + 1))
+    kept = []
+    for group in range(len(first)):
+        indices = order[bounds[group] : bounds[group + 1]]
+        n_out = max(4, math.ceil(max_points * len(indices) / length))
+        kept.append(indices[select(x[indices], y[indices], n_out)])
+    selected = np.concatenate(kept) if kept else np.arange(0)
+
+    optimized = dict(spec)
+    optimized["data"] = dict(data, values=[rows[index] for index in selected])
+    return optimized
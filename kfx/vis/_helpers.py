@@ -1,5 +1,5 @@
 """Helper functions for generating visualization in Kubeflow pipelines UI."""
-from typing import Iterable, List, Optional, Union
+from typing import Any, Iterable, List, Optional, Union
 
 from pydantic import BaseModel
 
@@ -215,3 +215,34 @@ def tolocalfile(obj: BaseModel, dst: str = KFP_UI_METADATA_PATH):
     """
     with open(dst, "w") as fileout:
         fileout.write(asjson(obj))
+
+
+def artifact_dst(dst: Any) -> Any:
+    """Returns where to write a data artifact - the path of a `KfpArtifact` dst.
+
+    Args:
+        dst (Any): Path, File-like object, or a `KfpArtifact` in the shared volume
+            (see `kfx.dsl.ArtifactLocationHelper.mount_shared_volume`).
+
+    Returns:
+        Any: Path or File-like object.
+    """
+    return dst.path if isinstance(dst, KfpArtifact) else dst
+
+
+def record_artifact(artifact: Any, dst: Any) -> Optional[int]:
+    """Records a data artifact in the catalog of the task once it is written.
+
+    Does nothing if the artifact is not a `KfpArtifact` (see
+    `kfx.dsl.KfpArtifact.record`).
+
+    Args:
+        artifact (Any): the artifact, e.g. the `source` of the vis.
+        dst (Any): Path or File-like object the artifact was written to.
+
+    Returns:
+        Optional[int]: id of the record, or None if it is not recorded.
+    """
+    if not isinstance(artifact, KfpArtifact):
+        return None
+    return artifact.record(local_path=None if hasattr(dst, "write") else str(dst))
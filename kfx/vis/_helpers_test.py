@@ -1,5 +1,14 @@
 """Tests for kfx.lib.vis."""
+import io
+
+import numpy as np
+
+import kfx.dsl
+import kfx.dsl._artifact_location
 import kfx.vis._helpers as kfxvis
+from kfx.vis._series import MetricSeries
+from kfx.vis.evaluation import EvaluationEngine
+from kfx.vis.vega import write_arrow
 
 
 def test_confusion_matrix():
@@ -181,3 +190,47 @@ def test_kfp_metrics():
         ]
     )
     assert kfxvis.asdict(data) == expected, "generates json for kfp metrics"
+
+
+def test_record_artifact(tmp_path, monkeypatch):
+    helper = kfx.dsl.ArtifactLocationHelper
+    catalog_path = str(tmp_path / "catalog.db")
+    for name, value in [
+        (helper.artifact_storage_env, "minio"),
+        (helper.artifact_bucket_env, "mlpipeline"),
+        (helper.artifact_key_prefix_env, "run-1/pod-1"),
+        (helper.artifact_prefix_env, "evaluate"),
+        (helper.artifact_volume_env, "artifacts-pvc"),
+        (helper.artifact_volume_path_env, str(tmp_path)),
+        (helper.artifact_catalog_env, catalog_path),
+    ]:
+        monkeypatch.setenv(name, value)
+    monkeypatch.setattr(kfx.dsl._artifact_location, "_PENDING_RECORDS", {})
+    monkeypatch.setattr(kfx.dsl._artifact_location, "_RECORDED_KEYS", set())
+    (tmp_path / "run-1" / "pod-1").mkdir(parents=True)
+    data = {"target": np.array([1, 0]), "score": np.array([0.9, 0.2])}
+    series = MetricSeries()
+    series.add("loss", 0.5, step=0)
+
+    assert kfxvis.artifact_dst("out.csv") == "out.csv"
+    assert kfxvis.record_artifact("gs://bucket/out.csv", "out.csv") is None
+    EvaluationEngine(workers=1).roc(data, dst=kfx.dsl.KfpArtifact("roc", ".csv"))
+    EvaluationEngine(workers=1).roc(
+        data, dst=io.StringIO(), source=kfx.dsl.KfpArtifact("roc_inline", ".csv")
+    )
+    write_arrow(data, kfx.dsl.KfpArtifact("vega_data", ".arrow"))
+    series.to_csv(kfx.dsl.KfpArtifact("series", ".csv"))
+    series.to_csv(str(tmp_path / "series.csv"))
+    assert not kfx.dsl._artifact_location._PENDING_RECORDS
+
+    with kfx.dsl.ArtifactCatalog(catalog_path) as catalog:
+        records = catalog.find(op="evaluate")
+    assert [record["name"] for record in records] == [
+        "series",
+        "vega_data",
+        "roc_inline",
+        "roc",
+    ]
+    for record in records[:2]:
+        assert record["size"] == (tmp_path / record["key"]).stat().st_size
+    assert records[2]["size"] is None
@@ -0,0 +1,329 @@
+"""Compact store for per-step metric time-series."""
+import csv
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from kfx.vis._helpers import (
+    artifact_dst,
+    kfp_metric,
+    kfp_metrics,
+    record_artifact,
+    table,
+)
+from kfx.vis.models import KfpMetrics, Table, WebApp
+
+SERIES_CSV_HEADER = ["step", "name", "value"]
+
+_REDUCERS = {"last", "first", "max", "min"}
+
+
+def _as_array(values: Any) -> array:
+    """Returns a typed array of doubles from any iterable or buffer of numbers."""
+    if isinstance(values, array) and values.typecode == "d":
+        return values
+    if hasattr(values, "astype"):
+        # numpy arrays - copy the raw buffer instead of boxing every item
+        buffer = array("d")
+        buffer.frombytes(values.astype("d", copy=False).tobytes())
+        return buffer
+    return array("d", values)
+
+
+class MetricSeries:
+    """Thread-safe store for named per-step metric time-series.
+
+    Each series is held as a pair of typed `array('d')` buffers (steps and values),
+    i.e. 16 bytes per point instead of a python dict per point. The same object
+    can then be exported as a CSV artifact, a Vega-Lite line chart, or as the
+    final/best values of each series as kubeflow pipeline metrics.
+
+    ::
+
+        import kfx.vis
+
+        series = kfx.vis.MetricSeries()
+
+        for epoch in range(epochs):
+            ...
+            series.log({"train-loss": train_loss, "val-loss": val_loss}, step=epoch)
+
+        # best value of each series as kfp metrics
+        series.kfp_metrics(reducer="min").write_to(mlpipeline_metrics)
+
+        # line chart of all series as a web app
+        kfx.vis.kfp_ui_metadata([series.vega_web_app()]).write_to(mlpipeline_ui_metadata)
+
+    """
+
+    def __init__(self):
+        """Creates a new empty instance of MetricSeries object."""
+        self._lock = threading.Lock()
+        self._series: Dict[str, Tuple[array, array]] = {}
+
+    def _get_or_create(self, name: str) -> Tuple[array, array]:
+        series = self._series.get(name)
+        if series is None:
+            series = self._series[name] = (array("d"), array("d"))
+        return series
+
+    def add(
+        self, name: str, value: Union[float, int], step: Union[float, int] = None
+    ) -> "MetricSeries":
+        """Appends a single point to a series.
+
+        Args:
+            name (str): Name of the series.
+            value (Union[float, int]): Value of the point.
+            step (Union[float, int], optional): Step of the point. Defaults to the
+                number of points already in the series.
+
+        Returns:
+            MetricSeries: the same MetricSeries object.
+        """
+        with self._lock:
+            steps, values = self._get_or_create(name)
+            steps.append(len(steps) if step is None else step)
+            values.append(value)
+        return self
+
+    def log(
+        self, values: Dict[str, Union[float, int]], step: Union[float, int] = None
+    ) -> "MetricSeries":
+        """Appends a point to each of the provided series.
+
+        Args:
+            values (Dict[str, Union[float, int]]): dict of series names and values.
+            step (Union[float, int], optional): Step of the points. Defaults to the
+                number of points already in each series.
+
+        Returns:
+            MetricSeries: the same MetricSeries object.
+        """
+        for name, value in values.items():
+            self.add(name, value, step)
+        return self
+
+    def extend(
+        self, name: str, values: Iterable[float], steps: Iterable[float] = None
+    ) -> "MetricSeries":
+        """Appends many points to a series.
+
+        Args:
+            name (str): Name of the series.
+            values (Iterable[float]): Values of the points. Can be a numpy array.
+            steps (Iterable[float], optional): Steps of the points. Defaults to
+                consecutive steps after the last point in the series.
+
+        Returns:
+            MetricSeries: the same MetricSeries object.
+        """
+        new_values = _as_array(values)
+        new_steps = None if steps is None else _as_array(steps)
+        if new_steps is not None and len(new_steps) != len(new_values):
+            raise ValueError(
+                "steps and values must have the same length: %s != %s"
+                % (len(new_steps), len(new_values))
+            )
+
+        with self._lock:
+            series_steps, series_values = self._get_or_create(name)
+            if new_steps is None:
+                offset = len(series_steps)
+                new_steps = array("d", range(offset, offset + len(new_values)))
+            series_steps.extend(new_steps)
+            series_values.extend(new_values)
+        return self
+
+    @property
+    def names(self) -> List[str]:
+        """Names of the series in insertion order."""
+        with self._lock:
+            return list(self._series)
+
+    def __contains__(self, name: str) -> bool:
+        """Whether a series with the provided name exists."""
+        return name in self._series
+
+    def __len__(self) -> int:
+        """Total number of points across all series."""
+        with self._lock:
+            return sum(len(steps) for steps, _ in self._series.values())
+
+    def get(self, name: str) -> Tuple[array, array]:
+        """Returns a copy of the steps and values of a series.
+
+        Args:
+            name (str): Name of the series.
+
+        Returns:
+            Tuple[array, array]: typed arrays of the steps and values.
+        """
+        with self._lock:
+            steps, values = self._series[name]
+            return array("d", steps), array("d", values)
+
+    def to_numpy(self, name: str) -> Tuple[Any, Any]:
+        """Returns a copy of the steps and values of a series as numpy arrays.
+
+        Args:
+            name (str): Name of the series.
+
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray]: float64 arrays of the steps and values.
+        """
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        steps, values = self.get(name)
+        return np.frombuffer(steps, dtype="d"), np.frombuffer(values, dtype="d")
+
+    def reduce(self, name: str, reducer: str = "last") -> float:
+        """Returns a single value summarizing a series.
+
+        Args:
+            name (str): Name of the series.
+            reducer (str, optional): One of "last", "first", "max" or "min".
+                Defaults to "last".
+
+        Returns:
+            float: the reduced value.
+        """
+        if reducer not in _REDUCERS:
+            raise ValueError(
+                "reducer must be one of %s: %s" % (sorted(_REDUCERS), reducer)
+            )
+        with self._lock:
+            _, values = self._series[name]
+            if not values:
+                raise ValueError("series is empty: %s" % name)
+            if reducer == "last":
+                return values[-1]
+            if reducer == "first":
+                return values[0]
+            return max(values) if reducer == "max" else min(values)
+
+    def kfp_metrics(
+        self,
+        reducer: Union[str, Dict[str, str]] = "last",
+        names: List[str] = None,
+        percent: Union[bool, List[str]] = False,
+    ) -> KfpMetrics:
+        """Returns the final or best value of each series as kubeflow pipeline metrics.
+
+        Args:
+            reducer (Union[str, Dict[str, str]], optional): "last", "first", "max"
+                or "min", or a dict of series names and reducers. Series missing
+                from the dict use "last". Defaults to "last".
+            names (List[str], optional): Series to export. Defaults to all series.
+            percent (Union[bool, List[str]], optional): Whether to render the values
+                as percentage, or a list of series to render as percentage.
+                Defaults to False.
+
+        Returns:
+            KfpMetrics: an instance of KfpMetrics which can be stream to the output.
+        """
+        metrics = []
+        for name in names or self.names:
+            name_reducer = (
+                reducer.get(name, "last") if isinstance(reducer, dict) else reducer
+            )
+            is_percent = name in percent if isinstance(percent, list) else percent
+            metrics.append(
+                kfp_metric(name, self.reduce(name, name_reducer), percent=is_percent)
+            )
+        return kfp_metrics(metrics)
+
+    def rows(self, names: List[str] = None) -> Iterable[Tuple[float, str, float]]:
+        """Yields `(step, name, value)` for every point of the selected series.
+
+        Args:
+            names (List[str], optional): Series to export. Defaults to all series.
+        """
+        for name in names or self.names:
+            steps, values = self.get(name)
+            for step, value in zip(steps, values):
+                yield step, name, value
+
+    def to_csv(self, obj: Any, names: List[str] = None, header: bool = False):
+        """Writes the series as a long-format CSV (step, name, value).
+
+        The kubeflow pipeline `table` viewer expects a CSV without a header row,
+        see `MetricSeries.table`.
+
+        Args:
+            obj (Any): Path, File-like object, or a `KfpArtifact` in the shared
+                volume, which is recorded in the artifact catalog of the task.
+            names (List[str], optional): Series to export. Defaults to all series.
+            header (bool, optional): Whether to write a header row. Defaults to False.
+        """
+        dst = artifact_dst(obj)
+        if hasattr(dst, "write"):
+            self._write_csv(dst, names, header)
+        else:
+            with open(str(dst), "w", newline="") as fileout:
+                self._write_csv(fileout, names, header)
+        record_artifact(obj, dst)
+
+    def _write_csv(self, fileout: Any, names: Optional[List[str]], header: bool):
+        writer = csv.writer(fileout)
+        if header:
+            writer.writerow(SERIES_CSV_HEADER)
+        writer.writerows(self.rows(names))
+
+    @staticmethod
+    def table(source: Any, **kwargs) -> Table:
+        """Returns a table vis for a CSV artifact written with `MetricSeries.to_csv`.
+
+        Args:
+            source (Any): Full path to the CSV artifact, or a KfpArtifact.
+
+        Returns:
+            Table: pydantic data object.
+        """
+        return table(source, header=SERIES_CSV_HEADER, **kwargs)
+
+    def vega_spec(self, names: List[str] = None, title: str = None) -> dict:
+        """Returns a Vega-Lite line chart spec with one line per series.
+
+        Args:
+            names (List[str], optional): Series to plot. Defaults to all series.
+            title (str, optional): Title of the chart. Defaults to None.
+
+        Returns:
+            dict: Vega-Lite spec.
+        """
+        spec: Dict[str, Any] = {
+            "$schema": "https://vega.github.io/schema/vega-lite/v4.json",
+            "data": {
+                "values": [
+                    {"step": step, "name": name, "value": value}
+                    for step, name, value in self.rows(names)
+                ]
+            },
+            "mark": "line",
+            "encoding": {
+                "x": {"field": "step", "type": "quantitative"},
+                "y": {"field": "value", "type": "quantitative"},
+                "color": {"field": "name", "type": "nominal"},
+            },
+        }
+        if title:
+            spec["title"] = title
+        return spec
+
+    def vega_web_app(
+        self, names: List[str] = None, title: str = None, **kwargs
+    ) -> WebApp:
+        """Returns a Vega-Lite line chart of the series as a kubeflow pipeline web app.
+
+        Args:
+            names (List[str], optional): Series to plot. Defaults to all series.
+            title (str, optional): Title of the chart. Defaults to None.
+            **kwargs: Additional arguments for `kfx.vis.vega.vega_web_app`.
+
+        Returns:
+            WebApp: pydantic data object describing a Vega-Lite web app.
+        """
+        from kfx.vis.vega import vega_web_app  # pylint: disable=import-outside-toplevel
+
+        return vega_web_app(self.vega_spec(names, title), **kwargs)
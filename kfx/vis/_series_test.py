@@ -0,0 +1,106 @@
+"""Tests for kfx.vis._series."""
+import io
+import threading
+
+import numpy as np
+import pytest
+
+import kfx.vis._helpers as kfxvis
+from kfx.vis._series import MetricSeries
+
+
+@pytest.fixture
+def series() -> MetricSeries:
+    return (
+        MetricSeries()
+        .log({"train-loss": 0.9, "val-loss": 1.0})
+        .log({"train-loss": 0.5, "val-loss": 0.7})
+        .log({"train-loss": 0.3, "val-loss": 0.8})
+    )
+
+
+def test_metric_series_store(series: MetricSeries):
+    assert series.names == ["train-loss", "val-loss"]
+    assert len(series) == 6
+    assert "val-loss" in series
+
+    steps, values = series.get("val-loss")
+    assert list(steps) == [0, 1, 2]
+    assert list(values) == [1.0, 0.7, 0.8]
+    assert steps.typecode == values.typecode == "d"
+
+
+def test_metric_series_extend():
+    series = MetricSeries().add("acc", 0.1, step=10)
+    series.extend("acc", np.array([0.2, 0.3], dtype="float32"), steps=[20, 30])
+    series.extend("acc", [0.4])
+
+    steps, values = series.to_numpy("acc")
+    assert steps.tolist() == [10, 20, 30, 3]
+    assert values.tolist() == pytest.approx([0.1, 0.2, 0.3, 0.4])
+
+    with pytest.raises(ValueError):
+        series.extend("acc", [0.1, 0.2], steps=[1])
+
+
+def test_metric_series_thread_safe():
+    series = MetricSeries()
+
+    def worker():
+        for i in range(1000):
+            series.add("loss", i)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    [thread.start() for thread in threads]  # pylint: disable=expression-not-assigned
+    [thread.join() for thread in threads]  # pylint: disable=expression-not-assigned
+
+    steps, values = series.get("loss")
+    assert len(steps) == len(values) == 4000
+    assert sorted(steps) == list(range(4000))
+
+
+def test_metric_series_kfp_metrics(series: MetricSeries):
+    expected = {
+        "metrics": [
+            {"name": "train-loss", "numberValue": 0.3},
+            {"name": "val-loss", "numberValue": 0.7, "format": "PERCENTAGE"},
+        ]
+    }
+    data = series.kfp_metrics(reducer={"val-loss": "min"}, percent=["val-loss"])
+    assert kfxvis.asdict(data) == expected
+
+    with pytest.raises(ValueError):
+        series.kfp_metrics(reducer="mean")
+
+
+def test_metric_series_to_csv(series: MetricSeries):
+    fileout = io.StringIO()
+    series.to_csv(fileout, names=["val-loss"], header=True)
+    assert fileout.getvalue().splitlines() == [
+        "step,name,value",
+        "0.0,val-loss,1.0",
+        "1.0,val-loss,0.7",
+        "2.0,val-loss,0.8",
+    ]
+
+    assert kfxvis.asdict(series.table("gs://bucket/series.csv")) == {
+        "type": "table",
+        "format": "csv",
+        "header": ["step", "name", "value"],
+        "source": "gs://bucket/series.csv",
+    }
+
+
+def test_metric_series_vega_web_app(series: MetricSeries):
+    spec = series.vega_spec(names=["train-loss"], title="loss")
+    assert spec["mark"] == "line"
+    assert spec["title"] == "loss"
+    assert spec["data"]["values"] == [
+        {"step": 0.0, "name": "train-loss", "value": 0.9},
+        {"step": 1.0, "name": "train-loss", "value": 0.5},
+        {"step": 2.0, "name": "train-loss", "value": 0.3},
+    ]
+
+    app = series.vega_web_app()
+    assert app.storage == "inline"
+    assert '"name": "val-loss"' in app.source
@@ -0,0 +1,291 @@
+"""Readers that iterate columns of data sources in bounded chunks.
+
+A data source is either
+
+- a path to a `.npy` file with a structured dtype (columns are the field names),
+- a tuple of paths to `.npy` files (one file per column, in order),
+- a path to a `.parquet`, `.feather` or `.arrow` file, or to a directory of
+  parquet files,
+- a numpy array or `np.memmap` with a structured dtype, a tuple of arrays (one
+  per column, in order), or a dict of column names and arrays, or
+- a `pyarrow.Table`, `pyarrow.RecordBatch` or `pyarrow.dataset.Dataset`.
+
+Data is only read one chunk at a time - `.npy` files are memory-mapped and sliced,
+arrow IPC files are memory-mapped and read one record batch at a time (a
+compressed batch is decompressed on its own, never the whole file), parquet files
+are read by row group, and arrow tables are sliced without copying.
+"""
+import os
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+Source = Any
+
+ARROW_EXTENSIONS = {".parquet": "parquet", ".feather": "feather", ".arrow": "feather"}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow  # pylint: disable=import-outside-toplevel
+    except ImportError as error:  # pragma: no cover
+        raise ImportError(
+            "`pyarrow` is required to read parquet, feather or arrow data: "
+            "pip install pyarrow"
+        ) from error
+    return pyarrow
+
+
+def _arrow_format(path: str) -> Optional[str]:
+    if os.path.isdir(path):
+        return "dataset"
+    return ARROW_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def is_path_source(source: Source) -> bool:
+    """Whether the source is a path or a tuple of paths.
+
+    Path sources are cheap to send to another process, as only the paths are
+    pickled. Other sources should be read in the process that holds them.
+    """
+    if isinstance(source, (tuple, list)):
+        return all(isinstance(item, str) for item in source)
+    return isinstance(source, str)
+
+
+def _is_arrow_object(source: Source) -> bool:
+    module = type(source).__module__ or ""
+    return module.split(".")[0] == "pyarrow"
+
+
+def is_single_source(source: Source) -> bool:
+    """Whether the source is a single data source rather than an iterable of shards.
+
+    Paths, numpy arrays, dicts of columns and arrow objects are single sources. Any
+    other iterable (e.g. a list, tuple or generator) is a collection of shards -
+    i.e. a tuple of per-column arrays or files must be inside a list of shards.
+    """
+    return isinstance(source, (str, np.ndarray, dict)) or _is_arrow_object(source)
+
+
+def _load_npy_columns(source: Source, columns: Sequence[str]) -> List[Any]:
+    """Returns memory-mapped arrays (or views) for each column - no data is read yet."""
+    if isinstance(source, dict):
+        return [source[name] for name in columns]
+
+    if isinstance(source, (tuple, list)):
+        if len(source) != len(columns):
+            raise ValueError(
+                "expected one array or .npy file per column %s" % list(columns)
+            )
+        return [
+            np.load(item, mmap_mode="r") if isinstance(item, str) else item
+            for item in source
+        ]
+
+    array = np.load(source, mmap_mode="r") if isinstance(source, str) else source
+    if array.dtype.names is None:
+        if len(columns) == 1:
+            return [array]
+        raise ValueError(
+            "a single array or .npy source must have a structured dtype with the "
+            "columns %s" % list(columns)
+        )
+    return [array[name] for name in columns]
+
+
+def _open_arrow(source: Source) -> Any:
+    """Returns an arrow reader or object for the source.
+
+    Arrow IPC (feather v2) files are opened as a `pyarrow.ipc.RecordBatchFileReader`
+    on a memory map, parquet files as a `pyarrow.parquet.ParquetFile`, and
+    directories as a `pyarrow.dataset.Dataset` - i.e. no data is read yet.
+    """
+    pyarrow = _import_pyarrow()
+    if not isinstance(source, str):
+        return source
+
+    arrow_format = _arrow_format(source)
+    if arrow_format == "feather":
+        import pyarrow.ipc  # pylint: disable=import-outside-toplevel
+
+        return pyarrow.ipc.open_file(pyarrow.memory_map(source))
+    if arrow_format == "parquet":
+        import pyarrow.parquet  # pylint: disable=import-outside-toplevel
+
+        return pyarrow.parquet.ParquetFile(source, memory_map=True)
+
+    import pyarrow.dataset  # pylint: disable=import-outside-toplevel
+
+    return pyarrow.dataset.dataset(source, format="parquet")
+
+
+def is_arrow_source(source: Source) -> bool:
+    """Whether the source is read with pyarrow.
+
+    Args:
+        source (Source): data source.
+
+    Returns:
+        bool: True for a `.parquet`, `.feather` or `.arrow` file, a directory of
+            parquet files, or a pyarrow object (e.g. a `pyarrow.Table`).
+    """
+    if isinstance(source, str):
+        return _arrow_format(source) is not None
+    return _is_arrow_object(source)
+
+
+def _arrow_units(data: Any) -> Optional[int]:
+    """Returns the number of record batches or row groups of an arrow file reader."""
+    if hasattr(data, "num_record_batches"):
+        return data.num_record_batches
+    if hasattr(data, "num_row_groups"):
+        return data.num_row_groups
+    return None
+
+
+def split_arrow_source(source: str) -> List[Tuple[str, int, int]]:
+    """Splits an arrow file, parquet file, or directory of parquet files into parts.
+
+    Each part is `(path, start, stop)`, the range of record batches (arrow IPC) or
+    row groups (parquet) of a file, which can be read independently with
+    `iter_chunks(path, ..., start=start, stop=stop)`.
+
+    Args:
+        source (str): path to the file or directory.
+
+    Returns:
+        List[Tuple[str, int, int]]: one part per record batch or row group.
+    """
+    if _arrow_format(source) == "dataset":
+        return [
+            part
+            for path in sorted(_open_arrow(source).files)
+            for part in split_arrow_source(path)
+        ]
+    units = _arrow_units(_open_arrow(source)) or 0
+    return [(source, index, index + 1) for index in range(units)]
+
+
+def source_length(source: Source, columns: Sequence[str]) -> int:
+    """Returns the number of rows in a data source.
+
+    Args:
+        source (Source): data source.
+        columns (Sequence[str]): columns to read.
+
+    Returns:
+        int: number of rows.
+    """
+    if is_arrow_source(source):
+        data = _open_arrow(source)
+        if hasattr(data, "metadata") and hasattr(data, "num_row_groups"):
+            return data.metadata.num_rows
+        if hasattr(data, "num_record_batches"):
+            # one (decompressed) record batch in memory at a time
+            return sum(
+                data.get_batch(index).num_rows
+                for index in range(data.num_record_batches)
+            )
+        return data.num_rows if hasattr(data, "num_rows") else data.count_rows()
+    return len(_load_npy_columns(source, columns)[0])
+
+
+def _select(batch: Any, columns: Sequence[str]) -> Any:
+    """Returns the columns of a record batch or table, without copying."""
+    names = batch.schema.names
+    return [batch.column(names.index(name)) for name in columns]
+
+
+def _iter_arrow_batches(
+    source: Source,
+    columns: Sequence[str],
+    chunk_rows: int,
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> Iterator[List[Any]]:
+    data = _open_arrow(source)
+    units = _arrow_units(data)
+    if units is not None and hasattr(data, "get_batch"):
+        # arrow IPC file - only one record batch is decompressed at a time, and
+        # uncompressed batches are zero-copy views of the memory-mapped file
+        for index in range(start, units if stop is None else min(stop, units)):
+            batch = data.get_batch(index)
+            for offset in range(0, batch.num_rows, chunk_rows):
+                yield _select(batch.slice(offset, chunk_rows), columns)
+        return
+
+    if units is not None:
+        # parquet file - only the columns of the row groups are read, in batches
+        row_groups = list(range(start, units if stop is None else min(stop, units)))
+        for batch in data.iter_batches(
+            batch_size=chunk_rows, row_groups=row_groups, columns=list(columns)
+        ):
+            yield _select(batch, columns)
+        return
+
+    if hasattr(data, "num_rows") and hasattr(data, "slice"):
+        # Table or RecordBatch - slices do not copy the data
+        for offset in range(0, data.num_rows, chunk_rows):
+            yield _select(data.slice(offset, chunk_rows), columns)
+        return
+
+    # Dataset - only the columns are read, one batch at a time
+    for batch in data.to_batches(columns=list(columns), batch_size=chunk_rows):
+        yield _select(batch, columns)
+
+
+def iter_chunks(
+    source: Source,
+    columns: Sequence[str],
+    chunk_rows: int,
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> Iterator[Tuple[Any, ...]]:
+    """Yields tuples of numpy arrays for the columns, at most chunk_rows at a time.
+
+    For numpy sources only the rows in `[start, stop)` are read. For arrow IPC and
+    parquet files, `start`/`stop` are the range of record batches or row groups to
+    read (see `split_arrow_source`), and they are ignored for other arrow sources.
+
+    Args:
+        source (Source): data source.
+        columns (Sequence[str]): columns to read.
+        chunk_rows (int): max number of rows per chunk.
+        start (int, optional): first row to read. Defaults to 0.
+        stop (Optional[int], optional): row to stop at. Defaults to None.
+    """
+    if is_arrow_source(source):
+        for arrays in _iter_arrow_batches(source, columns, chunk_rows, start, stop):
+            # zero-copy for numeric columns without nulls
+            yield tuple(array.to_numpy(zero_copy_only=False) for array in arrays)
+        return
+
+    arrays = _load_npy_columns(source, columns)
+    stop = len(arrays[0]) if stop is None else min(stop, len(arrays[0]))
+    for offset in range(start, stop, chunk_rows):
+        end = min(offset + chunk_rows, stop)
+        yield tuple(np.asarray(array[offset:end]) for array in arrays)
+
+
+def source_columns(source: Source) -> List[str]:
+    """Returns the names of the columns of a data source, if known.
+
+    Args:
+        source (Source): data source.
+
+    Returns:
+        List[str]: names of the columns.
+    """
+    if isinstance(source, dict):
+        return list(source)
+    if is_arrow_source(source):
+        data = _open_arrow(source)
+        schema = getattr(data, "schema_arrow", None) or data.schema
+        return list(schema.names)
+    if isinstance(source, (tuple, list)):
+        raise ValueError("columns must be provided for a tuple of arrays or files")
+    array = np.load(source, mmap_mode="r") if isinstance(source, str) else source
+    if array.dtype.names is None:
+        raise ValueError("columns must be provided for an unstructured array")
+    return list(array.dtype.names)
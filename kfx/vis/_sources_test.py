@@ -0,0 +1,112 @@
+"""Tests for kfx.vis._sources."""
+import numpy as np
+import pyarrow
+import pyarrow.dataset
+import pyarrow.feather
+import pyarrow.parquet
+import pytest
+
+from kfx.vis._sources import (
+    is_path_source,
+    iter_chunks,
+    source_columns,
+    source_length,
+    split_arrow_source,
+)
+
+
+@pytest.fixture
+def data():
+    return {"target": np.arange(10) % 3, "score": np.linspace(0, 1, 10)}
+
+
+def _collect(source, columns=("target", "score"), chunk_rows=4, **kwargs):
+    chunks = list(iter_chunks(source, columns, chunk_rows, **kwargs))
+    assert all(len(chunk[0]) <= chunk_rows for chunk in chunks)
+    return [np.concatenate([chunk[index] for chunk in chunks]) for index in range(2)]
+
+
+def _assert_same(result, data):
+    np.testing.assert_array_equal(result[0], data["target"])
+    np.testing.assert_array_almost_equal(result[1], data["score"])
+
+
+def test_numpy_sources(tmp_path, data):
+    structured = np.zeros(10, dtype=[("target", "i8"), ("score", "f8")])
+    structured["target"] = data["target"]
+    structured["score"] = data["score"]
+    path = str(tmp_path / "data.npy")
+    np.save(path, structured)
+    memmap = np.load(path, mmap_mode="r")
+
+    for source in [path, memmap, structured, data, (data["target"], data["score"])]:
+        assert source_length(source, ["target", "score"]) == 10
+        _assert_same(_collect(source), data)
+
+    assert source_columns(memmap) == ["target", "score"]
+    assert is_path_source(path)
+    assert not is_path_source(memmap)
+
+    result = _collect(path, start=2, stop=7)
+    np.testing.assert_array_equal(result[0], data["target"][2:7])
+
+    with pytest.raises(ValueError):
+        list(iter_chunks(data["target"], ["target", "score"], 4))
+
+
+def test_arrow_sources(tmp_path, data):
+    arrow_table = pyarrow.table(data)
+    feather_path = str(tmp_path / "data.feather")
+    pyarrow.feather.write_feather(arrow_table, feather_path)
+    dataset_dir = tmp_path / "dataset"
+    dataset_dir.mkdir()
+    pyarrow.parquet.write_table(arrow_table.slice(0, 5), str(dataset_dir / "0.parquet"))
+    pyarrow.parquet.write_table(arrow_table.slice(5), str(dataset_dir / "1.parquet"))
+
+    for source in [
+        arrow_table,
+        arrow_table.to_batches()[0],
+        feather_path,
+        str(dataset_dir),
+        pyarrow.dataset.dataset(str(dataset_dir)),
+    ]:
+        assert source_length(source, ["target", "score"]) == 10
+        assert source_columns(source) == ["target", "score"]
+        _assert_same(_collect(source), data)
+
+
+def test_split_arrow_source(tmp_path, data):
+    arrow_table = pyarrow.table(data)
+    feather_path = str(tmp_path / "data.arrow")
+    # lz4 compressed, 3 record batches
+    pyarrow.feather.write_feather(arrow_table, feather_path, chunksize=4)
+    parquet_path = str(tmp_path / "data.parquet")
+    pyarrow.parquet.write_table(arrow_table, parquet_path, row_group_size=3)
+    dataset_dir = tmp_path / "dataset"
+    dataset_dir.mkdir()
+    pyarrow.parquet.write_table(arrow_table.slice(0, 5), str(dataset_dir / "0.parquet"))
+    pyarrow.parquet.write_table(arrow_table.slice(5), str(dataset_dir / "1.parquet"))
+
+    for source, expected in [
+        (feather_path, 3),
+        (parquet_path, 4),
+        (str(dataset_dir), 2),
+    ]:
+        parts = split_arrow_source(source)
+        assert len(parts) == expected
+        chunks = [
+            chunk
+            for part_source, start, stop in parts
+            for chunk in iter_chunks(part_source, ["score", "target"], 2, start, stop)
+        ]
+        assert all(len(chunk[0]) <= 2 for chunk in chunks)
+        _assert_same(
+            [
+                np.concatenate([chunk[1] for chunk in chunks]),
+                np.concatenate([chunk[0] for chunk in chunks]),
+            ],
+            data,
+        )
+
+    result = _collect(feather_path, start=1, stop=2)
+    np.testing.assert_array_equal(result[0], data["target"][4:8])
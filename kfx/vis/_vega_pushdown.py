@@ -0,0 +1,568 @@
+"""Pushdown of Vega-Lite aggregate, bin and timeUnit transforms into numpy.
+
+Vega-Lite specs with inline `data.values` are reduced in python before they are
+inlined, so that the browser receives the aggregated rows instead of the raw rows.
+The spec is rewritten to plot the reduced data as the same chart:
+
+- aggregated encodings use the pre-computed field, with the default Vega-Lite title
+  (e.g. "Sum of b" or "Count of Records"),
+- binned encodings use `bin: {"binned": true}` with the pre-computed bin start and
+  end fields, and
+- `utc` time units are truncated in python, and kept in the encoding (truncating
+  again in the browser is a no-op). Local time units depend on the timezone of the
+  browser and are not pushed down.
+
+Anything that is not recognized leaves the spec unchanged.
+"""
+import copy
+import math
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+Columns = Dict[str, Any]
+
+# same as vega-statistics
+_BIN_EPSILON = 1e-14
+_POSITION_CHANNELS = {"x", "y"}
+_COMPOSITE_KEYS = {
+    "layer",
+    "facet",
+    "concat",
+    "hconcat",
+    "vconcat",
+    "repeat",
+    "selection",
+    "params",
+}
+_NUMERIC_OPS = {
+    "sum",
+    "mean",
+    "average",
+    "median",
+    "q1",
+    "q3",
+    "min",
+    "max",
+    "variance",
+    "variancep",
+    "stdev",
+    "stdevp",
+}
+_COUNT_OPS = {"count", "valid", "missing", "distinct"}
+_QUANTILES = {"median": 0.5, "q1": 0.25, "q3": 0.75}
+# utc time units that truncate a timestamp, and the numpy unit to truncate to
+_TIME_UNITS = {
+    "utcyear": "Y",
+    "utcyearquarter": "Q",
+    "utcyearmonth": "M",
+    "utcyearmonthdate": "D",
+    "utcyearmonthdatehours": "h",
+    "utcyearmonthdatehoursminutes": "m",
+    "utcyearmonthdatehoursminutesseconds": "s",
+}
+
+
+class Unsupported(Exception):
+    """Raised when a spec cannot be optimized without changing the chart."""
+
+
+def _is_simple_field(field: Any) -> bool:
+    return isinstance(field, str) and not any(char in field for char in ".[]\\")
+
+
+def to_columns(rows: List[dict]) -> Tuple[Columns, int]:
+    """Returns a numpy array for each field in the rows.
+
+    Columns of numbers (and nulls) are float arrays with NaN for nulls, all other
+    columns are object arrays.
+    """
+    fields: Dict[str, None] = {}
+    for row in rows:
+        if not isinstance(row, dict):
+            raise Unsupported("data values must be objects")
+        fields.update(dict.fromkeys(row))
+
+    columns: Columns = {}
+    for field in fields:
+        values = [row.get(field) for row in rows]
+        if all(
+            value is None
+            or (isinstance(value, (int, float)) and not isinstance(value, bool))
+            for value in values
+        ):
+            columns[field] = np.array(values, dtype=np.float64)
+        else:
+            column = np.empty(len(values), dtype=object)
+            column[:] = values
+            columns[field] = column
+    return columns, len(rows)
+
+
+def _to_python(value: Any) -> Any:
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        if math.isnan(value) or math.isinf(value):
+            return None
+        return int(value) if value.is_integer() and abs(value) < 2**53 else value
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def _to_rows(columns: Columns, fields: Sequence[str], length: int) -> List[dict]:
+    lists = [columns[field].tolist() for field in fields]
+    return [
+        {field: _to_python(values[index]) for field, values in zip(fields, lists)}
+        for index in range(length)
+    ]
+
+
+def _numeric(columns: Columns, field: str, length: int) -> Any:
+    if field not in columns:
+        return np.full(length, np.nan)
+    column = columns[field]
+    if column.dtype != np.float64:
+        raise Unsupported("field is not numeric: %s" % field)
+    return column
+
+
+def _codes(column: Any) -> Any:
+    """Returns an integer code for each value, so that equal values share a code."""
+    if column.dtype == np.float64:
+        return np.unique(column, return_inverse=True)[1].ravel()
+    index: Dict[Any, int] = {}
+    try:
+        return np.fromiter(
+            (index.setdefault(value, len(index)) for value in column),
+            dtype=np.int64,
+            count=len(column),
+        )
+    except TypeError as error:  # unhashable values, e.g. nested objects
+        raise Unsupported(str(error)) from error
+
+
+def group_rows(
+    columns: Columns, groupby: Sequence[str], length: int
+) -> Tuple[Any, Any]:
+    """Returns the group of each row, and the first row of each group.
+
+    Groups are numbered in the order they first appear, like vega.
+    """
+    if not groupby:
+        return np.zeros(length, dtype=np.int64), np.zeros(min(length, 1), dtype=int)
+
+    combined = np.zeros(length, dtype=np.int64)
+    for field in groupby:
+        column = columns.get(field)
+        codes = _codes(column) if column is not None else np.zeros(length, np.int64)
+        combined = combined * (int(codes.max(initial=0)) + 1) + codes
+        # re-code to keep the combined codes small
+        combined = np.unique(combined, return_inverse=True)[1].ravel()
+
+    _, first, inverse = np.unique(combined, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[inverse.ravel()], first[order]
+
+
+def _aggregate_op(
+    op: str, columns: Columns, field: Optional[str], groups: Any, size: int, length: int
+) -> Any:
+    """Returns the aggregated value of a field for each group."""
+    counts = np.bincount(groups, minlength=size)
+    if op == "count":
+        return counts.astype(np.float64)
+
+    column = columns.get(field) if field else None
+    if column is None:
+        column = np.full(length, np.nan)
+
+    if column.dtype == np.float64:
+        is_valid = ~np.isnan(column)
+    else:
+        is_valid = np.not_equal(column, None)
+    valid_counts = np.bincount(groups, weights=is_valid, minlength=size)
+    if op == "valid":
+        return valid_counts
+    if op == "missing":
+        return counts - valid_counts
+    if op == "distinct":
+        pairs = np.unique(groups * (length + 1) + _codes(column))
+        return np.bincount(pairs // (length + 1), minlength=size).astype(np.float64)
+
+    values = _numeric(columns, field or "", length)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return _numeric_op(op, groups[is_valid], values[is_valid], valid_counts, size)
+
+
+def _numeric_op(  # pylint: disable=too-many-return-statements
+    op: str, groups: Any, values: Any, valid_counts: Any, size: int
+) -> Any:
+    sums = np.bincount(groups, weights=values, minlength=size)
+    if op == "sum":
+        return sums
+    means = sums / valid_counts
+    if op in {"mean", "average"}:
+        return means
+    if op in {"min", "max"}:
+        result = np.full(size, np.inf if op == "min" else -np.inf)
+        (np.minimum if op == "min" else np.maximum).at(result, groups, values)
+        result[valid_counts == 0] = np.nan
+        return result
+    if op in _QUANTILES:
+        return _quantiles(groups, values, size, _QUANTILES[op])
+    squares = np.bincount(groups, weights=(values - means[groups]) ** 2, minlength=size)
+    ddof = 0 if op.endswith("p") else 1
+    variance = squares / (valid_counts - ddof)
+    return np.sqrt(variance) if op.startswith("stdev") else variance
+
+
+def _quantiles(groups: Any, values: Any, size: int, quantile: float) -> Any:
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    bounds = np.searchsorted(groups, np.arange(size + 1))
+    result = np.full(size, np.nan)
+    for group in range(size):
+        start, stop = bounds[group], bounds[group + 1]
+        if stop > start:
+            # same as d3-array (R-7), i.e. numpy's default linear interpolation
+            result[group] = np.quantile(values[start:stop], quantile)
+    return result
+
+
+def _aggregate(
+    columns: Columns,
+    length: int,
+    groupby: Sequence[str],
+    measures: Sequence[Tuple[str, Optional[str], str]],
+) -> Tuple[Columns, int]:
+    """Aggregates the columns, returns the groupby and measure (`as`) columns."""
+    groups, first = group_rows(columns, groupby, length)
+    size = len(first)
+    result: Columns = {
+        field: columns[field][first] if field in columns else np.full(size, np.nan)
+        for field in groupby
+    }
+    for op, field, name in measures:
+        result[name] = _aggregate_op(op, columns, field, groups, size, length)
+    return result, size
+
+
+def bin_params(
+    extent: Tuple[float, float], maxbins: int = 10, **params
+) -> Tuple[float, float, float]:
+    """Returns the (start, stop, step) of bins, same as `bin` in vega-statistics.
+
+    Args:
+        extent (Tuple[float, float]): min and max of the values.
+        maxbins (int, optional): max number of bins. Defaults to 10.
+
+    Returns:
+        Tuple[float, float, float]: start, stop and step of the bins.
+    """
+    base = params.get("base", 10)
+    logb = math.log(base)
+    divide = params.get("divide", [5, 2])
+    minimum, maximum = extent
+    span = params.get("span") or (maximum - minimum) or abs(minimum) or 1
+
+    if params.get("step"):
+        step = params["step"]
+    elif params.get("steps"):
+        steps = params["steps"]
+        target = span / maxbins
+        index = 0
+        while index < len(steps) and steps[index] < target:
+            index += 1
+        step = steps[max(0, index - 1)]
+    else:
+        level = math.ceil(math.log(maxbins) / logb)
+        minstep = params.get("minstep", 0)
+        step = max(minstep, base ** (round(math.log(span) / logb) - level))
+        while math.ceil(span / step) > maxbins:
+            step *= base
+        for div in divide:
+            value = step / div
+            if value >= minstep and span / value <= maxbins:
+                step = value
+
+    value = math.log(step)
+    precision = 0 if value >= 0 else int(-value / logb) + 1
+    eps = base ** (-precision - 1)
+    if params.get("nice", True):
+        value = math.floor(minimum / step + eps) * step
+        minimum = value - step if minimum < value else value
+        maximum = math.ceil(maximum / step) * step
+
+    return minimum, (minimum + step if maximum == minimum else maximum), step
+
+
+def _bin(column: Any, bin_def: Any, maxbins: int) -> Tuple[Any, Any, float]:
+    """Returns the bin start and end of each value, and the bin step."""
+    if column.dtype != np.float64:
+        raise Unsupported("binned field is not numeric")
+    params = dict(bin_def) if isinstance(bin_def, dict) else {}
+    if set(params) - {
+        "maxbins",
+        "base",
+        "divide",
+        "extent",
+        "minstep",
+        "nice",
+        "step",
+        "steps",
+    }:
+        raise Unsupported("unsupported bin params: %s" % params)
+
+    extent = params.pop("extent", None)
+    if extent is None:
+        valid = column[~np.isnan(column)]
+        if not len(valid):  # pylint: disable=len-as-condition
+            raise Unsupported("no values to bin")
+        extent = (float(valid.min()), float(valid.max()))
+    start, stop, step = bin_params(
+        tuple(extent), params.pop("maxbins", maxbins), **params
+    )
+
+    with np.errstate(invalid="ignore"):
+        clamped = np.clip(column, start, stop - step)
+        starts = start + step * np.floor(_BIN_EPSILON + (clamped - start) / step)
+        # values outside the extent are invalid (vega returns +/-Infinity)
+        starts[(column < start) | (column > stop)] = np.nan
+    return starts, starts + step, step
+
+
+def _time_unit(column: Any, unit: Any) -> Any:
+    """Returns the values truncated to a utc time unit, as epoch milliseconds."""
+    if isinstance(unit, dict) and set(unit) == {"unit"}:
+        unit = unit["unit"]
+    if unit not in _TIME_UNITS:
+        raise Unsupported("time unit is not supported: %s" % unit)
+
+    if column.dtype == np.float64:
+        if np.isnan(column).any():
+            raise Unsupported("time field has nulls")
+        timestamps = column.astype(np.int64).astype("datetime64[ms]")
+    else:
+        timestamps = np.array(
+            [_parse_utc_date(value) for value in column], dtype="datetime64[ms]"
+        )
+
+    numpy_unit = _TIME_UNITS[unit]
+    if numpy_unit == "Q":
+        months = timestamps.astype("datetime64[M]").astype(np.int64)
+        truncated = (months - months % 3).astype("datetime64[M]")
+    else:
+        truncated = timestamps.astype("datetime64[%s]" % numpy_unit)
+    return truncated.astype("datetime64[ms]").astype(np.int64).astype(np.float64)
+
+
+def _parse_utc_date(value: Any) -> Any:
+    """Parses ISO dates the same way as browsers, where the result is utc."""
+    if not isinstance(value, str):
+        raise Unsupported("time values must be numbers or ISO strings")
+    if len(value) == 10:  # "YYYY-MM-DD" is parsed as utc
+        return np.datetime64(value, "ms")
+    if value.endswith("Z"):
+        return np.datetime64(value[:-1], "ms")
+    # date-times without timezone are parsed as local time by browsers
+    raise Unsupported("time values without timezone are parsed as local time")
+
+
+def _title_case(text: str) -> str:
+    return text[:1].upper() + text[1:]
+
+
+def _apply_transforms(
+    transforms: List[dict], columns: Columns, length: int
+) -> Tuple[Columns, int, List[dict]]:
+    """Applies the leading supported transforms, returns the remaining transforms."""
+    for index, transform in enumerate(transforms):
+        keys = set(transform)
+        if keys == {"aggregate", "groupby"} or keys == {"aggregate"}:
+            measures = []
+            for measure in transform["aggregate"]:
+                op, field = measure.get("op"), measure.get("field")
+                if op not in _NUMERIC_OPS | _COUNT_OPS or "as" not in measure:
+                    return columns, length, transforms[index:]
+                measures.append((op, field, measure["as"]))
+            groupby = transform.get("groupby", [])
+            if not all(_is_simple_field(field) for field in groupby):
+                return columns, length, transforms[index:]
+            columns, length = _aggregate(columns, length, groupby, measures)
+        elif keys == {"bin", "field", "as"} and transform["bin"] is not False:
+            names = transform["as"]
+            if isinstance(names, str):
+                names = [names, names + "_end"]
+            column = _numeric(columns, transform["field"], length)
+            starts, ends, _ = _bin(column, transform["bin"], 10)
+            columns = dict(columns, **{names[0]: starts, names[1]: ends})
+        elif keys == {"timeUnit", "field", "as"}:
+            column = columns.get(transform["field"])
+            if column is None:
+                raise Unsupported("missing time field")
+            columns = dict(
+                columns, **{transform["as"]: _time_unit(column, transform["timeUnit"])}
+            )
+        else:
+            return columns, length, transforms[index:]
+    return columns, length, []
+
+
+def _encoding_defs(encoding: dict) -> List[Tuple[str, Optional[int], dict]]:
+    defs = []
+    for channel, value in encoding.items():
+        if isinstance(value, list):
+            defs.extend((channel, index, item) for index, item in enumerate(value))
+        elif isinstance(value, dict):
+            defs.append((channel, None, value))
+        else:
+            raise Unsupported("unsupported encoding: %s" % channel)
+    return defs
+
+
+def _check_field_def(field_def: dict, aggregated: Set[str]) -> Optional[str]:
+    sort = field_def.get("sort")
+    if isinstance(sort, dict) or isinstance(field_def.get("condition"), (dict, list)):
+        raise Unsupported("sort or condition objects are not supported")
+    # e.g. "-y" sorts by the aggregate of the y field over the source rows, which
+    # differs from the pre-aggregated rows when they are grouped by more fields
+    if isinstance(sort, str) and sort.lstrip("-") in aggregated:
+        raise Unsupported("sort by an aggregated channel is not supported: %s" % sort)
+    field = field_def.get("field")
+    if field is not None and not _is_simple_field(field):
+        raise Unsupported("field is not supported: %s" % field)
+    return field
+
+
+def _aggregated_def(field_def: dict) -> Tuple[dict, Tuple[str, Optional[str], str]]:
+    """Returns the field def of a pre-computed aggregate, and the measure."""
+    op, field = field_def["aggregate"], field_def.get("field")
+    if op not in _NUMERIC_OPS | _COUNT_OPS or (field is None and op != "count"):
+        raise Unsupported("aggregate is not supported: %s" % op)
+    name = "__count" if op == "count" else "%s_%s" % (op, field)
+    new_def = {key: value for key, value in field_def.items() if key != "aggregate"}
+    new_def["field"] = name
+    new_def.setdefault(
+        "title",
+        "Count of Records" if op == "count" else "%s of %s" % (_title_case(op), field),
+    )
+    return new_def, (op, field, name)
+
+
+def _binned_def(
+    channel: str,
+    index: Optional[int],
+    encoding: dict,
+    columns: Columns,
+    length: int,
+) -> Tuple[dict, Columns]:
+    """Returns the field def of pre-computed bins, and the bin start/end columns."""
+    field_def = encoding[channel]
+    if channel not in _POSITION_CHANNELS or index is not None:
+        raise Unsupported("bin is only supported for x and y")
+    if channel + "2" in encoding or field_def["bin"] == "binned":
+        raise Unsupported("%s2 is already encoded" % channel)
+    field = field_def["field"]
+    column = _numeric(columns, field, length)
+    starts, ends, step = _bin(column, field_def["bin"], 10)
+    name = "bin_maxbins_10_%s" % field
+    new_def = dict(
+        field_def, field=name, bin={"binned": True, "step": step}, type="quantitative"
+    )
+    new_def.setdefault("title", "%s (binned)" % field)
+    return new_def, {name: starts, name + "_end": ends}
+
+
+def _apply_encoding(
+    encoding: dict, columns: Columns, length: int
+) -> Tuple[dict, Columns, int]:
+    """Pre-computes the aggregated encodings, returns the rewritten encoding."""
+    defs = _encoding_defs(encoding)
+    if not any("aggregate" in field_def for _, _, field_def in defs):
+        raise Unsupported("no aggregated encoding")
+
+    new_encoding = copy.deepcopy(encoding)
+    groupby: List[str] = []
+    measures: List[Tuple[str, Optional[str], str]] = []
+    aggregated = {channel for channel, _, field_def in defs if "aggregate" in field_def}
+
+    for channel, index, field_def in defs:
+        field = _check_field_def(field_def, aggregated)
+        new_def = field_def
+        if "aggregate" in field_def:
+            new_def, measure = _aggregated_def(field_def)
+            measures.append(measure)
+        elif field_def.get("bin") not in (None, False):
+            new_def, bins = _binned_def(channel, index, encoding, columns, length)
+            columns = dict(columns, **bins)
+            groupby.extend(bins)
+            new_encoding[channel + "2"] = {"field": new_def["field"] + "_end"}
+        elif "timeUnit" in field_def:
+            if field not in columns:
+                raise Unsupported("missing time field: %s" % field)
+            # truncated in place - the time unit is kept in the encoding so that
+            # the axis format is unchanged
+            truncated = _time_unit(columns[field], field_def["timeUnit"])
+            columns = dict(columns, **{field: truncated})
+            groupby.append(field)
+        elif field is not None:
+            groupby.append(field)
+
+        if index is None:
+            new_encoding[channel] = new_def
+        else:
+            new_encoding[channel][index] = new_def
+
+    groupby = list(dict.fromkeys(groupby))
+    if {name for _, _, name in measures} & set(groupby):
+        raise Unsupported("aggregated field names collide with groupby fields")
+    columns, length = _aggregate(columns, length, groupby, measures)
+    return new_encoding, columns, length
+
+
+def pushdown(spec: dict) -> dict:
+    """Returns a spec with its aggregate, bin and timeUnit computed in python.
+
+    Args:
+        spec (dict): Vega-Lite spec with inline `data.values`.
+
+    Returns:
+        dict: a new spec with reduced `data.values`, or the same spec if it cannot
+            be reduced without changing the chart.
+    """
+    data = spec.get("data")
+    if (
+        "vega-lite" not in spec.get("$schema", "vega-lite")
+        or not isinstance(data, dict)
+        or set(data) != {"values"}
+        or not isinstance(data["values"], list)
+        or _COMPOSITE_KEYS & set(spec)
+    ):
+        return spec
+
+    try:
+        columns, length = to_columns(data["values"])
+        transforms, encoding = spec.get("transform", []), spec.get("encoding", {})
+        columns, length, transforms = _apply_transforms(transforms, columns, length)
+        if not transforms:
+            try:
+                encoding, columns, length = _apply_encoding(encoding, columns, length)
+            except Unsupported:
+                if "transform" not in spec:
+                    raise
+    except Unsupported:
+        return spec
+
+    if length >= len(data["values"]):
+        return spec
+
+    optimized = dict(spec, data={"values": _to_rows(columns, list(columns), length)})
+    optimized["encoding"] = encoding
+    if transforms:
+        optimized["transform"] = transforms
+    else:
+        optimized.pop("transform", None)
+    return optimized
@@ -0,0 +1,552 @@
+"""Chunked, multiprocess engine to compute vis data from large evaluation sets.
+
+Predictions are read from sharded data sources in bounded chunks. Each worker
+computes partial aggregates (label pair counts for confusion matrices, score
+histograms for ROC and precision-recall curves) which are merged and written as
+the csv artifacts referenced by the `kfx.vis` models.
+
+::
+
+    import kfx.dsl
+    import kfx.vis.evaluation
+
+    engine = kfx.vis.evaluation.EvaluationEngine(workers=8, memory_per_worker="512Mi")
+
+    # each shard is a parquet file with the columns "target" and "score"
+    shards = ["eval/part-0000.parquet", "eval/part-0001.parquet"]
+
+    roc = engine.roc(shards, dst=roc_path, source=kfx.dsl.KfpArtifact("roc_path"))
+    kfx.vis.kfp_ui_metadata([roc]).write_to(mlpipeline_ui_metadata)
+
+A shard is either a path to a `.parquet`, `.feather` or `.arrow` file (or a
+directory of parquet files), a path to a `.npy` file with a structured dtype, or a
+tuple of paths to `.npy` files (one per column, in the order of the column
+arguments). Shards can also be in-memory data - a numpy array or `np.memmap`, a
+tuple or dict of arrays, or a `pyarrow.Table`, `pyarrow.RecordBatch` or
+`pyarrow.dataset.Dataset`. Only path shards are sent to the worker processes,
+in-memory shards are read in the calling process one chunk at a time.
+
+The `shards` argument is either a single path, array, dict of arrays or arrow
+object, or any iterable (list, tuple, generator) of shards. A tuple of per-column
+arrays or files is therefore only a shard inside an iterable of shards, e.g.
+`[("targets.npy", "scores.npy")]`.
+
+::
+
+    # a 20 GB eval file read with a bounded amount of memory
+    predictions = np.load("predictions.npy", mmap_mode="r")
+    engine = kfx.vis.evaluation.EvaluationEngine(memory_per_worker="256Mi")
+    engine.confusion_matrix(predictions, dst=cm_path)
+"""
+import csv
+import functools
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+
+from kfx.vis._helpers import artifact_dst, confusion_matrix, record_artifact, roc, table
+from kfx.vis._sources import (
+    Source,
+    is_arrow_source,
+    is_path_source,
+    is_single_source,
+    iter_chunks,
+    source_columns,
+    source_length,
+    split_arrow_source,
+)
+from kfx.vis.models import ConfusionMatrix, Roc, Table, WebApp
+
+# rough number of bytes held in memory per value read, including temporaries
+BYTES_PER_VALUE = 32
+# number of chunks of a `.npy` shard processed by a single task
+CHUNKS_PER_TASK = 8
+# header row of the precision-recall csv, read by the Vega web app
+PRECISION_RECALL_HEADER = ("precision", "recall", "threshold")
+
+_UNITS = {
+    "": 1,
+    "k": 10**3,
+    "m": 10**6,
+    "g": 10**9,
+    "ki": 2**10,
+    "mi": 2**20,
+    "gi": 2**30,
+}
+
+Task = Tuple[Source, int, Optional[int]]
+Histograms = Tuple[Any, Any]
+Shards = Union[Source, Iterable[Source]]
+
+
+def parse_bytes(value: Union[int, str]) -> int:
+    """Returns the number of bytes from an int or a k8s style quantity, e.g. "512Mi".
+
+    Args:
+        value (Union[int, str]): number of bytes, or a quantity with the suffix
+            K, M, G, Ki, Mi or Gi.
+
+    Returns:
+        int: number of bytes.
+    """
+    if isinstance(value, int):
+        return value
+    match = re.match(r"^\s*(\d+(?:\.\d+)?)\s*([kKmMgG]i?)?\s*$", value)
+    if not match:
+        raise ValueError("invalid memory quantity: %s" % value)
+    number, unit = match.groups()
+    return int(float(number) * _UNITS[(unit or "").lower()])
+
+
+def _write_rows(rows: Iterable[Sequence[Any]], dst: Any, source: Any = None):
+    """Writes rows as a csv without header, and records the source artifact."""
+    dst = artifact_dst(dst)
+    if hasattr(dst, "write"):
+        csv.writer(dst).writerows(rows)
+    else:
+        with open(str(dst), "w", newline="") as fileout:
+            csv.writer(fileout).writerows(rows)
+    record_artifact(source, dst)
+
+
+def _artifact_source(source: Any, dst: Any) -> Any:
+    """Returns the source of the artifact for the kfp ui - dst if it is a path."""
+    if source is not None:
+        return source
+    if hasattr(dst, "write"):
+        raise ValueError("source must be provided if dst is a File-like object")
+    return dst
+
+
+def _to_python(value: Any) -> Any:
+    """Returns a python scalar from a numpy scalar."""
+    return value.item() if hasattr(value, "item") else value
+
+
+def _confusion_partial(
+    task: Task, columns: Sequence[str], chunk_rows: int
+) -> Dict[Tuple[Any, Any], int]:
+    counts: Dict[Tuple[Any, Any], int] = Counter()
+    for targets, predicted in iter_chunks(*_task_args(task, columns, chunk_rows)):
+        target_values, target_codes = np.unique(targets, return_inverse=True)
+        predicted_values, predicted_codes = np.unique(predicted, return_inverse=True)
+        width = len(predicted_values)
+        pair_counts = np.bincount(
+            target_codes.ravel() * width + predicted_codes.ravel(),
+            minlength=len(target_values) * width,
+        )
+        for index in np.flatnonzero(pair_counts):
+            pair = (
+                _to_python(target_values[index // width]),
+                _to_python(predicted_values[index % width]),
+            )
+            counts[pair] += int(pair_counts[index])
+    return counts
+
+
+def _histogram_partial(  # pylint: disable=too-many-arguments
+    task: Task,
+    columns: Sequence[str],
+    chunk_rows: int,
+    pos_label: Any,
+    bins: int,
+    score_range: Tuple[float, float],
+) -> Histograms:
+    low, high = score_range
+    positives = np.zeros(bins, dtype=np.int64)
+    negatives = np.zeros(bins, dtype=np.int64)
+    for targets, scores in iter_chunks(*_task_args(task, columns, chunk_rows)):
+        scores = np.asarray(scores, dtype=np.float64)
+        # NaN scores have no bin, and infinite scores go to the first or last bin
+        is_scored = ~np.isnan(scores)
+        scores = np.clip(scores[is_scored], low, high)
+        indices = np.floor((scores - low) / (high - low) * bins)
+        indices = np.clip(indices, 0, bins - 1).astype(np.int64)
+        is_positive = np.asarray(targets)[is_scored] == pos_label
+        positives += np.bincount(indices[is_positive], minlength=bins)
+        negatives += np.bincount(indices[~is_positive], minlength=bins)
+    return positives, negatives
+
+
+def _shard_list(shards: Shards) -> List[Source]:
+    """Returns the shards as a list - a single data source is a single shard."""
+    return [shards] if is_single_source(shards) else list(shards)
+
+
+def _task_args(task: Task, columns: Sequence[str], chunk_rows: int) -> tuple:
+    source, start, stop = task
+    return source, columns, chunk_rows, start, stop
+
+
+class EvaluationEngine:
+    """Computes confusion matrix, ROC and precision-recall data across a process pool."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        memory_per_worker: Union[int, str] = "256Mi",
+        chunk_rows: Optional[int] = None,
+    ):
+        """Creates a new instance of EvaluationEngine object.
+
+        Args:
+            workers (Optional[int], optional): number of worker processes.
+                Computes in the current process if 1. Defaults to the number of cpus.
+            memory_per_worker (Union[int, str], optional): approximate memory budget
+                per worker, in bytes or as a k8s style quantity. Determines the
+                number of rows read per chunk. Defaults to "256Mi".
+            chunk_rows (Optional[int], optional): number of rows read per chunk.
+                Overrides memory_per_worker if provided. Defaults to None.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.memory_per_worker = parse_bytes(memory_per_worker)
+        self.chunk_rows = chunk_rows
+
+    def _chunk_rows(self, columns: Sequence[str]) -> int:
+        if self.chunk_rows:
+            return self.chunk_rows
+        return max(1, self.memory_per_worker // (BYTES_PER_VALUE * len(columns)))
+
+    def _plan(
+        self, shards: Shards, columns: Sequence[str], chunk_rows: int
+    ) -> Iterator[Task]:
+        """Splits path shards into tasks, so a large shard is also processed in
+        parallel - `.npy` shards into row ranges, arrow IPC and parquet files into
+        record batches or row groups. In-memory shards are read by a single task."""
+        task_rows = chunk_rows * CHUNKS_PER_TASK
+        for shard in _shard_list(shards):
+            if not is_path_source(shard):
+                yield shard, 0, None
+                continue
+            if is_arrow_source(shard):
+                yield from split_arrow_source(shard)
+                continue
+            for start in range(0, source_length(shard, columns), task_rows):
+                yield shard, start, start + task_rows
+
+    def _map(
+        self, func: Callable, shards: Shards, columns: Sequence[str]
+    ) -> Iterator[Any]:
+        chunk_rows = self._chunk_rows(columns)
+        tasks = list(self._plan(shards, columns, chunk_rows))
+        partial_func = functools.partial(func, columns=columns, chunk_rows=chunk_rows)
+
+        remote_tasks = [task for task in tasks if is_path_source(task[0])]
+        if self.workers == 1 or len(remote_tasks) <= 1:
+            yield from map(partial_func, tasks)
+            return
+
+        # in-memory shards would be pickled as a whole - read them in this process
+        local_tasks = [task for task in tasks if not is_path_source(task[0])]
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(remote_tasks))
+        ) as executor:
+            results = executor.map(partial_func, remote_tasks)
+            yield from map(partial_func, local_tasks)
+            yield from results
+
+    def table(
+        self,
+        shards: Shards,
+        dst: Any,
+        source: Any = None,
+        columns: Optional[List[str]] = None,
+        header: Optional[List[str]] = None,
+    ) -> Table:
+        """Writes the columns of the data sources as a csv artifact for the table viewer.
+
+        The rows are written in order, one chunk at a time.
+
+        Args:
+            shards (Shards): a data source or an iterable of data sources.
+            dst (Any): Path, File-like object or `KfpArtifact` to write the csv to.
+            source (Any, optional): Full path to the artifact for the kfp ui, e.g.
+                a `KfpArtifact`, which is recorded in the artifact catalog of the
+                task. Defaults to dst, and required if dst is a File-like object.
+            columns (Optional[List[str]], optional): Columns to write. Defaults to
+                all the columns of the first data source.
+            header (Optional[List[str]], optional): Headers for the table. Defaults
+                to the columns.
+
+        Returns:
+            Table: pydantic data object.
+        """
+        source = _artifact_source(source, dst)
+        shard_list = _shard_list(shards)
+        columns = list(columns or source_columns(shard_list[0]))
+        chunk_rows = self._chunk_rows(columns)
+
+        def iter_rows() -> Iterator[Tuple[Any, ...]]:
+            for shard in shard_list:
+                for chunk in iter_chunks(shard, columns, chunk_rows):
+                    yield from zip(*(column.tolist() for column in chunk))
+
+        _write_rows(iter_rows(), dst, source)
+        return table(source, header=header or columns)
+
+    def confusion_counts(
+        self,
+        shards: Shards,
+        target_col: str = "target",
+        predicted_col: str = "predicted",
+    ) -> Dict[Tuple[Any, Any], int]:
+        """Returns the number of rows for each (target, predicted) pair.
+
+        Args:
+            shards (Shards): a data source or an iterable of data sources.
+            target_col (str, optional): Name of the target column. Defaults to "target".
+            predicted_col (str, optional): Name of the predicted column.
+                Defaults to "predicted".
+
+        Returns:
+            Dict[Tuple[Any, Any], int]: counts for each pair.
+        """
+        counts: Dict[Tuple[Any, Any], int] = Counter()
+        for partial in self._map(
+            _confusion_partial, shards, (target_col, predicted_col)
+        ):
+            counts.update(partial)
+        return counts
+
+    def score_histograms(  # pylint: disable=too-many-arguments
+        self,
+        shards: Shards,
+        target_col: str = "target",
+        score_col: str = "score",
+        pos_label: Any = 1,
+        bins: int = 1000,
+        score_range: Tuple[float, float] = (0.0, 1.0),
+    ) -> Histograms:
+        """Returns the histograms of the scores of the positive and negative rows.
+
+        Args:
+            shards (Shards): a data source or an iterable of data sources.
+            target_col (str, optional): Name of the target column. Defaults to "target".
+            score_col (str, optional): Name of the score column. Defaults to "score".
+            pos_label (Any, optional): Target value of the positive class. Defaults to 1.
+            bins (int, optional): Number of equal-width bins. Defaults to 1000.
+            score_range (Tuple[float, float], optional): Range of the scores.
+                Scores outside the range (including infinite scores) are counted
+                in the first or last bin, and NaN scores are not counted.
+                Defaults to (0.0, 1.0).
+
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray]: counts of positives and negatives
+                for each bin.
+        """
+        positives = np.zeros(bins, dtype=np.int64)
+        negatives = np.zeros(bins, dtype=np.int64)
+        func = functools.partial(
+            _histogram_partial,
+            pos_label=pos_label,
+            bins=bins,
+            score_range=tuple(score_range),
+        )
+        for partial_positives, partial_negatives in self._map(
+            func, shards, (target_col, score_col)
+        ):
+            positives += partial_positives
+            negatives += partial_negatives
+        return positives, negatives
+
+    def confusion_matrix(  # pylint: disable=too-many-arguments
+        self,
+        shards: Shards,
+        dst: Any,
+        source: Any = None,
+        labels: Optional[List[str]] = None,
+        target_col: str = "target",
+        predicted_col: str = "predicted",
+    ) -> ConfusionMatrix:
+        """Writes the confusion matrix csv artifact (target, predicted, count).
+
+        Args:
+            shards (Shards): a data source or an iterable of data sources.
+            dst (Any): Path, File-like object or `KfpArtifact` to write the csv to.
+            source (Any, optional): Full path to the artifact for the kfp ui, e.g.
+                a `KfpArtifact`, which is recorded in the artifact catalog of the
+                task. Defaults to dst, and required if dst is a File-like object.
+            labels (Optional[List[str]], optional): Names of the classes. Defaults
+                to the sorted target and predicted values.
+            target_col (str, optional): Name of the target column. Defaults to "target".
+            predicted_col (str, optional): Name of the predicted column.
+                Defaults to "predicted".
+
+        Returns:
+            ConfusionMatrix: pydantic data object.
+        """
+        source = _artifact_source(source, dst)
+        counts: Dict[Tuple[str, str], int] = Counter()
+        for (target, predicted), count in self.confusion_counts(
+            shards, target_col, predicted_col
+        ).items():
+            counts[(str(target), str(predicted))] += count
+
+        if labels is None:
+            labels = sorted({label for pair in counts for label in pair})
+        labels = [str(label) for label in labels]
+
+        _write_rows(
+            (
+                (target, predicted, counts.get((target, predicted), 0))
+                for target in labels
+                for predicted in labels
+            ),
+            dst,
+            source,
+        )
+        return confusion_matrix(source, labels=labels)
+
+    def _curve(  # pylint: disable=too-many-arguments
+        self,
+        shards: Shards,
+        target_col: str,
+        score_col: str,
+        pos_label: Any,
+        bins: int,
+        score_range: Tuple[float, float],
+    ) -> Tuple[Any, Any, Any]:
+        """Returns true positives, false positives and thresholds, for decreasing
+        thresholds where either count changes."""
+        positives, negatives = self.score_histograms(
+            shards, target_col, score_col, pos_label, bins, score_range
+        )
+        thresholds = np.linspace(score_range[0], score_range[1], bins + 1)[:-1]
+        true_positives = np.cumsum(positives[::-1])
+        false_positives = np.cumsum(negatives[::-1])
+        changed = (positives[::-1] + negatives[::-1]) > 0
+        return (
+            true_positives[changed],
+            false_positives[changed],
+            thresholds[::-1][changed],
+        )
+
+    def roc(  # pylint: disable=too-many-arguments
+        self,
+        shards: Shards,
+        dst: Any,
+        source: Any = None,
+        target_col: str = "target",
+        score_col: str = "score",
+        pos_label: Any = 1,
+        bins: int = 1000,
+        score_range: Tuple[float, float] = (0.0, 1.0),
+    ) -> Roc:
+        """Writes the ROC curve csv artifact (fpr, tpr, thresholds).
+
+        The thresholds are the lower edges of equal-width score bins.
+
+        Args:
+            shards (Shards): a data source or an iterable of data sources.
+            dst (Any): Path, File-like object or `KfpArtifact` to write the csv to.
+            source (Any, optional): Full path to the artifact for the kfp ui, e.g.
+                a `KfpArtifact`, which is recorded in the artifact catalog of the
+                task. Defaults to dst, and required if dst is a File-like object.
+            target_col (str, optional): Name of the target column. Defaults to "target".
+            score_col (str, optional): Name of the score column. Defaults to "score".
+            pos_label (Any, optional): Target value of the positive class. Defaults to 1.
+            bins (int, optional): Number of equal-width bins. Defaults to 1000.
+            score_range (Tuple[float, float], optional): Range of the scores.
+                Defaults to (0.0, 1.0).
+
+        Returns:
+            Roc: pydantic data object.
+        """
+        source = _artifact_source(source, dst)
+        true_positives, false_positives, thresholds = self._curve(
+            shards, target_col, score_col, pos_label, bins, score_range
+        )
+        tpr = true_positives / max(true_positives[-1:].sum(), 1)
+        fpr = false_positives / max(false_positives[-1:].sum(), 1)
+
+        _write_rows(
+            [(0.0, 0.0, float(score_range[1]))]
+            + list(zip(fpr.tolist(), tpr.tolist(), thresholds.tolist())),
+            dst,
+            source,
+        )
+        return roc(source)
+
+    def precision_recall(  # pylint: disable=too-many-arguments
+        self,
+        shards: Shards,
+        dst: Any,
+        source: Any = None,
+        target_col: str = "target",
+        score_col: str = "score",
+        pos_label: Any = 1,
+        bins: int = 1000,
+        score_range: Tuple[float, float] = (0.0, 1.0),
+        title: str = "Precision-Recall curve",
+    ) -> WebApp:
+        """Writes the precision-recall curve csv artifact (precision, recall, thresholds).
+
+        The kfp ui has no precision-recall viewer, so the curve is returned as a
+        Vega-Lite line chart web app, which loads the csv artifact from `source` -
+        i.e. the data is not inlined in the ui metadata. The csv has a header row,
+        as Vega reads the field names from it.
+
+        Args:
+            shards (Shards): a data source or an iterable of data sources.
+            dst (Any): Path, File-like object or `KfpArtifact` to write the csv to.
+            source (Any, optional): Url of the artifact for the web app, e.g. a
+                `KfpArtifact` (loaded through the kfp ui api), which is recorded in
+                the artifact catalog of the task. Defaults to dst, and required if
+                dst is a File-like object.
+            target_col (str, optional): Name of the target column. Defaults to "target".
+            score_col (str, optional): Name of the score column. Defaults to "score".
+            pos_label (Any, optional): Target value of the positive class. Defaults to 1.
+            bins (int, optional): Number of equal-width bins. Defaults to 1000.
+            score_range (Tuple[float, float], optional): Range of the scores.
+                Defaults to (0.0, 1.0).
+            title (str, optional): Title of the chart.
+                Defaults to "Precision-Recall curve".
+
+        Returns:
+            WebApp: pydantic data object describing a Vega-Lite web app.
+        """
+        from kfx.vis.vega import vega_web_app  # pylint: disable=import-outside-toplevel
+
+        source = _artifact_source(source, dst)
+        true_positives, false_positives, thresholds = self._curve(
+            shards, target_col, score_col, pos_label, bins, score_range
+        )
+        precision = true_positives / np.maximum(true_positives + false_positives, 1)
+        recall = true_positives / max(true_positives[-1:].sum(), 1)
+        rows = list(zip(precision.tolist(), recall.tolist(), thresholds.tolist()))
+        _write_rows([PRECISION_RECALL_HEADER] + rows, dst, source)
+
+        return vega_web_app(
+            {
+                "$schema": "https://vega.github.io/schema/vega-lite/v4.json",
+                "title": title,
+                "data": {
+                    "url": source,
+                    "format": {
+                        "type": "csv",
+                        "parse": {name: "number" for name in PRECISION_RECALL_HEADER},
+                    },
+                },
+                "mark": "line",
+                "encoding": {
+                    "x": {"field": "recall", "type": "quantitative"},
+                    "y": {"field": "precision", "type": "quantitative"},
+                    "tooltip": [{"field": "threshold", "type": "quantitative"}],
+                },
+            }
+        )
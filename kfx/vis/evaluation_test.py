@@ -0,0 +1,226 @@
+"""Tests for kfx.vis.evaluation."""
+import io
+from collections import Counter
+
+import numpy as np
+import pyarrow
+import pyarrow.feather
+import pyarrow.parquet
+import pytest
+
+import kfx.vis._helpers as kfxvis
+from kfx.vis.evaluation import EvaluationEngine, parse_bytes
+
+
+@pytest.fixture
+def npy_shards(tmp_path):
+    rng = np.random.RandomState(0)
+    shards = []
+    for index in range(3):
+        targets = rng.randint(0, 2, size=1000)
+        scores = np.round(rng.rand(1000), 1)
+        targets_path = str(tmp_path / ("targets-%s.npy" % index))
+        scores_path = str(tmp_path / ("scores-%s.npy" % index))
+        np.save(targets_path, targets)
+        np.save(scores_path, scores)
+        shards.append((targets_path, scores_path))
+    return shards
+
+
+def _load(shards):
+    targets = np.concatenate([np.load(shard[0]) for shard in shards])
+    scores = np.concatenate([np.load(shard[1]) for shard in shards])
+    return targets, scores
+
+
+def test_parse_bytes():
+    assert parse_bytes(1024) == 1024
+    assert parse_bytes("512Mi") == 512 * 2**20
+    assert parse_bytes("2G") == 2 * 10**9
+    with pytest.raises(ValueError):
+        parse_bytes("lots")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_confusion_matrix_npy_shards(npy_shards, workers):
+    engine = EvaluationEngine(workers=workers, chunk_rows=128)
+    targets, scores = _load(npy_shards)
+    predicted = (scores >= 0.5).astype(int)
+    expected = Counter(zip(targets.tolist(), predicted.tolist()))
+
+    # structured .npy file
+    structured = np.zeros(len(targets), dtype=[("target", "i8"), ("predicted", "i8")])
+    structured["target"] = targets
+    structured["predicted"] = predicted
+    path = npy_shards[0][0].replace("targets-0", "structured")
+    np.save(path, structured)
+
+    assert engine.confusion_counts([path]) == expected
+
+    fileout = io.StringIO()
+    data = engine.confusion_matrix([path], dst=fileout, source="gs://bucket/cm.csv")
+    assert kfxvis.asdict(data)["labels"] == ["0", "1"]
+    assert fileout.getvalue().splitlines() == [
+        "0,0,%s" % expected[(0, 0)],
+        "0,1,%s" % expected[(0, 1)],
+        "1,0,%s" % expected[(1, 0)],
+        "1,1,%s" % expected[(1, 1)],
+    ]
+
+
+def test_confusion_matrix_parquet_shards(tmp_path):
+    shards = []
+    for index, (targets, predicted) in enumerate(
+        [(["cat", "dog", "dog"], ["cat", "cat", "dog"]), (["bird"], ["dog"])]
+    ):
+        path = str(tmp_path / ("part-%s.parquet" % index))
+        pyarrow.parquet.write_table(
+            pyarrow.table({"label": targets, "prediction": predicted}), path
+        )
+        shards.append(path)
+
+    engine = EvaluationEngine(workers=2, chunk_rows=2)
+    dst = tmp_path / "cm.csv"
+    data = engine.confusion_matrix(
+        shards, dst=str(dst), target_col="label", predicted_col="prediction"
+    )
+    assert data.source == str(dst)
+    assert data.labels == ["bird", "cat", "dog"]
+    assert "dog,cat,1" in dst.read_text().splitlines()
+    assert "bird,dog,1" in dst.read_text().splitlines()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_roc_and_precision_recall(npy_shards, workers):
+    engine = EvaluationEngine(workers=workers, memory_per_worker="4Ki")
+    targets, scores = _load(npy_shards)
+    positives, negatives = (targets == 1).sum(), (targets == 0).sum()
+
+    fileout = io.StringIO()
+    data = engine.roc(npy_shards, dst=fileout, source="gs://bucket/roc.csv", bins=10)
+    assert kfxvis.asdict(data)["type"] == "roc"
+
+    rows = [list(map(float, line.split(","))) for line in fileout.getvalue().split()]
+    assert rows[0] == [0.0, 0.0, 1.0]
+    assert rows[-1][:2] == [1.0, 1.0]
+    for fpr, tpr, threshold in rows[1:]:
+        predicted = scores >= threshold - 1e-9
+        assert fpr == pytest.approx((predicted & (targets == 0)).sum() / negatives)
+        assert tpr == pytest.approx((predicted & (targets == 1)).sum() / positives)
+
+    fileout = io.StringIO()
+    app = engine.precision_recall(
+        npy_shards, dst=fileout, source="gs://bucket/pr.csv", bins=10
+    )
+    assert app.storage == "inline"
+    assert "gs://bucket/pr.csv" in app.source
+    assert '"values"' not in app.source
+    lines = fileout.getvalue().split()
+    assert lines[0] == "precision,recall,threshold"
+    precision, recall, threshold = map(float, lines[-1].split(","))
+    assert threshold == 0.0
+    assert recall == 1.0
+    assert precision == pytest.approx(positives / len(targets))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_in_memory_shards(npy_shards, workers):
+    engine = EvaluationEngine(workers=workers, chunk_rows=100)
+    targets, scores = _load(npy_shards)
+    expected = engine.score_histograms(npy_shards, bins=10)
+
+    memmaps = [
+        tuple(np.load(path, mmap_mode="r") for path in shard) for shard in npy_shards
+    ]
+    arrow_table = pyarrow.table({"target": targets, "score": scores})
+
+    for shards in [memmaps, arrow_table, [npy_shards[0], memmaps[1], npy_shards[2]]]:
+        positives, negatives = engine.score_histograms(shards, bins=10)
+        np.testing.assert_array_equal(positives, expected[0])
+        np.testing.assert_array_equal(negatives, expected[1])
+
+
+def test_table(tmp_path):
+    engine = EvaluationEngine(chunk_rows=2)
+    path = str(tmp_path / "data.feather")
+    pyarrow.feather.write_feather(
+        pyarrow.table({"name": ["a", "b", "c"], "value": [1.5, 2.0, 3.0]}), path
+    )
+
+    fileout = io.StringIO()
+    data = engine.table(
+        [path, {"name": np.array(["d"]), "value": np.array([4.0])}],
+        dst=fileout,
+        source="gs://bucket/table.csv",
+    )
+    assert kfxvis.asdict(data) == {
+        "type": "table",
+        "format": "csv",
+        "header": ["name", "value"],
+        "source": "gs://bucket/table.csv",
+    }
+    assert fileout.getvalue().splitlines() == ["a,1.5", "b,2.0", "c,3.0", "d,4.0"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_iterable_shards(tmp_path, workers):
+    engine = EvaluationEngine(workers=workers, chunk_rows=4)
+    structured = np.zeros(10, dtype=[("target", "i8"), ("predicted", "i8")])
+    paths = []
+    for index in range(2):
+        path = str(tmp_path / ("part-%s.npy" % index))
+        np.save(path, structured)
+        paths.append(path)
+
+    expected = Counter({(0, 0): 20})
+    assert engine.confusion_counts(tuple(paths)) == expected
+    assert engine.confusion_counts(path for path in paths) == expected
+    assert engine.confusion_counts(iter([structured, paths[1]])) == expected
+    assert engine.confusion_counts(paths[0]) == Counter({(0, 0): 10})
+
+
+def test_plan_splits_arrow_files(tmp_path):
+    arrow_table = pyarrow.table({"target": np.arange(10) % 2, "score": np.ones(10)})
+    parquet_path = str(tmp_path / "data.parquet")
+    pyarrow.parquet.write_table(arrow_table, parquet_path, row_group_size=4)
+    feather_path = str(tmp_path / "data.feather")
+    pyarrow.feather.write_feather(arrow_table, feather_path, chunksize=5)
+
+    engine = EvaluationEngine(workers=2, chunk_rows=2)
+    tasks = list(engine._plan([parquet_path, feather_path], ["target", "score"], 2))
+    assert tasks == [
+        (parquet_path, 0, 1),
+        (parquet_path, 1, 2),
+        (parquet_path, 2, 3),
+        (feather_path, 0, 1),
+        (feather_path, 1, 2),
+    ]
+    positives, negatives = engine.score_histograms([parquet_path, feather_path], bins=2)
+    assert positives.tolist() == [0, 10] and negatives.tolist() == [0, 10]
+
+
+def test_non_finite_scores():
+    engine = EvaluationEngine(workers=1, chunk_rows=3)
+    data = {
+        "target": np.array([1, 0, 1, 0, 1]),
+        "score": np.array([np.nan, 0.2, np.inf, -np.inf, 0.9]),
+    }
+
+    positives, negatives = engine.score_histograms(data, bins=2)
+    assert positives.tolist() == [0, 2]
+    assert negatives.tolist() == [2, 0]
+
+
+def test_file_dst_requires_source():
+    engine = EvaluationEngine(workers=1)
+    data = {"target": np.array([1, 0]), "predicted": np.array([1, 1])}
+
+    with pytest.raises(ValueError):
+        engine.confusion_matrix(data, dst=io.StringIO())
+    with pytest.raises(ValueError):
+        engine.table(data, dst=io.StringIO())
+    with pytest.raises(ValueError):
+        engine.precision_recall(
+            {"target": np.array([1, 0]), "score": np.array([0.9, 0.2])},
+            dst=io.StringIO(),
+        )
@@ -1,19 +1,301 @@
 """Functions to help generate Vega or Vega-Lite spec as web-app in kubeflow pipeline UI."""
+import base64
+import gzip
+import hashlib
+import html
+import io
 import json
 import urllib.parse
-from typing import Any
+from typing import Any, BinaryIO, Dict, List, Mapping, Optional, Sequence, Union
 
 import kfx.dsl
 import kfx.vis.models
-from kfx.vis._helpers import web_app
+from kfx.vis._helpers import artifact_dst, record_artifact, web_app
 
+DATA_ENCODINGS = ("json", "columns", "gzip")
 
-def _vega_embed_html(
+# decodes each shared dataset once - as rows, columns or gzip + base64 columns - and
+# puts a new copy of the rows into each spec (vega adds ids to the row objects)
+_DECODE_SHIM = """
+  function kfxRows(dataset, values) {
+    if (dataset.encoding === "rows") {
+      return values.map(function(row) { return Object.assign({}, row); });
+    }
+    var names = Object.keys(values);
+    var length = names.length ? values[names[0]].length : 0;
+    var rows = new Array(length);
+    for (var i = 0; i < length; i++) {
+      var row = {};
+      for (var j = 0; j < names.length; j++) row[names[j]] = values[names[j]][i];
+      rows[i] = row;
+    }
+    return rows;
+  }
+  var kfxDecoded = {};
+  function kfxDecode(datasets, id) {
+    var dataset = datasets[id];
+    if (!(id in kfxDecoded)) {
+      if (dataset.encoding !== "gzip") {
+        kfxDecoded[id] = Promise.resolve(dataset.data);
+      } else {
+        var bytes = Uint8Array.from(atob(dataset.data), function(c) { return c.charCodeAt(0); });
+        var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("gzip"));
+        kfxDecoded[id] = new Response(stream).text().then(JSON.parse);
+      }
+    }
+    return kfxDecoded[id].then(function(values) { return kfxRows(dataset, values); });
+  }
+  function kfxInflate(target, data, datasets) {
+    return Promise.all(data.map(function(item) {
+      return kfxDecode(datasets, item.dataset).then(function(rows) {
+        var obj = target;
+        for (var i = 0; i < item.path.length - 1; i++) obj = obj[item.path[i]];
+        obj[item.path[item.path.length - 1]] = rows;
+      });
+    })).then(function() { return target; });
+  }
+"""
+
+
+# reads arrow data with the `Arrow` global of the apache-arrow UMD build, i.e.
+# `Table.from` (apache-arrow < 9) or `tableFromIPC` (apache-arrow >= 9)
+_REGISTER_ARROW = """
+  if (!vega.formats("arrow")) {
+    var kfxReadArrow = function(data) {
+      var bytes = new Uint8Array(data);
+      var table = Arrow.tableFromIPC
+        ? Arrow.tableFromIPC(bytes) : Arrow.Table.from(bytes);
+      var names = table.schema.fields.map(function(field) { return field.name; });
+      var columns = names.map(function(name, i) { return table.getChildAt(i); });
+      var numRows = table.numRows !== undefined ? table.numRows : table.length;
+      var rows = new Array(numRows);
+      for (var r = 0; r < numRows; r++) {
+        var row = {};
+        for (var c = 0; c < names.length; c++) {
+          var value = columns[c].get(r);
+          row[names[c]] = typeof value === "bigint" ? Number(value) : value;
+        }
+        rows[r] = row;
+      }
+      return rows;
+    };
+    kfxReadArrow.responseType = "arrayBuffer";
+    vega.formats("arrow", kfxReadArrow);
+  }"""
+
+
+def _is_rows(values: Any) -> bool:
+    return (
+        isinstance(values, list)
+        and bool(values)
+        and all(isinstance(row, dict) for row in values)
+    )
+
+
+def _gzip(payload: bytes) -> bytes:
+    buffer = io.BytesIO()
+    # fixed mtime, so that the same data always gives the same html
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as fileout:
+        fileout.write(payload)
+    return buffer.getvalue()
+
+
+def _encode_rows(rows: List[dict], data_encoding: str) -> Dict[str, Any]:
+    """Returns the rows as is ("json"), or as columns, optionally gzip compressed."""
+    if data_encoding == "json":
+        return {"encoding": "rows", "data": rows}
+    names: Dict[str, None] = {}
+    for row in rows:
+        names.update(dict.fromkeys(row))
+    columns = {name: [row.get(name) for row in rows] for name in names}
+    if data_encoding == "gzip":
+        payload = json.dumps(columns, separators=(",", ":")).encode("utf-8")
+        return {
+            "encoding": "gzip",
+            "data": base64.b64encode(_gzip(payload)).decode("ascii"),
+        }
+    return {"encoding": "columns", "data": columns}
+
+
+def _encode_inline_data(  # pylint: disable=too-many-arguments
+    obj: Any,
+    data_encoding: str,
+    path: List[Union[str, int]],
+    encoded: List[dict],
+    datasets: Dict[str, dict],
+    in_data: bool = False,
+) -> Any:
+    """Replaces the inline data in a spec with empty lists.
+
+    The path to put the data back in the spec, and the id of the dataset, are added
+    to `encoded`. Identical data are only added once to `datasets`. Inline data are
+    the `values` of `data` (a dict for Vega-Lite or a list for Vega), and the
+    Vega-Lite `datasets`.
+    """
+    if isinstance(obj, list):
+        return [
+            _encode_inline_data(
+                item, data_encoding, path + [index], encoded, datasets, in_data
+            )
+            for index, item in enumerate(obj)
+        ]
+    if not isinstance(obj, dict):
+        return obj
+
+    result = {}
+    for key, value in obj.items():
+        if (in_data and key == "values" and _is_rows(value)) or (
+            path[-1:] == ["datasets"] and _is_rows(value)
+        ):
+            dumped = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+            dataset = hashlib.sha1(dumped).hexdigest()[:16]
+            if dataset not in datasets:
+                datasets[dataset] = _encode_rows(value, data_encoding)
+            encoded.append({"path": path + [key], "dataset": dataset})
+            result[key] = []
+        else:
+            result[key] = _encode_inline_data(
+                value, data_encoding, path + [key], encoded, datasets, key == "data"
+            )
+    return result
+
+
+def _check_data_encoding(data_encoding: str):
+    if data_encoding not in DATA_ENCODINGS:
+        raise ValueError(
+            "data_encoding must be one of %s: %s" % (DATA_ENCODINGS, data_encoding)
+        )
+
+
+# UMD build of apache-arrow, which defines the `Arrow` global
+ARROW_SCRIPTS = ["https://cdn.jsdelivr.net/npm/apache-arrow@4/Arrow.es2015.min.js"]
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow  # pylint: disable=import-outside-toplevel
+        import pyarrow.ipc  # pylint: disable=import-outside-toplevel
+    except ImportError as error:  # pragma: no cover
+        raise ImportError(
+            "`pyarrow` is required to write arrow data: pip install pyarrow"
+        ) from error
+    return pyarrow
+
+
+def _to_arrow_table(data: Any) -> Any:
+    pyarrow = _import_pyarrow()
+    if isinstance(data, pyarrow.Table):
+        return data
+    if isinstance(data, pyarrow.RecordBatch):
+        return pyarrow.Table.from_batches([data])
+    if isinstance(data, dict):
+        return pyarrow.table(data)
+    if isinstance(data, list):
+        names: Dict[str, None] = {}
+        for row in data:
+            names.update(dict.fromkeys(row))
+        return pyarrow.table({name: [row.get(name) for row in data] for name in names})
+    if getattr(getattr(data, "dtype", None), "names", None):
+        # numpy structured array
+        return pyarrow.table({name: data[name] for name in data.dtype.names})
+    raise TypeError("unsupported data for arrow: %s" % type(data))
+
+
+def write_arrow(data: Any, dst: Union[str, BinaryIO, kfx.dsl.KfpArtifact]):
+    """Writes the data as an Apache Arrow IPC file, to be used as Vega data.
+
+    Arrow is faster for the browser to parse, and smaller than csv or json. The
+    buffers are not compressed, as the javascript arrow reader cannot decompress
+    them. Requires `pyarrow`.
+
+    ::
+
+        @kfp.components.func_to_container_op
+        def vega_op(
+            mlpipeline_ui_metadata: OutputTextFile(str), vega_data: OutputBinaryFile(bytes)
+        ):
+            import kfx.dsl
+            import kfx.vis
+            import kfx.vis.vega
+
+            kfx.vis.vega.write_arrow({"a": ["A", "B"], "b": [28, 55]}, vega_data)
+            spec = {
+                "$schema": "https://vega.github.io/schema/vega-lite/v4.json",
+                "data": kfx.vis.vega.arrow_data(kfx.dsl.KfpArtifact("vega_data")),
+                "mark": "bar",
+                "encoding": {
+                    "x": {"field": "a", "type": "ordinal"},
+                    "y": {"field": "b", "type": "quantitative"},
+                },
+            }
+            mlpipeline_ui_metadata.write(
+                kfx.vis.asjson(kfx.vis.kfp_ui_metadata([kfx.vis.vega.vega_web_app(spec)]))
+            )
+
+    Args:
+        data (Any): list of rows (dicts), dict of columns, numpy structured array,
+            `pyarrow.Table` or `pyarrow.RecordBatch`.
+        dst (Union[str, BinaryIO, kfx.dsl.KfpArtifact]): Destination path, a binary
+            file-like object, or a kubeflow pipeline artifact in the shared volume,
+            which is recorded in the artifact catalog of the task.
+    """
+    pyarrow = _import_pyarrow()
+    table = _to_arrow_table(data)
+    path = artifact_dst(dst)
+    with pyarrow.ipc.new_file(path, table.schema) as writer:
+        writer.write_table(table)
+    record_artifact(dst, path)
+
+
+def arrow_data(url: Union[str, kfx.dsl.KfpArtifact]) -> dict:
+    """Returns a Vega data object that loads an Apache Arrow IPC file.
+
+    Web apps with arrow data load the UMD build of apache-arrow (see
+    `ARROW_SCRIPTS`), and register an `arrow` Vega format that reads the file with
+    its `Arrow` global. This is only for the data of Vega web apps - the other
+    kubeflow pipeline UI viewers only read csv artifacts.
+
+    Args:
+        url (Union[str, kfx.dsl.KfpArtifact]): url or kubeflow pipeline artifact of
+            the arrow file (see `write_arrow`).
+
+    Returns:
+        dict: Vega or Vega-Lite `data`.
+    """
+    return {"url": url, "format": {"type": "arrow"}}
+
+
+def _uses_arrow(obj: Any) -> bool:
+    if isinstance(obj, dict):
+        data_format = obj.get("format")
+        if isinstance(data_format, dict) and data_format.get("type") == "arrow":
+            return True
+        return any(_uses_arrow(value) for value in obj.values())
+    if isinstance(obj, list):
+        return any(_uses_arrow(item) for item in obj)
+    return False
+
+
+def _runtime_scripts(vega: int, vega_lite: int, arrow: bool = False) -> str:
+    """Returns the script tags to load vega, vega-lite, vega-embed (and arrow)."""
+    scripts = f"""  <script src="https://cdn.jsdelivr.net/npm/vega@{vega}"></script>
+  <script src="https://cdn.jsdelivr.net/npm/vega-lite@{vega_lite}"></script>
+  <!-- Import vega-embed -->
+  <script src="https://cdn.jsdelivr.net/npm/vega-embed@6"></script>"""
+    if arrow:
+        scripts += "".join(
+            f'\n  <script src="{src}"></script>' for src in ARROW_SCRIPTS
+        )
+    return scripts
+
+
+def _vega_embed_html(  # pylint: disable=too-many-arguments
     spec: dict,
     opts: dict = None,
     title="Generated by kfx.vis",
     vega: int = 5,
     vega_lite: int = 4,
+    data_encoding: str = "json",
 ) -> str:
     """Returns a html that generates a Vega or Vega-Lite visualization.
 
@@ -23,16 +305,31 @@ def _vega_embed_html(
         title (str, optional): Title for the web app. Defaults to "Generated by kfx.vis".
         vega (int, optional): Major version of Vega to use. Defaults to 5.
         vega_lite (int, optional): Major version of Vega-Lite to use. Defaults to 4.
+        data_encoding (str, optional): How the inline data is written - "json"
+            (rows), "columns" or "gzip" (columns, compressed). Defaults to "json".
     """
+    _check_data_encoding(data_encoding)
+    encoded: List[dict] = []
+    datasets: Dict[str, dict] = {}
+    if data_encoding != "json":
+        spec = _encode_inline_data(spec, data_encoding, [], encoded, datasets)
+
+    arrow = _uses_arrow(spec)
+    if encoded:
+        embed = f"""{_DECODE_SHIM}
+  var data = {json.dumps(encoded, separators=(",", ":"))};
+  var datasets = {json.dumps(datasets, separators=(",", ":"))};
+  kfxInflate(spec, data, datasets).then(function(spec) {{
+    return vegaEmbed('#vis', spec, opts);
+  }})"""
+    else:
+        embed = "  vegaEmbed('#vis', spec, opts)"
 
     return f"""
 <!DOCTYPE html>
 <html>
 <head>
-  <script src="https://cdn.jsdelivr.net/npm/vega@{vega}"></script>
-  <script src="https://cdn.jsdelivr.net/npm/vega-lite@{vega_lite}"></script>
-  <!-- Import vega-embed -->
-  <script src="https://cdn.jsdelivr.net/npm/vega-embed@6"></script>
+{_runtime_scripts(vega, vega_lite, arrow)}
   <title>{title}</title>
   <style>
     html, body {{
@@ -53,8 +350,8 @@ def _vega_embed_html(
 
 <script type="text/javascript">
   var spec = {json.dumps(spec)};
-  var opts = {json.dumps(opts or {})}
-  vegaEmbed('#vis', spec, opts).then(function(result) {{
+  var opts = {json.dumps(opts or {})}{_REGISTER_ARROW if arrow else ""}
+{embed}.then(function(result) {{
     console.log("Generated with kfx.vis (https://github.com/e2fyi/kfx)!")
   }}).catch(console.error);
 </script>
@@ -63,6 +360,102 @@ def _vega_embed_html(
 """
 
 
+def _vega_dashboard_html(  # pylint: disable=too-many-arguments
+    specs: List[dict],
+    names: List[Optional[str]],
+    opts: dict = None,
+    title="Generated by kfx.vis",
+    vega: int = 5,
+    vega_lite: int = 4,
+    data_encoding: str = "json",
+    columns: int = 2,
+    chart_height: str = "400px",
+) -> str:
+    """Returns a html that renders many Vega or Vega-Lite visualizations in a grid.
+
+    Vega is loaded once, identical inline data are only written once, and each
+    chart is only rendered when it is scrolled into view.
+    """
+    _check_data_encoding(data_encoding)
+    encoded: List[dict] = []
+    datasets: Dict[str, dict] = {}
+    specs = _encode_inline_data(specs, data_encoding, [], encoded, datasets)
+    arrow = _uses_arrow(specs)
+
+    charts = "\n".join(
+        f'  <div class="kfx-chart">{"<h3>%s</h3>" % html.escape(name) if name else ""}'
+        f'<div id="kfx-chart-{index}" data-kfx-chart="{index}"></div></div>'
+        for index, name in enumerate(names)
+    )
+
+    return f"""
+<!DOCTYPE html>
+<html>
+<head>
+{_runtime_scripts(vega, vega_lite, arrow)}
+  <title>{title}</title>
+  <style>
+    html, body {{
+      width: 100%;
+      margin: 0px;
+      border: 0;
+      font-family: sans-serif;
+    }}
+    .kfx-grid {{
+      display: grid;
+      grid-template-columns: repeat({columns}, minmax(0, 1fr));
+      grid-gap: 16px;
+      padding: 16px;
+    }}
+    .kfx-chart {{
+      min-height: {chart_height};
+      overflow: auto;
+    }}
+    .kfx-chart h3 {{
+      margin: 0 0 8px 0;
+      font-size: 14px;
+    }}
+    </style>
+</head>
+<body>
+
+<div class="kfx-grid">
+{charts}
+</div>
+
+<script type="text/javascript">
+  var specs = {json.dumps(specs)};
+  var opts = {json.dumps(opts or {})}{_REGISTER_ARROW if arrow else ""}
+{_DECODE_SHIM}
+  var data = {json.dumps(encoded, separators=(",", ":"))};
+  var datasets = {json.dumps(datasets, separators=(",", ":"))};
+  function kfxRender(index) {{
+    var items = data.filter(function(item) {{ return item.path[0] === index; }});
+    return kfxInflate(specs, items, datasets).then(function(specs) {{
+      return vegaEmbed("#kfx-chart-" + index, specs[index], opts);
+    }}).catch(console.error);
+  }}
+  var charts = document.querySelectorAll("[data-kfx-chart]");
+  if ("IntersectionObserver" in window) {{
+    // only render the charts that are (about to be) visible
+    var observer = new IntersectionObserver(function(entries) {{
+      entries.forEach(function(entry) {{
+        if (!entry.isIntersecting) return;
+        observer.unobserve(entry.target);
+        kfxRender(Number(entry.target.dataset.kfxChart));
+      }});
+    }}, {{rootMargin: "200px"}});
+    charts.forEach(function(chart) {{ observer.observe(chart); }});
+  }} else {{
+    charts.forEach(function(chart) {{ kfxRender(Number(chart.dataset.kfxChart)); }});
+  }}
+  console.log("Generated with kfx.vis (https://github.com/e2fyi/kfx)!")
+</script>
+</body>
+</html>
+"""
+
+
 def _kfp_ui_api(kfp_artifact: kfx.dsl.KfpArtifact) -> str:
     """Returns the path to call to retrieve the artifact.
 
@@ -95,12 +488,115 @@ def _kfp_artifact_to_api(obj: Any) -> Any:
     return obj
 
 
-def vega_web_app(
+def optimize_spec(spec: dict) -> dict:
+    """Pre-computes the aggregate, bin and timeUnit of a Vega-Lite spec with numpy.
+
+    Single view Vega-Lite specs with inline `data.values` and aggregated encodings
+    (e.g. histograms or bar charts of sums) are reduced to the aggregated rows, and
+    the encodings are rewritten so that the chart looks the same. Leading
+    `aggregate`, `bin` and `timeUnit` transforms are also pre-computed. Only `utc`
+    time units are pre-computed, as local time units depend on the browser.
+
+    Requires `numpy`.
+
+    Args:
+        spec (dict): Vega-Lite spec as a dict.
+
+    Returns:
+        dict: a new spec with the reduced data, or the same spec if it cannot be
+            optimized.
+    """
+    try:
+        from kfx.vis._vega_pushdown import (  # pylint: disable=import-outside-toplevel
+            pushdown,
+        )
+    except ImportError as error:  # pragma: no cover
+        raise ImportError(
+            "`numpy` is required to optimize Vega-Lite specs: pip install numpy"
+        ) from error
+    return pushdown(spec)
+
+
+def downsample_spec(spec: dict, max_points: int = 5000, method: str = "lttb") -> dict:
+    """Downsamples the inline data of a Vega-Lite line or area chart.
+
+    Each series (e.g. each color of the chart) is reduced to its share of
+    `max_points`, while preserving the shape of the line. Specs that are not line or
+    area charts with quantitative or temporal x values are returned unchanged.
+
+    Requires `numpy`.
+
+    Args:
+        spec (dict): Vega-Lite spec as a dict.
+        max_points (int, optional): Target number of points across all series.
+            Defaults to 5000.
+        method (str, optional): "lttb" (largest-triangle-three-buckets) or "minmax"
+            (min and max of each bucket, which keeps all spikes). Defaults to "lttb".
+
+    Returns:
+        dict: a new spec with fewer rows, or the same spec if it cannot be
+            downsampled.
+    """
+    try:
+        from kfx.vis._downsample import (  # pylint: disable=import-outside-toplevel
+            downsample,
+        )
+    except ImportError as error:  # pragma: no cover
+        raise ImportError(
+            "`numpy` is required to downsample Vega-Lite specs: pip install numpy"
+        ) from error
+    return downsample(spec, max_points, method)
+
+
+def _needs_downsampling(spec: dict, max_points: Optional[int]) -> bool:
+    mark = spec.get("mark")
+    data = spec.get("data")
+    values = data.get("values") if isinstance(data, dict) else None
+    return (
+        bool(max_points)
+        and (mark.get("type") if isinstance(mark, dict) else mark) in {"line", "area"}
+        and isinstance(values, list)
+        and len(values) > max_points
+    )
+
+
+def _prepare_spec(
+    spec: dict, optimize: bool, max_points: Optional[int], downsample: str
+) -> dict:
+    if optimize:
+        spec = optimize_spec(spec)
+    if _needs_downsampling(spec, max_points):
+        try:
+            spec = downsample_spec(spec, max_points or 0, downsample)
+        except ImportError:
+            pass
+
+    data = spec.get("data")
+    if data:
+        # converts any KfpArtifact into api call url
+        spec["data"] = _kfp_artifact_to_api(data)
+    return spec
+
+
+def _prepare_opts(opts: Optional[dict]) -> dict:
+    # so that credential cookies will also be sent
+    opts = opts or {}
+    opts["loader"] = opts.get("loader", {})
+    opts["loader"]["http"] = opts["loader"].get("http", {})
+    opts["loader"]["http"].update({"credentials": "same-origin"})
+    return opts
+
+
+def vega_web_app(  # pylint: disable=too-many-arguments
     spec: dict,
     opts: dict = None,
     title="Generated by kfx.vis",
     vega: int = 5,
     vega_lite: int = 4,
+    optimize: bool = False,
+    max_points: Optional[int] = 5000,
+    downsample: str = "lttb",
+    data_encoding: str = "json",
 ) -> kfx.vis.models.WebApp:
     """Provides the metadata needed for kubeflow pipeline UI to render a `Vega <https://vega.github.io/>`_ or `Vega-Lite <https://vega.github.io/vega-lite/>`_ vis in as a custom web app.
 
@@ -112,22 +608,101 @@ def vega_web_app(
         title (str, optional): Title for the web app. Defaults to "Generated by kfx.vis".
         vega (int, optional): Version of Vega to use. Defaults to 5.
         vega_lite (int, optional): Version of Vega-Lite to use. Defaults to 4.
+        optimize (bool, optional): Whether to pre-compute the aggregated data of the
+            spec in python (see `optimize_spec`). Defaults to False.
+        max_points (Optional[int], optional): Line and area charts with more inline
+            rows than this are downsampled (see `downsample_spec`), if `numpy` is
+            installed. Set to None to disable. Defaults to 5000.
+        downsample (str, optional): "lttb" or "minmax". Defaults to "lttb".
+        data_encoding (str, optional): How the inline data is written - "json"
+            (rows), "columns" (one list per field), or "gzip" (columns, gzip
+            compressed and base64 encoded, decoded in the browser with
+            `DecompressionStream`). Defaults to "json".
 
     Returns:
         kfx.vis.models.WebApp: pydantic data object describing a Vega/Vega-Lite web app.
     """
-    # so that credential cookies will also be sent
-    opts = opts or {}
-    opts["loader"] = opts.get("loader", {})
-    opts["loader"]["http"] = opts["loader"].get("http", {})
-    opts["loader"]["http"].update({"credentials": "same-origin"})
+    return web_app(
+        source=_vega_embed_html(
+            _prepare_spec(spec, optimize, max_points, downsample),
+            _prepare_opts(opts),
+            title,
+            vega=vega,
+            vega_lite=vega_lite,
+            data_encoding=data_encoding,
+        ),
+        storage="inline",
+    )
 
-    data = spec.get("data")
-    if data:
-        # converts any KfpArtifact into api call url
-        spec["data"] = _kfp_artifact_to_api(data)
+
+def vega_dashboard(  # pylint: disable=too-many-arguments
+    specs: Union[Sequence[dict], Mapping[str, dict]],
+    opts: dict = None,
+    title="Generated by kfx.vis",
+    columns: int = 2,
+    chart_height: str = "400px",
+    vega: int = 5,
+    vega_lite: int = 4,
+    optimize: bool = False,
+    max_points: Optional[int] = 5000,
+    downsample: str = "lttb",
+    data_encoding: str = "json",
+) -> kfx.vis.models.WebApp:
+    """Renders many Vega or Vega-Lite specs in a grid, as a single web app.
+
+    Unlike a `vega_web_app` for each spec, vega is only loaded once, identical
+    inline data (e.g. the same rows in several charts) are only written once, and
+    each chart is only rendered when it is scrolled into view.
+
+    ::
+
+        kfx.vis.kfp_ui_metadata(
+            [
+                kfx.vis.vega.vega_dashboard(
+                    {"loss": loss_spec, "accuracy": accuracy_spec}, columns=2
+                )
+            ]
+        )
+
+    Args:
+        specs (Union[Sequence[dict], Mapping[str, dict]]): Vega or Vega-Lite specs,
+            or a dict of captions and specs.
+        opts (dict, optional): Options to pass to vega-embed. Defaults to None.
+        title (str, optional): Title for the web app. Defaults to "Generated by kfx.vis".
+        columns (int, optional): Number of charts in each row. Defaults to 2.
+        chart_height (str, optional): Min height of each chart (css).
+            Defaults to "400px".
+        vega (int, optional): Version of Vega to use. Defaults to 5.
+        vega_lite (int, optional): Version of Vega-Lite to use. Defaults to 4.
+        optimize (bool, optional): Whether to pre-compute the aggregated data of the
+            specs in python (see `optimize_spec`). Defaults to False.
+        max_points (Optional[int], optional): Line and area charts with more inline
+            rows than this are downsampled (see `downsample_spec`), if `numpy` is
+            installed. Set to None to disable. Defaults to 5000.
+        downsample (str, optional): "lttb" or "minmax". Defaults to "lttb".
+        data_encoding (str, optional): How the inline data is written - "json"
+            (rows), "columns" or "gzip" (see `vega_web_app`). Defaults to "json".
+
+    Returns:
+        kfx.vis.models.WebApp: pydantic data object describing a Vega/Vega-Lite web app.
+    """
+    if isinstance(specs, Mapping):
+        names: List[Optional[str]] = list(specs)
+        specs = list(specs.values())
+    else:
+        names = [None] * len(specs)
 
     return web_app(
-        source=_vega_embed_html(spec, opts, title, vega=vega, vega_lite=vega_lite),
+        source=_vega_dashboard_html(
+            [_prepare_spec(spec, optimize, max_points, downsample) for spec in specs],
+            names,
+            _prepare_opts(opts),
+            title,
+            vega=vega,
+            vega_lite=vega_lite,
+            data_encoding=data_encoding,
+            columns=columns,
+            chart_height=chart_height,
+        ),
         storage="inline",
     )
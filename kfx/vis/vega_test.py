@@ -0,0 +1,562 @@
+"""Tests for kfx.vis.vega."""
+import base64
+import gzip
+import json
+import re
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+import kfx.vis
+from kfx.vis._downsample import lttb, minmax
+from kfx.vis._vega_pushdown import bin_params
+from kfx.vis.vega import (
+    arrow_data,
+    downsample_spec,
+    optimize_spec,
+    vega_dashboard,
+    vega_web_app,
+    write_arrow,
+)
+
+SCHEMA = "https://vega.github.io/schema/vega-lite/v4.json"
+
+
+def _spec(values, encoding, mark="bar", **kwargs):
+    return dict(
+        {"$schema": SCHEMA, "data": {"values": values}, "mark": mark},
+        encoding=encoding,
+        **kwargs
+    )
+
+
+def test_optimize_aggregated_bar_chart():
+    values = [{"a": "x", "b": 1}, {"a": "y", "b": 2}, {"a": "x", "b": 3}]
+    spec = _spec(
+        values,
+        {
+            "x": {"field": "a", "type": "nominal"},
+            "y": {"aggregate": "sum", "field": "b", "type": "quantitative"},
+            "tooltip": [{"aggregate": "count", "type": "quantitative"}],
+        },
+    )
+
+    optimized = optimize_spec(spec)
+
+    assert optimized["data"] == {
+        "values": [
+            {"a": "x", "sum_b": 4, "__count": 2},
+            {"a": "y", "sum_b": 2, "__count": 1},
+        ]
+    }
+    assert optimized["encoding"] == {
+        "x": {"field": "a", "type": "nominal"},
+        "y": {"field": "sum_b", "type": "quantitative", "title": "Sum of b"},
+        "tooltip": [
+            {"field": "__count", "type": "quantitative", "title": "Count of Records"}
+        ],
+    }
+    # original spec is unchanged
+    assert spec["data"]["values"] == values
+
+
+@pytest.mark.parametrize(
+    "op,expected",
+    [
+        ("mean", [2.5, 6.0]),
+        ("median", [2.5, 6.0]),
+        ("min", [1, 5]),
+        ("max", [4, 7]),
+        ("q1", [1.75, 5.5]),
+        ("variance", [np.var([1, 2, 3, 4], ddof=1), 2.0]),
+        ("stdevp", [np.std([1, 2, 3, 4]), np.std([5, 7])]),
+        ("valid", [4, 2]),
+        ("missing", [0, 1]),
+        ("distinct", [4, 3]),
+    ],
+)
+def test_optimize_aggregate_ops(op, expected):
+    values = [{"g": "a", "v": v} for v in [1, 2, 3, 4]]
+    values += [{"g": "b", "v": 5}, {"g": "b", "v": 7}, {"g": "b", "v": None}]
+    spec = _spec(
+        values,
+        {
+            "x": {"field": "g", "type": "nominal"},
+            "y": {"aggregate": op, "field": "v", "type": "quantitative"},
+        },
+    )
+
+    rows = optimize_spec(spec)["data"]["values"]
+
+    assert [row["g"] for row in rows] == ["a", "b"]
+    assert [row["%s_v" % op] for row in rows] == pytest.approx(expected)
+
+
+def test_optimize_histogram():
+    rng = np.random.RandomState(0)
+    scores = rng.uniform(0, 1, size=1000)
+    spec = _spec(
+        [{"score": float(value)} for value in scores],
+        {
+            "x": {"bin": True, "field": "score", "type": "quantitative"},
+            "y": {"aggregate": "count", "type": "quantitative"},
+        },
+    )
+
+    optimized = optimize_spec(spec)
+
+    assert optimized["encoding"] == {
+        "x": {
+            "bin": {"binned": True, "step": 0.1},
+            "field": "bin_maxbins_10_score",
+            "type": "quantitative",
+            "title": "score (binned)",
+        },
+        "x2": {"field": "bin_maxbins_10_score_end"},
+        "y": {"field": "__count", "type": "quantitative", "title": "Count of Records"},
+    }
+    rows = optimized["data"]["values"]
+    assert len(rows) == 10
+    assert sum(row["__count"] for row in rows) == 1000
+    for row in rows:
+        start = row["bin_maxbins_10_score"]
+        assert row["__count"] == np.sum((scores >= start) & (scores < start + 0.1))
+        assert row["bin_maxbins_10_score_end"] == pytest.approx(start + 0.1)
+
+
+@pytest.mark.parametrize(
+    "extent,params,expected",
+    [
+        ((0.0, 1.0), {}, (0.0, 1.0, 0.1)),
+        ((3.0, 97.0), {}, (0.0, 100.0, 10.0)),
+        ((0.0, 1.0), {"maxbins": 20}, (0.0, 1.0, 0.05)),
+        ((-3.2, 7.9), {}, (-4.0, 8.0, 2.0)),
+        ((0.0, 10.0), {"step": 3}, (0.0, 12.0, 3)),
+        ((5.0, 5.0), {}, (5.0, 5.5, 0.5)),
+    ],
+)
+def test_bin_params_same_as_vega(extent, params, expected):
+    assert bin_params(extent, **params) == pytest.approx(expected)
+
+
+def test_optimize_utc_time_unit():
+    spec = _spec(
+        [
+            {"date": "2020-01-01", "v": 1},
+            {"date": "2020-01-15T10:00:00Z", "v": 2},
+            {"date": "2020-02-03", "v": 3},
+        ],
+        {
+            "x": {"timeUnit": "utcyearmonth", "field": "date", "type": "temporal"},
+            "y": {"aggregate": "sum", "field": "v", "type": "quantitative"},
+        },
+        mark="line",
+    )
+
+    optimized = optimize_spec(spec)
+
+    assert optimized["encoding"]["x"] == spec["encoding"]["x"]
+    assert optimized["data"]["values"] == [
+        {"date": 1577836800000, "sum_v": 3},
+        {"date": 1580515200000, "sum_v": 3},
+    ]
+
+
+def test_optimize_transforms():
+    spec = _spec(
+        [{"a": value % 3, "b": value} for value in range(30)],
+        {
+            "x": {"field": "a", "type": "ordinal"},
+            "y": {"field": "total", "type": "quantitative"},
+        },
+        transform=[
+            {
+                "aggregate": [{"op": "sum", "field": "b", "as": "total"}],
+                "groupby": ["a"],
+            }
+        ],
+    )
+
+    optimized = optimize_spec(spec)
+
+    assert "transform" not in optimized
+    assert optimized["encoding"] == spec["encoding"]
+    assert optimized["data"]["values"] == [
+        {"a": 0, "total": 135},
+        {"a": 1, "total": 145},
+        {"a": 2, "total": 155},
+    ]
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        # not aggregated
+        _spec([{"a": 1}, {"a": 2}], {"x": {"field": "a", "type": "quantitative"}}),
+        # local time units depend on the timezone of the browser
+        _spec(
+            [{"d": "2020-01-01", "v": 1}, {"d": "2020-01-02", "v": 1}],
+            {
+                "x": {"timeUnit": "yearmonth", "field": "d", "type": "temporal"},
+                "y": {"aggregate": "sum", "field": "v", "type": "quantitative"},
+            },
+        ),
+        # composite specs
+        {
+            "$schema": SCHEMA,
+            "data": {"values": [{"a": 1}, {"a": 1}]},
+            "layer": [{"mark": "bar"}],
+        },
+        # data from an url
+        _spec({"url": "data.csv"}, {"y": {"aggregate": "count"}}),
+        # sort by the aggregated channel
+        _spec(
+            [{"a": "x", "c": 1, "b": 1}, {"a": "x", "c": 2, "b": 5}] * 2,
+            {
+                "x": {"field": "a", "type": "nominal", "sort": "-y"},
+                "y": {"aggregate": "sum", "field": "b", "type": "quantitative"},
+                "color": {"field": "c", "type": "nominal"},
+            },
+        ),
+    ],
+)
+def test_optimize_unsupported_specs_unchanged(spec):
+    assert optimize_spec(spec) is spec
+
+
+def test_vega_web_app_optimize():
+    spec = _spec(
+        [{"a": "x", "b": value} for value in range(1000)],
+        {
+            "x": {"field": "a", "type": "nominal"},
+            "y": {"aggregate": "mean", "field": "b", "type": "quantitative"},
+        },
+    )
+
+    source = vega_web_app(spec, optimize=True).source
+
+    assert json.dumps([{"a": "x", "mean_b": 499.5}]) in source
+    assert len(source) < len(vega_web_app(spec).source) / 10
+
+
+def _line_values(n_points, series=("a",)):
+    x = np.arange(n_points)
+    return [
+        {"step": int(step), "loss": float(np.sin(step / 50.0) + offset), "s": name}
+        for offset, name in enumerate(series)
+        for step in x
+    ]
+
+
+def _line_spec(values, mark="line", **encoding):
+    return _spec(
+        values,
+        dict(
+            {
+                "x": {"field": "step", "type": "quantitative"},
+                "y": {"field": "loss", "type": "quantitative"},
+            },
+            **encoding
+        ),
+        mark=mark,
+    )
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_downsample_keeps_shape(method):
+    values = _line_values(10000)
+    values[5000]["loss"] = 100.0  # spike
+
+    rows = downsample_spec(_line_spec(values), 500, method)["data"]["values"]
+
+    assert 400 <= len(rows) <= 500
+    steps = [row["step"] for row in rows]
+    assert steps == sorted(steps)
+    assert steps[0] == 0 and steps[-1] == 9999
+    assert {"step": 5000, "loss": 100.0, "s": "a"} in rows
+    assert min(row["loss"] for row in rows) == pytest.approx(-1, abs=1e-3)
+
+
+def test_lttb_picks_largest_triangles():
+    x = np.arange(7, dtype=float)
+    y = np.array([0, 1, 0, 0, 5, 0, 0], dtype=float)
+
+    assert lttb(x, y, 4).tolist() == [0, 2, 4, 6]
+    assert minmax(x, y, 4).tolist() == [0, 2, 4, 6]
+    assert lttb(x, y, 10).tolist() == list(range(7))
+
+
+def test_downsample_each_series():
+    spec = _line_spec(
+        _line_values(3000, series=("a", "b")),
+        mark={"type": "area"},
+        color={"field": "s", "type": "nominal"},
+    )
+
+    rows = downsample_spec(spec, 1000)["data"]["values"]
+
+    assert [row["s"] for row in rows].count("a") == 500
+    assert [row["s"] for row in rows].count("b") == 500
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        _line_spec(_line_values(100)),
+        _line_spec(_line_values(10000), mark="point"),
+        _line_spec(_line_values(10000), x={"field": "step", "type": "ordinal"}),
+    ],
+)
+def test_downsample_unsupported_specs_unchanged(spec):
+    assert downsample_spec(spec, 1000) is spec
+
+
+def test_vega_web_app_downsample():
+    spec = _line_spec(_line_values(20000))
+
+    downsampled = vega_web_app(spec, max_points=1000).source
+    full = vega_web_app(spec, max_points=None).source
+
+    assert downsampled.count('"step"') == 1000 + 1  # and the encoding
+    assert full.count('"step"') == 20000 + 1
+
+
+def _wide_rows(n_rows=2000, n_cols=20):
+    return [
+        dict(
+            {"id": index, "split": "train" if index % 5 else "test"},
+            **{"feature_%d" % col: (index * col) % 97 for col in range(n_cols)}
+        )
+        for index in range(n_rows)
+    ]
+
+
+def _inline_data(source):
+    """Returns the decoded inline data, the same way as the js shim."""
+    data = json.loads(re.search(r"var data = (.*);", source).group(1))
+    datasets = json.loads(re.search(r"var datasets = (.*);", source).group(1))
+    decoded = []
+    for item in data:
+        dataset = datasets[item["dataset"]]
+        values = dataset["data"]
+        if dataset["encoding"] == "rows":
+            decoded.append((item["path"], values))
+            continue
+        if dataset["encoding"] == "gzip":
+            values = json.loads(gzip.decompress(base64.b64decode(values)))
+        names = list(values)
+        rows = [dict(zip(names, row)) for row in zip(*values.values())]
+        decoded.append((item["path"], rows))
+    return decoded
+
+
+@pytest.mark.parametrize("data_encoding", ["columns", "gzip"])
+def test_vega_web_app_data_encoding(data_encoding):
+    rows = _wide_rows()
+    spec = {
+        "$schema": SCHEMA,
+        "data": {"values": rows},
+        "datasets": {"other": rows[:10]},
+        "mark": "point",
+    }
+
+    source = vega_web_app(spec, data_encoding=data_encoding).source
+
+    assert _inline_data(source) == [
+        (["data", "values"], rows),
+        (["datasets", "other"], rows[:10]),
+    ]
+    assert '"values": []' in source
+    ratio = len(vega_web_app(spec).source) / len(source)
+    assert ratio > (5 if data_encoding == "gzip" else 1.5)
+
+
+def test_vega_web_app_data_encoding_vega_spec():
+    spec = {
+        "$schema": "https://vega.github.io/schema/vega/v5.json",
+        "data": [{"name": "table", "values": [{"a": 1}, {"a": 2, "b": "x"}]}],
+    }
+
+    source = vega_web_app(spec, data_encoding="columns").source
+
+    assert _inline_data(source) == [
+        (["data", 0, "values"], [{"a": 1, "b": None}, {"a": 2, "b": "x"}])
+    ]
+
+
+def test_vega_web_app_json_data_unchanged():
+    spec = _spec([{"a": 1}], {"x": {"field": "a", "type": "quantitative"}})
+
+    source = vega_web_app(spec).source
+
+    assert json.dumps(spec) in source
+    assert "kfxInflate" not in source
+    with pytest.raises(ValueError):
+        vega_web_app(spec, data_encoding="csv")
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="requires node")
+def test_vega_web_app_data_encoding_shim(tmp_path):
+    rows = _wide_rows(100, 3)
+    source = vega_web_app(
+        {"$schema": SCHEMA, "data": {"values": rows}, "mark": "point"},
+        data_encoding="gzip",
+    ).source
+    script = source.split('<script type="text/javascript">')[1].split("</script>")[0]
+    stub = (
+        "function vegaEmbed(el, spec, opts) {"
+        "  console.log(JSON.stringify(spec.data.values));"
+        "  return Promise.resolve({});"
+        "}"
+    )
+    path = tmp_path / "shim.js"
+    path.write_text(stub + script)
+
+    result = subprocess.run(
+        ["node", str(path)], stdout=subprocess.PIPE, universal_newlines=True, check=True
+    )
+
+    assert json.loads(result.stdout.splitlines()[0]) == rows
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        [{"a": "A", "b": 28}, {"a": "B", "b": 55}],
+        {"a": ["A", "B"], "b": [28, 55]},
+        np.array([("A", 28), ("B", 55)], dtype=[("a", "U1"), ("b", "i8")]),
+    ],
+)
+def test_write_arrow(data, tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.ipc  # pylint: disable=import-outside-toplevel
+
+    path = str(tmp_path / "data.arrow")
+    write_arrow(data, path)
+
+    with pyarrow.ipc.open_file(path) as reader:
+        assert reader.read_all().to_pydict() == {"a": ["A", "B"], "b": [28, 55]}
+
+
+def test_vega_web_app_arrow_data():
+    spec = {
+        "$schema": SCHEMA,
+        "data": arrow_data("https://example.com/data.arrow"),
+        "mark": "bar",
+    }
+
+    source = vega_web_app(spec).source
+
+    assert '"format": {"type": "arrow"}' in source
+    assert 'vega.formats("arrow", kfxReadArrow)' in source
+    assert "apache-arrow@4/Arrow.es2015.min.js" in source
+    assert "apache-arrow" not in vega_web_app(_spec([], {})).source
+
+
+def test_arrow_is_not_a_kfp_artifact_format():
+    with pytest.raises(ValueError):
+        kfx.vis.table("gs://bucket/data.arrow", header=["a"], artifact_format="arrow")
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="requires node")
+@pytest.mark.parametrize("legacy", [False, True])
+def test_vega_web_app_arrow_reader(legacy, tmp_path):
+    source = vega_web_app(
+        {"$schema": SCHEMA, "data": arrow_data("data.arrow"), "mark": "bar"}
+    ).source
+    script = source.split('<script type="text/javascript">')[1].split("</script>")[0]
+    # stubs of the `vega` and `Arrow` globals of their UMD builds
+    table = (
+        "{schema: {fields: [{name: 'a'}, {name: 'b'}]},"
+        " getChildAt: function(i) { return {get: function(r) {"
+        "   return i === 0 ? ['A', 'B'][r] : BigInt(r + 1); }}; },"
+        " %s: 2}" % ("length" if legacy else "numRows")
+    )
+    reader = (
+        "Table: {from: function(bytes) { return %s; }}" % table
+        if legacy
+        else "tableFromIPC: function(bytes) { return %s; }" % table
+    )
+    stub = (
+        "var registry = {};"
+        "var vega = {formats: function(name, reader) {"
+        "  if (reader) registry[name] = reader; return registry[name];"
+        "}};"
+        "var Arrow = {%s};"
+        "function vegaEmbed(el, spec, opts) {"
+        "  var reader = vega.formats('arrow');"
+        "  console.log(reader.responseType);"
+        "  console.log(JSON.stringify(reader(new ArrayBuffer(8))));"
+        "  return Promise.resolve({});"
+        "}" % reader
+    )
+    path = tmp_path / "arrow.js"
+    path.write_text(stub + script)
+
+    result = subprocess.run(
+        ["node", str(path)], stdout=subprocess.PIPE, universal_newlines=True, check=True
+    )
+
+    lines = result.stdout.splitlines()
+    assert lines[0] == "arrayBuffer"
+    assert json.loads(lines[1]) == [{"a": "A", "b": 1}, {"a": "B", "b": 2}]
+
+
+def test_vega_dashboard_shares_runtime_and_data():
+    rows = _wide_rows(100, 3)
+    bar = _spec(rows, {"x": {"field": "split", "type": "nominal"}})
+    line = _spec(rows, {"x": {"field": "id", "type": "quantitative"}}, mark="line")
+    other = _spec(rows[:5], {"x": {"field": "id", "type": "quantitative"}})
+
+    source = vega_dashboard(
+        {"bar <1>": bar, "line": line, "other": other}, columns=3
+    ).source
+
+    assert source.count("https://cdn.jsdelivr.net/npm/vega@5") == 1
+    assert source.count("vega-embed@6") == 1
+    assert "<h3>bar &lt;1&gt;</h3>" in source
+    assert "repeat(3, minmax(0, 1fr))" in source
+    datasets = json.loads(re.search(r"var datasets = (.*);", source).group(1))
+    assert len(datasets) == 2
+    assert _inline_data(source) == [
+        ([0, "data", "values"], rows),
+        ([1, "data", "values"], rows),
+        ([2, "data", "values"], rows[:5]),
+    ]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="requires node")
+@pytest.mark.parametrize("data_encoding", ["json", "gzip"])
+def test_vega_dashboard_renders_visible_charts(data_encoding, tmp_path):
+    rows = _wide_rows(10, 2)
+    specs = [_spec(rows, {}), _spec(rows, {}), _spec(rows[:2], {})]
+    source = vega_dashboard(specs, data_encoding=data_encoding).source
+    script = source.split('<script type="text/javascript">')[1].split("</script>")[0]
+    stub = (
+        "var charts = [0, 1, 2].map(function(i) {"
+        "  return {dataset: {kfxChart: String(i)}};"
+        "});"
+        "var document = {querySelectorAll: function() { return charts; }};"
+        "var window = {IntersectionObserver: true};"
+        "function IntersectionObserver(callback) {"
+        "  this.observe = function(el) {"
+        "    callback([{target: el, isIntersecting: el === charts[2]}]);"
+        "  };"
+        "  this.unobserve = function() {};"
+        "}"
+        "function vegaEmbed(el, spec, opts) {"
+        "  console.log(JSON.stringify([el, spec.data.values]));"
+        "  return Promise.resolve({});"
+        "}"
+    )
+    path = tmp_path / "dashboard.js"
+    path.write_text(stub + script)
+
+    result = subprocess.run(
+        ["node", str(path)], stdout=subprocess.PIPE, universal_newlines=True, check=True
+    )
+
+    embedded = [json.loads(line) for line in result.stdout.splitlines()[1:]]
+    assert embedded == [["#kfx-chart-2", rows[:2]]]